@@ -0,0 +1,108 @@
+# db_pool.py
+# Shared SQLite connections for server.py: a bounded pool of read connections
+# and one serialized writer, all opened in WAL mode with tuned pragmas, so
+# readers no longer queue behind writers.
+#
+# Env (all optional):
+#   LS_DB_POOL_SIZE        read connections (default 4)
+#   LS_DB_BUSY_TIMEOUT_MS  busy_timeout per connection (default 5000)
+#   LS_DB_SYNCHRONOUS      synchronous pragma (default NORMAL)
+#   LS_DB_MMAP_MB          mmap_size in MB (default 256, 0 = off)
+#   LS_DB_CACHE_MB         page cache per connection in MB (default 16)
+#   LS_DB_FOREIGN_KEYS     foreign_keys pragma (default OFF, SQLite's own default;
+#                          ON enforces the schema's FOREIGN KEYs and cascades)
+#
+# Usage:
+#   POOL = Pool(DB_PATH)
+#   with POOL.read() as conn:  ...SELECTs...
+#   with POOL.write() as conn: ...runs inside BEGIN IMMEDIATE, committed on exit...
+
+import os, queue, sqlite3, threading, time
+from contextlib import contextmanager
+
+def env_pragmas():
+    return {
+        "journal_mode": "WAL",
+        "synchronous": os.environ.get("LS_DB_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.environ.get("LS_DB_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.environ.get("LS_DB_MMAP_MB", "256")) * 1024 * 1024,
+        "cache_size": -int(os.environ.get("LS_DB_CACHE_MB", "16")) * 1024,  # negative = KiB
+        "foreign_keys": os.environ.get("LS_DB_FOREIGN_KEYS", "OFF"),
+    }
+
+class Pool:
+    def __init__(self, path, size=None, pragmas=None):
+        self.path = str(path)
+        self.size = size or int(os.environ.get("LS_DB_POOL_SIZE", "4"))
+        self.pragmas = pragmas or env_pragmas()
+        self._readers = queue.LifoQueue()
+        self._opened = 0
+        self._open_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"read_checkouts": 0, "read_wait_ms": 0.0, "read_wait_max_ms": 0.0,
+                       "write_checkouts": 0, "write_wait_ms": 0.0, "write_wait_max_ms": 0.0,
+                       "write_errors": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.pragmas["busy_timeout"] / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for k, v in self.pragmas.items():
+            conn.execute(f"PRAGMA {k}={v}")
+        return conn
+
+    def _note(self, kind, waited_ms):
+        with self._stats_lock:
+            s = self._stats
+            s[f"{kind}_checkouts"] += 1
+            s[f"{kind}_wait_ms"] += waited_ms
+            s[f"{kind}_wait_max_ms"] = max(s[f"{kind}_wait_max_ms"], waited_ms)
+
+    @contextmanager
+    def read(self):
+        t0 = time.perf_counter()
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._open_lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+            conn = self._connect() if grow else self._readers.get()
+        self._note("read", (time.perf_counter() - t0) * 1000)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        t0 = time.perf_counter()
+        with self._write_lock:
+            self._note("write", (time.perf_counter() - t0) * 1000)
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                with self._stats_lock:
+                    self._stats["write_errors"] += 1
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def stats(self):
+        with self._stats_lock:
+            s = dict(self._stats)
+        s.update(size=self.size, open_readers=self._opened, idle_readers=self._readers.qsize(),
+                 journal_mode=self.pragmas["journal_mode"], synchronous=self.pragmas["synchronous"])
+        for k in ("read_wait_ms", "read_wait_max_ms", "write_wait_ms", "write_wait_max_ms"):
+            s[k] = round(s[k], 2)
+        return s
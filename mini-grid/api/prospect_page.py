@@ -0,0 +1,183 @@
+# prospect_page.py
+# Rendering for the printable /prospect/{gat_id}/{city_id}/{company_id} page.
+# The HTML shell is parsed once at import into literal pieces and field names
+# (Template); a request only escapes and joins the prospect/contact fragments.
+# CSS and JS live in api/static/ and are served with ETag/Last-Modified so
+# browsers revalidate instead of re-downloading.
+#
+# Finished pages sit in a small LRU keyed by the trio. Each entry carries a
+# version signature built from the prospect row plus count/max id/max
+# updated_at of its contacts, all read in one indexed lookup; a matching
+# signature returns the cached page without running the contacts query.
+#
+# Env (optional):
+#   LS_PAGE_CACHE_SIZE   pages kept in memory (default 256, 0 = off)
+
+import hashlib, html, os, re, threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from string import Formatter
+
+STATIC_DIR = Path(__file__).with_name("static")
+CACHE_SIZE = int(os.environ.get("LS_PAGE_CACHE_SIZE", "256"))
+
+SIG_SQL = """
+SELECT p.*,
+       (SELECT COUNT(*) || '|' || IFNULL(MAX(c.contact_id), '') || '|' || IFNULL(MAX(c.updated_at), '')
+          FROM contact_grid c
+         WHERE c.gat_id = p.gat_id AND c.city_id = p.city_id AND c.company_id = p.company_id) AS contacts_sig
+  FROM prospects p
+ WHERE p.gat_id = ? AND p.city_id = ? AND p.company_id = ?
+"""
+
+CONTACTS_SQL = """
+SELECT contact_name, role_title, email, phone, COALESCE(notes,'') AS notes
+  FROM contact_grid
+ WHERE gat_id = ? AND city_id = ? AND company_id = ?
+ ORDER BY contact_id DESC
+"""
+
+SHELL = """<!doctype html>
+<meta charset="utf-8">
+<title>Prospect • {prospect_name}</title>
+<link rel="stylesheet" href="/static/prospect.css">
+
+<h1>Prospect</h1>
+<p class="meta" id="prospect" data-gat-id="{gat_id}" data-city-id="{city_id}" data-company-id="{company_id}">
+  <b>GAT</b> {gat_id} •
+  <b>City</b> {city_id} •
+  <b>Company</b> {company_id}<br>
+  <b>Name</b> {prospect_name}<br>
+  <b>Status</b> {lifecycle_status} •
+  <b>Created</b> {created_at} •
+  <b>Updated</b> {updated_at}
+</p>
+
+<h3>Contacts</h3>
+<table>
+  <thead><tr><th>Name</th><th>Role</th><th>Email</th><th>Phone</th><th>Notes</th></tr></thead>
+  <tbody>{contact_rows}</tbody>
+</table>
+
+<div class="actions noprint">
+  <button class="btn" id="promote">Promote to Sponsor</button>
+  <button class="btn" id="print">Print</button>
+  <span id="msg"></span>
+</div>
+
+<script src="/static/prospect.js"></script>
+"""
+
+CONTACT_ROW = "<tr><td>{contact_name}</td><td>{role_title}</td><td>{email}</td><td>{phone}</td><td>{notes}</td></tr>"
+NO_CONTACTS = "<tr><td colspan='5' class='empty'>No contacts yet</td></tr>"
+
+class Template:
+    """A {field} template split once into literals and field names.
+
+    Calling it with the field values (in self.fields order) just interleaves
+    and joins; no parsing happens per request.
+    """
+    def __init__(self, tpl):
+        parts = list(Formatter().parse(tpl))
+        self.fields = tuple(f for _, f, _, _ in parts if f is not None)
+        self._lits = [lit for lit, f, _, _ in parts if f is not None]
+        self._tail = "".join(lit for lit, f, _, _ in parts if f is None)
+
+    def __call__(self, values):
+        out = [None] * (2 * len(self._lits))
+        out[::2] = self._lits
+        out[1::2] = values
+        return "".join(out) + self._tail
+
+_has_special = re.compile(r"[&<>\"']").search
+
+def esc(x):
+    if x is None:
+        return ""
+    x = str(x)
+    return html.escape(x) if _has_special(x) else x
+
+_SHELL = Template(SHELL)
+_ROW = Template(CONTACT_ROW)
+
+def render(p, contacts):
+    """p: prospects row; contacts: rows in CONTACT_ROW field order (CONTACTS_SQL)."""
+    vals = {k: esc(p[k]) for k in set(_SHELL.fields) - {"contact_rows"}}
+    vals["contact_rows"] = "".join([_ROW(list(map(esc, c))) for c in contacts]) or NO_CONTACTS
+    return _SHELL([vals[f] for f in _SHELL.fields])
+
+# ---------- page cache ----------
+
+class PageCache:
+    def __init__(self, size):
+        self.size = size
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, sig):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is not None and hit[0] == sig:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, sig, page):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._d[key] = (sig, page)
+            self._d.move_to_end(key)
+            while len(self._d) > self.size:
+                self._d.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "entries": len(self._d), "hits": self.hits, "misses": self.misses}
+
+CACHE = PageCache(CACHE_SIZE)
+
+def prospect_page(conn, gat_id, city_id, company_id):
+    """Return (html, etag) for the trio, or None when there is no such prospect."""
+    trio = (gat_id, city_id, company_id)
+    p = conn.execute(SIG_SQL, trio).fetchone()
+    if p is None:
+        return None
+    sig = hashlib.blake2b(repr(tuple(p)).encode("utf-8"), digest_size=12).hexdigest()
+    page = CACHE.get(trio, sig)
+    if page is None:
+        page = render(p, conn.execute(CONTACTS_SQL, trio).fetchall())
+        CACHE.put(trio, sig, page)
+    return page, f'"{sig}"'
+
+# ---------- static assets ----------
+
+class Asset:
+    TYPES = {".css": "text/css; charset=utf-8", ".js": "text/javascript; charset=utf-8"}
+
+    def __init__(self, path):
+        self.body = path.read_bytes()
+        self.media_type = self.TYPES.get(path.suffix, "application/octet-stream")
+        self.mtime = int(path.stat().st_mtime)
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=12).hexdigest() + '"'
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+
+ASSETS = {p.name: Asset(p) for p in STATIC_DIR.glob("*") if p.suffix in Asset.TYPES}
+
+def not_modified(headers, etag, mtime=None):
+    """Conditional GET check: If-None-Match wins; If-Modified-Since only without it."""
+    inm = headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+        return "*" in tags or etag in tags
+    ims = headers.get("if-modified-since")
+    if ims and mtime is not None:
+        try:
+            return int(parsedate_to_datetime(ims).timestamp()) >= mtime
+        except (TypeError, ValueError):
+            return False
+    return False
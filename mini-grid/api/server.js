@@ -3,7 +3,8 @@ const express = require("express");
 const cors = require("cors");
 const path = require("path");
 const fs = require("fs");
-const { spawnSync } = require("child_process");
+const readline = require("readline");
+const { spawn } = require("child_process");
 
 // --- app setup ---
 const app = express();
@@ -25,14 +26,67 @@ let MINI_URL = process.env.LS_MINI_URL || "http://127.0.0.1:3001";
 // Runtime files on Android
 const DROP_DIR = "/sdcard/LifeSupport";
 
-// --- helper: run inline Python for SQLite ops ---
-function runPyCode(code, jsonInput) {
-  return spawnSync(PYTHON, ["-c", code], {
-    input: JSON.stringify(jsonInput || {}),
+// --- helper: resident Python worker for SQLite ops (tools/grid_worker.py) ---
+// One long-lived process speaking line-delimited JSON-RPC; restarted with
+// backoff if it dies. Requests in flight at that moment fail with worker_exited.
+const WORKER_PY = process.env.LS_GRID_WORKER || path.join(ROOT, "tools", "grid_worker.py");
+const WORKER_TIMEOUT_MS = parseInt(process.env.LS_GRID_WORKER_TIMEOUT_MS || "15000", 10);
+let worker = null;
+let workerSeq = 0;
+let workerRestarts = 0;
+const workerPending = new Map();
+
+function failPending(reason) {
+  for (const p of workerPending.values()) {
+    clearTimeout(p.timer);
+    p.reject(new Error(reason));
+  }
+  workerPending.clear();
+}
+
+function startWorker() {
+  const child = spawn(PYTHON, [WORKER_PY], {
     env: { ...process.env, LS_GRID_DB_PATH: DB_PATH_GRID },
-    encoding: "utf8",
-    maxBuffer: 10 * 1024 * 1024,
+    stdio: ["pipe", "pipe", "inherit"],
+  });
+  readline.createInterface({ input: child.stdout }).on("line", (line) => {
+    let msg;
+    try { msg = JSON.parse(line); } catch { return; }
+    const p = workerPending.get(msg.id);
+    if (!p) return;
+    workerPending.delete(msg.id);
+    clearTimeout(p.timer);
+    workerRestarts = 0;
+    if (msg.ok) p.resolve(msg.result);
+    else p.reject(new Error(msg.error || "worker_error"));
+  });
+  child.stdin.on("error", () => {});
+  child.on("error", (err) => console.error("grid worker spawn error:", err.message));
+  child.on("exit", (code, signal) => {
+    if (worker === child) worker = null;
+    failPending("worker_exited");
+    const delay = Math.min(5000, 200 * 2 ** workerRestarts++);
+    console.error(`grid worker exited (code=${code} signal=${signal}); restarting in ${delay}ms`);
+    setTimeout(() => { if (!worker) worker = startWorker(); }, delay);
   });
+  return child;
+}
+
+function callWorker(op, params) {
+  if (!worker) worker = startWorker();
+  const id = ++workerSeq;
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      workerPending.delete(id);
+      reject(new Error("worker_timeout"));
+    }, WORKER_TIMEOUT_MS);
+    workerPending.set(id, { resolve, reject, timer });
+    worker.stdin.write(JSON.stringify({ id, op, params: params || {} }) + "\n");
+  });
+}
+
+function workerError(res, err) {
+  return res.status(500).json({ ok: false, error: "worker_failed", detail: err.message });
 }
 
 function ensureDropDir() {
@@ -154,51 +208,20 @@ app.get("/health", (req, res) => {
     mini_url: MINI_URL,
     locators: LOCATOR_URLS,
     domain_url: DOMAIN_URL || null,
+    worker: { pid: worker ? worker.pid : null, pending: workerPending.size, restarts: workerRestarts },
   });
 });
 
 // --- GRID companies list ---
-app.get("/grid/companies", (req, res) => {
+app.get("/grid/companies", async (req, res) => {
   const limit = Math.max(1, Math.min(parseInt(req.query.limit || "50", 10), 200));
   const offset = Math.max(0, parseInt(req.query.offset || "0", 10));
+  const cursor = req.query.cursor || null;  // next_cursor from the previous page (offset is legacy)
   const q = (req.query.q || "").trim();
-
-  const py = `
-import sys, json, sqlite3
-d = json.load(sys.stdin)
-db = d["db"]
-q = (d.get("q","") or "").strip()
-limit  = int(d.get("limit",50))
-offset = int(d.get("offset",0))
-
-con = sqlite3.connect(db)
-con.row_factory = sqlite3.Row
-cur = con.cursor()
-base = "SELECT guid, company_name, website_url, email, phone, notes, main_id, cc, ccc FROM grid_companies"
-
-if q:
-    cur.execute(base + " WHERE company_name LIKE ? COLLATE NOCASE ORDER BY company_name COLLATE NOCASE LIMIT ? OFFSET ?", (f"%{q}%", limit, offset))
-    items = [dict(r) for r in cur.fetchall()]
-    cur.execute("SELECT COUNT(*) AS n FROM grid_companies WHERE company_name LIKE ? COLLATE NOCASE", (f"%{q}%",))
-    total = cur.fetchone()[0]
-else:
-    cur.execute(base + " ORDER BY company_name COLLATE NOCASE LIMIT ? OFFSET ?", (limit, offset))
-    items = [dict(r) for r in cur.fetchall()]
-    cur.execute("SELECT COUNT(*) AS n FROM grid_companies")
-    total = cur.fetchone()[0]
-
-con.close()
-print(json.dumps({"ok": True, "items": items, "total": total, "limit": limit, "offset": offset}))
-`;
-  const r = runPyCode(py, { db: DB_PATH_GRID, q, limit, offset });
-  if (r.status !== 0)
-    return res.status(500).json({ ok: false, error: "python_failed", stderr: r.stderr });
   try {
-    return res.json(JSON.parse(r.stdout));
-  } catch {
-    return res
-      .status(500)
-      .json({ ok: false, error: "bad_python_output", stdout: r.stdout, stderr: r.stderr });
+    return res.json(await callWorker("companies", { q, limit, offset, cursor }));
+  } catch (err) {
+    return workerError(res, err);
   }
 });
 
@@ -210,29 +233,7 @@ app.get("/sync/fetch", async (req, res) => {
     const j = await r.json();
     if (!j.ok) return res.status(500).json(j);
 
-    const py = `
-import sys, json, sqlite3
-d = json.load(sys.stdin)
-db = d["db"]
-updates = d.get("updates", [])
-
-con = sqlite3.connect(db)
-cur = con.cursor()
-
-for u in updates:
-    cur.execute("UPDATE grid_companies SET main_id=?, lobby_flag=0 WHERE guid=? AND cc=? AND ccc=?",
-                (u.get("company_id"), u.get("guid"), u.get("cc"), u.get("ccc")))
-
-con.commit()
-con.close()
-print(json.dumps({"ok": True, "updated": len(updates)}))
-`;
-    const r2 = runPyCode(py, { db: DB_PATH_GRID, updates: j.updates });
-    if (r2.status !== 0)
-      return res
-        .status(500)
-        .json({ ok: false, error: "python_failed", stderr: r2.stderr });
-    return res.json(JSON.parse(r2.stdout));
+    return res.json(await callWorker("apply_main_updates", { updates: j.updates }));
   } catch (err) {
     res.status(500).json({ ok: false, error: err.message });
   }
@@ -297,46 +298,20 @@ app.post("/grid/save", async (req, res) => {
 });
 
 // --- Auto-Flag state (stored in SQLite) ---
-app.get("/auto-flag", (req, res) => {
-  const py = `
-import sys, json, sqlite3
-d = json.load(sys.stdin)
-db = d["db"]
-
-con = sqlite3.connect(db)
-cur = con.cursor()
-cur.execute("SELECT value FROM grid_settings WHERE key='auto_flag'")
-row = cur.fetchone()
-con.close()
-
-val = row[0] if row else '0'
-print(json.dumps({"ok": True, "auto_flag": val == '1'}))
-`;
-  const r = runPyCode(py, { db: DB_PATH_GRID });
-  if (r.status !== 0)
-    return res.status(500).json({ ok: false, error: "python_failed", stderr: r.stderr });
-  res.json(JSON.parse(r.stdout));
+app.get("/auto-flag", async (req, res) => {
+  try {
+    res.json(await callWorker("auto_flag.get"));
+  } catch (err) {
+    workerError(res, err);
+  }
 });
 
-app.post("/auto-flag", (req, res) => {
-  const py = `
-import sys, json, sqlite3
-d = json.load(sys.stdin)
-db = d["db"]
-val = '1' if d.get("auto_flag") else '0'
-
-con = sqlite3.connect(db)
-cur = con.cursor()
-cur.execute("INSERT OR REPLACE INTO grid_settings (key, value) VALUES ('auto_flag', ?)", (val,))
-con.commit()
-con.close()
-
-print(json.dumps({"ok": True, "auto_flag": val == '1'}))
-`;
-  const r = runPyCode(py, { db: DB_PATH_GRID, auto_flag: req.body.auto_flag });
-  if (r.status !== 0)
-    return res.status(500).json({ ok: false, error: "python_failed", stderr: r.stderr });
-  res.json(JSON.parse(r.stdout));
+app.post("/auto-flag", async (req, res) => {
+  try {
+    res.json(await callWorker("auto_flag.set", { auto_flag: req.body.auto_flag }));
+  } catch (err) {
+    workerError(res, err);
+  }
 });
 
 // --- static files ---
@@ -344,6 +319,7 @@ app.use(express.static(path.join(ROOT, "ui")));
 console.log("Serving static files from:", path.join(ROOT, "ui"));
 
 // --- listen ---
+worker = startWorker();
 app.listen(3011, () =>
   console.log(`Grid API on http://0.0.0.0:3011 (DB: ${DB_PATH_GRID})`)
 );
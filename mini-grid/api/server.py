@@ -1,17 +1,42 @@
 # server.py
-# FastAPI server that exposes /api/promote and /api/sync for Life‑Support Mini
+# FastAPI server that exposes /api/promote (+ /api/promote/batch) and /api/sync for Life‑Support Mini
 # Requires: Python 3.12, fastapi, uvicorn
 #
 # Run:
 #   set LS_MINI_DB_PATH=E:\life-support-mini\db\mini.db
 #   set LS_SYNC_BAT=E:\the new Bat\life-support-mini\tools\import_export_sync.bat
 #   set LS_SYNC_CWD=E:\the new Bat\life-support-mini\tools
+#   set LS_SYNC_TIMEOUT_S=1800   (optional; a sync batch is killed after this long)
+#   set LS_OUTBOX_NOTIFY=127.0.0.1:3099  (optional; where poller/outbox_dispatcher.py listens)
+#   (connection pool / pragma knobs: see db_pool.py; page cache: see prospect_page.py;
+#    seek queue lease/backoff: see ../sync/seek_queue.py)
+#
+# Sync runs in the background: POST /api/sync -> run_id, then
+#   GET /api/sync/{run_id}          progress (sync_runs row + live counters)
+#   GET /api/sync/{run_id}/log      live log as server-sent events
+#   POST /api/sync/{run_id}/cancel
+#
+# Seek work queue over records.to_seek (agents lease due records):
+#   POST /api/queue/claim  {"agent_id", "n", "lease_s"?}   -> {"items": [...]}
+#   POST /api/queue/complete  {"agent_id", "guids"}
+#   POST /api/queue/fail      {"agent_id", "guids", "error"?, "retry"?}
+#   GET  /api/queue/stats
+#
+# Geo lookups (tools/geo_service.py, cached in memory, ETag + 304):
+#   GET /geo/countries   GET /geo/cities/{cc}   GET /geo/version
 #   py -3.12 -m uvicorn server:app --host 0.0.0.0 --port 3000
 #
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import sqlite3, os, subprocess, pathlib, time
+import asyncio, json, os, pathlib, signal, socket, sys, time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from db_pool import Pool
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "sync"))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "tools"))
+import seek_queue
+from geo_service import GeoCache, MAX_AGE as GEO_MAX_AGE
 
 DB_PATH = os.environ.get("LS_MINI_DB_PATH", "mini.db")
 CITY_ID = os.environ.get("LS_CITY_ID", "DE-BER-1101")
@@ -21,118 +46,57 @@ WORK_DIR = os.environ.get("LS_SYNC_CWD", str(pathlib.Path(BAT_PATH).parent))
 HAS_MAIN_DATA = os.environ.get("LS_HAS_MAIN_DATA", "0") == "1"  # 1 = promote locally; 0 = forward to mini-main
 
 
-def get_db():
-    p = pathlib.Path(DB_PATH)
-    return sqlite3.connect(p)
+POOL = Pool(pathlib.Path(DB_PATH))
 
 def iso_now():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-app = FastAPI(title="Life‑Support Mini API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app):
+    init_schema()  # one-time DDL, kept out of the request handlers
+    yield
+
+app = FastAPI(title="Life‑Support Mini API", version="1.0.0", lifespan=lifespan)
 
 # ---------- Printable Prospect page ----------
-from fastapi.responses import HTMLResponse
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
+from prospect_page import ASSETS, CACHE as PAGE_CACHE, not_modified, prospect_page
 
 @app.get("/prospect/{gat_id}/{city_id}/{company_id}", response_class=HTMLResponse)
-def prospect_view(gat_id: str, city_id: str, company_id: str):
+def prospect_view(gat_id: str, city_id: str, company_id: str, request: Request):
     if city_id != CITY_ID: raise HTTPException(status_code=404, detail="Prospect not found")
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    p = conn.execute(
-        "SELECT * FROM prospects WHERE gat_id=? AND city_id=? AND company_id=?",
-        (gat_id, city_id, company_id)
-    ).fetchone()
-    contacts = conn.execute(
-        "SELECT contact_name, role_title, email, phone, COALESCE(notes,'') AS notes "
-        "FROM contact_grid WHERE gat_id=? AND city_id=? AND company_id=? "
-        "ORDER BY contact_id DESC",
-        (gat_id, city_id, company_id)
-    ).fetchall()
-    conn.close()
-
-    if not p:
+    with POOL.read() as conn:
+        page = prospect_page(conn, gat_id, city_id, company_id)
+    if page is None:
         raise HTTPException(status_code=404, detail="Prospect not found")
-
-    def esc(x):
-        return (x or "").replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
-
-    contact_rows = "".join(
-        f"<tr><td>{esc(c['contact_name'])}</td>"
-        f"<td>{esc(c['role_title'])}</td>"
-        f"<td>{esc(c['email'])}</td>"
-        f"<td>{esc(c['phone'])}</td>"
-        f"<td>{esc(c['notes'])}</td></tr>"
-        for c in contacts
-    ) or "<tr><td colspan='5' style='text-align:center;color:#666'>No contacts yet</td></tr>"
-
-    html = f"""<!doctype html>
-<meta charset="utf-8">
-<title>Prospect • {esc(p['prospect_name'])}</title>
-<style>
-  body{{font:14px system-ui,Segoe UI,Arial; margin:24px; color:#111}}
-  h1{{margin:0 0 6px}}
-  .meta{{color:#555; margin:0 0 18px}}
-  table{{border-collapse:collapse; width:100%; margin-top:10px}}
-  th,td{{border:1px solid #ddd; padding:8px; vertical-align:top}}
-  th{{background:#f6f6f6; text-align:left}}
-  .actions{{margin:14px 0 6px}}
-  .btn{{padding:8px 12px; border:1px solid #888; border-radius:6px; background:#fafafa; cursor:pointer}}
-  #msg{{margin-left:10px}}
-  @media print{{ .noprint{{display:none}} body{{margin:12mm}} }}
-</style>
-
-<h1>Prospect</h1>
-<p class="meta">
-  <b>GAT</b> {esc(p['gat_id'])} •
-  <b>City</b> {esc(p['city_id'])} •
-  <b>Company</b> {esc(p['company_id'])}<br>
-  <b>Name</b> {esc(p['prospect_name'])}<br>
-  <b>Status</b> {esc(p['lifecycle_status'] or '')} •
-  <b>Created</b> {esc(p['created_at'] or '')} •
-  <b>Updated</b> {esc(p['updated_at'] or '')}
-</p>
-
-<h3>Contacts</h3>
-<table>
-  <thead><tr><th>Name</th><th>Role</th><th>Email</th><th>Phone</th><th>Notes</th></tr></thead>
-  <tbody>{contact_rows}</tbody>
-</table>
-
-<div class="actions noprint">
-  <button class="btn" id="promote">Promote to Sponsor</button>
-  <button class="btn" onclick="window.print()">Print</button>
-  <span id="msg"></span>
-</div>
-
-<script>
-  const trio = {{gat_id: {gat_id!r}, city_id: {city_id!r}, company_id: {company_id!r}}};
-  const btn = document.getElementById('promote');
-  const msg = document.getElementById('msg');
-  btn.onclick = async () => {{
-    msg.textContent = 'Promoting...';
-    try {{
-      const r = await fetch('/api/promote', {{
-        method: 'POST',
-        headers: {{'Content-Type':'application/json'}},
-        body: JSON.stringify(trio)
-      }});
-      const data = await r.json();
-      if (data.forwarded) {{
-        msg.textContent = "Forwarded to mini-main (outbox #" + data.outbox_id + ")";
-      }} else if (data.contract_date) {{
-        msg.textContent = "OK — contract: " + data.contract_date + ", expires: " + data.expiration_date;
-      }} else {{
-        msg.textContent = "Error " + r.status + ": " + (data.detail || JSON.stringify(data));
-      }}
-    }} catch(e) {{
-      msg.textContent = 'Network error: ' + e;
-    }}
-  }};
-</script>
-
-"""
-    return HTMLResponse(html)
-
+    body, etag = page
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request.headers, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+@app.get("/static/{name}")
+def static_asset(name: str, request: Request):
+    a = ASSETS.get(name)
+    if a is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    headers = {"ETag": a.etag, "Last-Modified": a.last_modified, "Cache-Control": "public, max-age=3600"}
+    if not_modified(request.headers, a.etag, a.mtime):
+        return Response(status_code=304, headers=headers)
+    return Response(a.body, media_type=a.media_type, headers=headers)
+
+
+OUTBOX_NOTIFY = os.environ.get("LS_OUTBOX_NOTIFY", "127.0.0.1:3099")
+
+def notify_outbox():
+    """Wake poller/outbox_dispatcher.py; a lost datagram only delays it to its idle timer."""
+    host, port = OUTBOX_NOTIFY.rsplit(":", 1)
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.sendto(b"1", (host, int(port)))
+    except OSError:
+        pass
 
 class PromoteIn(BaseModel):
     gat_id: str
@@ -144,39 +108,23 @@ def promote(payload: PromoteIn):
     if payload.city_id != CITY_ID:
         raise HTTPException(status_code=404, detail="Prospect not found")
 
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
-        # If this Mini does NOT hold main data locally → forward to mini-main (outbox), do NOT modify tables
-        if not HAS_MAIN_DATA:
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS promotion_outbox (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                gat_id TEXT NOT NULL,
-                city_id TEXT NOT NULL,
-                company_id TEXT NOT NULL,
-                prospect_name TEXT,
-                payload_json TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'pending',
-                created_at TEXT NOT NULL DEFAULT (DATETIME('now')),
-                forwarded_at TEXT
-            )""")
+    # If this Mini does NOT hold main data locally → forward to mini-main (outbox), do NOT modify tables
+    if not HAS_MAIN_DATA:
+        with POOL.write() as conn:
             row = conn.execute("""SELECT prospect_name FROM prospects
                                    WHERE gat_id=? AND city_id=? AND company_id=?""",
                                    (payload.gat_id, payload.city_id, payload.company_id)).fetchone()
             prospect_name = row["prospect_name"] if row else None
-            import json as _json
             cur = conn.execute("""INSERT INTO promotion_outbox
                  (gat_id, city_id, company_id, prospect_name, payload_json)
                  VALUES (?,?,?,?,?)""",
                  (payload.gat_id, payload.city_id, payload.company_id,
-                  prospect_name, _json.dumps(payload.model_dump())))
-            conn.commit()
-            return {"forwarded": True, "outbox_id": cur.lastrowid, "to": "mini-main"}
+                  prospect_name, json.dumps(payload.model_dump())))
+        notify_outbox()  # after COMMIT, so the dispatcher sees the row
+        return {"forwarded": True, "outbox_id": cur.lastrowid, "to": "mini-main"}
 
+    with POOL.write() as conn:
         # Otherwise (HAS_MAIN_DATA = True) → do the local transfer to sponsors + archive prospect
-        conn.isolation_level = None  # manual transaction
-        conn.execute("BEGIN")
         row = conn.execute("""SELECT prospect_name FROM prospects
                               WHERE gat_id=? AND city_id=? AND company_id=?""",
                               (payload.gat_id, payload.city_id, payload.company_id)).fetchone()
@@ -197,16 +145,67 @@ def promote(payload: PromoteIn):
         dates = conn.execute("""SELECT contract_date, expiration_date
                                 FROM sponsors WHERE gat_id=? AND city_id=? AND company_id=?""",
                                 (payload.gat_id, payload.city_id, payload.company_id)).fetchone()
-        conn.execute("COMMIT")
         return {"forwarded": False, "contract_date": dates[0], "expiration_date": dates[1]}
-    except Exception:
-        try:
-            conn.execute("ROLLBACK")
-        except:
-            pass
-        raise
-    finally:
-        conn.close()
+
+class PromoteBatchIn(BaseModel):
+    items: list[PromoteIn]
+
+PROMOTE_BATCH_MAX = int(os.environ.get("LS_PROMOTE_BATCH_MAX", "5000"))
+
+# The batch arrives as one JSON parameter and is read with json_each, so every
+# step below is a single set-based statement over all trios.
+BATCH_CTE = """WITH b(gat_id, city_id, company_id) AS (
+    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+    FROM json_each(:batch))"""
+
+@app.post("/api/promote/batch")
+def promote_batch(payload: PromoteBatchIn):
+    """Promote many trios in one transaction. Results come back in request order,
+    one per item: the same fields /api/promote returns, or ok=false with an error."""
+    if len(payload.items) > PROMOTE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {PROMOTE_BATCH_MAX} items per batch")
+    trios = [(i.gat_id, i.city_id, i.company_id) for i in payload.items]
+    ours = list(dict.fromkeys(t for t in trios if t[1] == CITY_ID))  # de-duplicated, this city only
+    params = {"batch": json.dumps(ours)}
+
+    with POOL.write() as conn:
+        if not HAS_MAIN_DATA:
+            rows = conn.execute(BATCH_CTE + """
+                INSERT INTO promotion_outbox (gat_id, city_id, company_id, prospect_name, payload_json)
+                SELECT b.gat_id, b.city_id, b.company_id, p.prospect_name,
+                       json_object('gat_id', b.gat_id, 'city_id', b.city_id, 'company_id', b.company_id)
+                FROM b LEFT JOIN prospects p
+                  ON p.gat_id=b.gat_id AND p.city_id=b.city_id AND p.company_id=b.company_id
+                RETURNING id, gat_id, city_id, company_id""", params).fetchall()
+            done = {(r["gat_id"], r["city_id"], r["company_id"]):
+                    {"ok": True, "forwarded": True, "outbox_id": r["id"], "to": "mini-main"} for r in rows}
+        else:
+            conn.execute(BATCH_CTE + """
+                INSERT OR IGNORE INTO sponsors
+                    (gat_id, city_id, company_id, sponsor_name, contract_date, expiration_date)
+                SELECT p.gat_id, p.city_id, p.company_id, p.prospect_name, DATE('now'), DATE('now','+1 year')
+                FROM b JOIN prospects p
+                  ON p.gat_id=b.gat_id AND p.city_id=b.city_id AND p.company_id=b.company_id""", params)
+            conn.execute(BATCH_CTE + """
+                UPDATE prospects
+                SET lifecycle_status='archived', archived_at=DATE('now'), updated_at=CURRENT_TIMESTAMP
+                WHERE (gat_id, city_id, company_id) IN (SELECT gat_id, city_id, company_id FROM b)""", params)
+            rows = conn.execute(BATCH_CTE + """
+                SELECT b.gat_id, b.city_id, b.company_id, s.contract_date, s.expiration_date
+                FROM b JOIN prospects p
+                  ON p.gat_id=b.gat_id AND p.city_id=b.city_id AND p.company_id=b.company_id
+                JOIN sponsors s
+                  ON s.gat_id=b.gat_id AND s.city_id=b.city_id AND s.company_id=b.company_id""", params).fetchall()
+            done = {(r["gat_id"], r["city_id"], r["company_id"]):
+                    {"ok": True, "forwarded": False, "contract_date": r["contract_date"],
+                     "expiration_date": r["expiration_date"]} for r in rows}
+    if not HAS_MAIN_DATA and done:
+        notify_outbox()
+
+    missing = {"ok": False, "error": "Prospect not found"}
+    results = [dict(zip(("gat_id", "city_id", "company_id"), t), **done.get(t, missing)) for t in trios]
+    ok = sum(r["ok"] for r in results)
+    return {"ok": ok == len(results), "promoted": ok, "failed": len(results) - ok, "results": results}
 
 # --- Simple sync run (logs to file) ---
 from pathlib import Path
@@ -230,77 +229,306 @@ def cleanup_old_logs():
                 child.unlink(missing_ok=True)
             day_dir.rmdir()
 
-@app.post("/api/sync")
-def sync():
-    ensure_dir(LOG_BASE)
-    cleanup_old_logs()
-    day_dir = LOG_BASE / datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    ensure_dir(day_dir)
-    log_path = day_dir / f"sync_{datetime.now(timezone.utc).strftime('%Y-%m-%d_%H%M%S')}.log"
-
-    # create table if not exists
-    conn = get_db()
-    conn.execute("""CREATE TABLE IF NOT EXISTS sync_runs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        started_at TEXT NOT NULL,
-        ended_at   TEXT,
-        status     TEXT NOT NULL,
-        exit_code  INTEGER,
-        bytes_written INTEGER NOT NULL DEFAULT 0,
-        log_path   TEXT NOT NULL,
-        summary    TEXT
-    )""")
-    conn.commit()
-    started_at = iso_now()
-    cur = conn.execute("INSERT INTO sync_runs (started_at, status, log_path, summary) VALUES (?, 'error', ?, 'running')",
-                       (started_at, str(log_path)))
-    run_id = cur.lastrowid
-    conn.commit()
-
-    with open(log_path, "wb") as f:
-        f.write(f"[SYNC START] {started_at}\nBAT: {BAT_PATH}\nCWD: {WORK_DIR}\n\n".encode())
-
+SYNC_TIMEOUT_S = float(os.environ.get("LS_SYNC_TIMEOUT_S", "1800"))
+
+# run_id -> live state of runs started by this process, dropped once a run has
+# ended and no log tailer is left on it (the durable record is sync_runs)
+RUNS = {}
+_sync_lock = asyncio.Lock()
+_active_run = None
+_has_seek_queue = False
+
+def init_schema():
+    global _has_seek_queue
+    with POOL.write() as conn:
+        _has_seek_queue = seek_queue.ensure_schema(conn)
+        conn.execute("""CREATE TABLE IF NOT EXISTS sync_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            ended_at   TEXT,
+            status     TEXT NOT NULL,
+            exit_code  INTEGER,
+            bytes_written INTEGER NOT NULL DEFAULT 0,
+            log_path   TEXT NOT NULL,
+            summary    TEXT
+        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS promotion_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            gat_id TEXT NOT NULL,
+            city_id TEXT NOT NULL,
+            company_id TEXT NOT NULL,
+            prospect_name TEXT,
+            payload_json TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT NOT NULL DEFAULT (DATETIME('now')),
+            forwarded_at TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL,
+            last_error TEXT
+        )""")
+
+def _sync_runs_write(sql, params):
+    with POOL.write() as conn:
+        return conn.execute(sql, params).lastrowid
+
+def _sync_argv():
+    if os.name == "nt":
+        return [os.environ.get("COMSPEC", "cmd.exe"), "/c", BAT_PATH]
+    return [BAT_PATH]
+
+async def _kill(proc):
+    if proc.returncode is not None:
+        return
+    if os.name == "nt":  # the .bat runs under cmd.exe; take its children down too
+        k = await asyncio.create_subprocess_exec("taskkill", "/PID", str(proc.pid), "/T", "/F",
+                                                 stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await k.wait()
+    else:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+def _release(run_id):
+    """Forget a finished run nobody is tailing; readers fall back to sync_runs."""
+    run = RUNS.get(run_id)
+    if run and not run["running"] and not run["tailers"]:
+        del RUNS[run_id]
+
+def wake(run):
+    """Wake every log tailer of this run (each waits on the event current when it last read)."""
+    ev, run["changed"] = run["changed"], asyncio.Event()
+    ev.set()
+
+async def _run_sync(run_id, log_path, started_at):
+    """Run the batch, logging to log_path. Whatever happens (the log can't be opened,
+    the task is cancelled mid-spawn, the final sync_runs write fails) the finally
+    block marks the run finished and frees the slot for the next POST /api/sync."""
+    global _active_run
+    run = RUNS[run_id]
+    code, summary, ended_at = -1, "failed", None
+    try:
+        with open(log_path, "wb") as f:
+            def emit(b):
+                f.write(b); f.flush()
+                run["bytes"] += len(b)
+                wake(run)
+            emit(f"[SYNC START] {started_at}\nBAT: {BAT_PATH}\nCWD: {WORK_DIR}\n\n".encode())
+            try:
+                proc = await asyncio.create_subprocess_exec(*_sync_argv(), cwd=WORK_DIR,
+                                                            stdout=asyncio.subprocess.PIPE,
+                                                            stderr=asyncio.subprocess.STDOUT,
+                                                            start_new_session=(os.name != "nt"))
+            except Exception as e:
+                emit(f"[spawn error] {e}\n".encode())
+                summary = "spawn error"
+            else:
+                run["proc"] = proc
+                async def pump():
+                    async for line in proc.stdout:
+                        emit(line)
+                        run["lines"] += 1
+                    return await proc.wait()
+                try:
+                    code = await asyncio.wait_for(pump(), timeout=SYNC_TIMEOUT_S)
+                    summary = "ok" if code == 0 else "error"
+                except asyncio.TimeoutError:
+                    await _kill(proc)
+                    summary = "timeout"
+                except asyncio.CancelledError:
+                    await _kill(proc)
+                    summary = "cancelled"
+                if summary in ("timeout", "cancelled"):
+                    code = await proc.wait()
+                    emit(f"\n[SYNC {summary.upper()}]".encode())
+            ended_at = iso_now()
+            emit(f"\n[SYNC END] {ended_at}  exit={code}\n".encode())
+    except asyncio.CancelledError:
+        summary = "cancelled"
+        if run["proc"] is not None:
+            await _kill(run["proc"])
+        raise
+    except Exception as e:
+        summary = f"failed: {e}"
+    finally:
+        status = "ok" if summary == "ok" else "error"
+        run.update(running=False, status=status, summary=summary, exit_code=code)
+        _active_run = None
+        wake(run)
         try:
-            proc = subprocess.Popen(f'"{BAT_PATH}"', shell=True, cwd=WORK_DIR,
-                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            await asyncio.to_thread(_sync_runs_write,
+                                    """UPDATE sync_runs SET ended_at=?, status=?, exit_code=?, bytes_written=?, summary=?
+                                       WHERE id=?""",
+                                    (ended_at or iso_now(), status, code, run["bytes"], summary, run_id))
         except Exception as e:
-            msg = f"[spawn error] {e}\n".encode()
-            f.write(msg)
-            conn.execute("UPDATE sync_runs SET ended_at=?, status=?, exit_code=?, bytes_written=?, summary=? WHERE id=?",
-                         (iso_now(), "error", -1, f.tell(), "spawn error", run_id))
-            conn.commit()
-            conn.close()
-            raise HTTPException(status_code=500, detail=str(e))
-
-        # stream output
-        out_bytes = 0
-        for chunk in iter(lambda: proc.stdout.readline(), b""):
-            if not chunk:
-                break
-            f.write(chunk)
-            out_bytes += len(chunk)
-        code = proc.wait()
-        ended_at = iso_now()
-        f.write(f"\n[SYNC END] {ended_at}  exit={code}\n".encode())
-
-    status = "ok" if code == 0 else "error"
-    conn.execute("""UPDATE sync_runs
-                    SET ended_at=?, status=?, exit_code=?, bytes_written=?, summary=?
-                    WHERE id=?""",
-                 (ended_at, status, code, (log_path.stat().st_size if log_path.exists() else out_bytes), status, run_id))
-    conn.commit()
-    conn.close()
-    return {"ok": status == "ok", "code": code, "run_id": run_id, "log_path": str(log_path)}
+            print(f"sync run {run_id}: could not record its end in sync_runs: {e}", file=sys.stderr)
+        _release(run_id)
+
+@app.post("/api/sync", status_code=202)
+async def sync():
+    """Start the sync batch in the background and return its run_id straight away.
+    Only one run at a time; a second POST while one is going gets 409 with its id."""
+    global _active_run
+    async with _sync_lock:
+        if _active_run is not None:
+            raise HTTPException(status_code=409, detail={"error": "sync_running", "run_id": _active_run})
+        ensure_dir(LOG_BASE)
+        cleanup_old_logs()
+        day_dir = LOG_BASE / datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        ensure_dir(day_dir)
+        log_path = day_dir / f"sync_{datetime.now(timezone.utc).strftime('%Y-%m-%d_%H%M%S')}.log"
+        started_at = iso_now()
+        run_id = await asyncio.to_thread(_sync_runs_write,
+                                         "INSERT INTO sync_runs (started_at, status, log_path, summary) VALUES (?, 'error', ?, 'running')",
+                                         (started_at, str(log_path)))
+        RUNS[run_id] = {"running": True, "bytes": 0, "lines": 0, "proc": None, "log_path": log_path,
+                        "t0": time.monotonic(), "changed": asyncio.Event(), "tailers": 0}
+        _active_run = run_id
+        RUNS[run_id]["task"] = asyncio.create_task(_run_sync(run_id, log_path, started_at))
+    return {"ok": True, "run_id": run_id, "status": "running", "log_path": str(log_path)}
+
+@app.get("/api/sync/{run_id:int}")
+def sync_status(run_id: int):
+    with POOL.read() as conn:
+        row = conn.execute("""SELECT id, started_at, ended_at, status, exit_code, bytes_written, log_path, summary
+                              FROM sync_runs WHERE id=?""", (run_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Sync run not found")
+    out = dict(row)
+    run = RUNS.get(run_id)
+    out["running"] = bool(run and run["running"])
+    if run:
+        out.update(bytes_written=run["bytes"], lines=run["lines"],
+                   elapsed_s=round(time.monotonic() - run["t0"], 1))
+    return out
+
+@app.get("/api/sync/{run_id:int}/log")
+async def sync_log(run_id: int):
+    """Server-sent events: the log so far, then new lines as the batch writes them,
+    then an `end` event once the run has finished."""
+    run = RUNS.get(run_id)
+    if run:
+        log_path = run["log_path"]
+    else:
+        with POOL.read() as conn:
+            row = conn.execute("SELECT log_path FROM sync_runs WHERE id=?", (run_id,)).fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Sync run not found")
+        log_path = Path(row["log_path"])
+
+    async def events():
+        if run:
+            run["tailers"] += 1
+        try:
+            pos = 0
+            while True:
+                done = not (run and run["running"])
+                changed = run["changed"] if run else None
+                try:
+                    with open(log_path, "rb") as f:
+                        f.seek(pos)
+                        data = f.read()
+                except FileNotFoundError:
+                    data = b""
+                pos += len(data)
+                for line in data.decode("utf-8", "replace").splitlines():
+                    yield f"data: {line}\n\n"
+                if done:
+                    status = await asyncio.to_thread(sync_status, run_id)
+                    yield f"event: end\ndata: {json.dumps(status)}\n\n"
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            if run:
+                run["tailers"] -= 1
+                _release(run_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/sync/{run_id:int}/cancel")
+async def sync_cancel(run_id: int):
+    run = RUNS.get(run_id)
+    if not run or not run["running"]:
+        raise HTTPException(status_code=409, detail="Sync run is not running")
+    run["task"].cancel()
+    try:
+        await run["task"]
+    except asyncio.CancelledError:
+        pass
+    return {"ok": True, "run_id": run_id, "summary": run.get("summary")}
 
 @app.get("/api/sync/last")
 def sync_last():
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    row = conn.execute("""SELECT id, started_at, ended_at, status, exit_code, bytes_written, log_path, summary
-                          FROM sync_runs ORDER BY started_at DESC LIMIT 1""").fetchone()
-    conn.close()
+    with POOL.read() as conn:
+        row = conn.execute("""SELECT id, started_at, ended_at, status, exit_code, bytes_written, log_path, summary
+                              FROM sync_runs ORDER BY started_at DESC LIMIT 1""").fetchone()
     return dict(row) if row else None
 
+# ---------- Geo lookups ----------
+GEO = GeoCache(DB_PATH)
+
+def _geo_reply(request: Request, body):
+    headers = {"ETag": body.etag, "Cache-Control": f"public, max-age={GEO_MAX_AGE}, must-revalidate"}
+    if not_modified(request.headers, body.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body.body, media_type="application/json", headers=headers)
+
+@app.get("/geo/countries")
+def geo_countries(request: Request):
+    return _geo_reply(request, GEO.countries())
+
+@app.get("/geo/cities/{cc}")
+def geo_cities(cc: str, request: Request):
+    if len(cc) != 2:
+        raise HTTPException(status_code=400, detail="cc must be a 2-letter country code")
+    return _geo_reply(request, GEO.cities(cc))
+
+@app.get("/geo/version")
+def geo_version(request: Request):
+    return _geo_reply(request, GEO.info())
+
+# ---------- Seek work queue ----------
+class ClaimIn(BaseModel):
+    agent_id: str
+    n: int = 1
+    lease_s: float | None = None
+
+class CompleteIn(BaseModel):
+    agent_id: str
+    guids: list[str]
+
+class FailIn(CompleteIn):
+    error: str | None = None
+    retry: bool = True
+
+def _seek_queue_write(fn, *args, **kw):
+    if not _has_seek_queue:
+        raise HTTPException(status_code=503, detail="No records table in this database")
+    with POOL.write() as conn:
+        return fn(conn, *args, **kw)
+
+@app.post("/api/queue/claim")
+def queue_claim(payload: ClaimIn):
+    """Lease up to n due records (max seek_queue.CLAIM_MAX) to agent_id."""
+    return {"items": _seek_queue_write(seek_queue.claim, payload.agent_id, payload.n, payload.lease_s)}
+
+@app.post("/api/queue/complete")
+def queue_complete(payload: CompleteIn):
+    return _seek_queue_write(seek_queue.complete, payload.agent_id, payload.guids)
+
+@app.post("/api/queue/fail")
+def queue_fail(payload: FailIn):
+    return _seek_queue_write(seek_queue.fail, payload.agent_id, payload.guids, payload.error, retry=payload.retry)
+
+@app.get("/api/queue/stats")
+def queue_stats():
+    if not _has_seek_queue:
+        raise HTTPException(status_code=503, detail="No records table in this database")
+    with POOL.read() as conn:
+        return seek_queue.stats(conn)
+
 @app.get("/api/health")
 def health():
-    return {"ok": True, "db_path": str(pathlib.Path(DB_PATH).resolve())}
+    return {"ok": True, "db_path": str(pathlib.Path(DB_PATH).resolve()), "pool": POOL.stats(),
+            "page_cache": PAGE_CACHE.stats()}
@@ -0,0 +1,29 @@
+// Promote / Print actions for the printable prospect page.
+// The trio comes from data-* attributes on #prospect so this file stays static.
+(() => {
+  const d = document.getElementById('prospect').dataset;
+  const trio = {gat_id: d.gatId, city_id: d.cityId, company_id: d.companyId};
+  const btn = document.getElementById('promote');
+  const msg = document.getElementById('msg');
+  document.getElementById('print').onclick = () => window.print();
+  btn.onclick = async () => {
+    msg.textContent = 'Promoting...';
+    try {
+      const r = await fetch('/api/promote', {
+        method: 'POST',
+        headers: {'Content-Type':'application/json'},
+        body: JSON.stringify(trio)
+      });
+      const data = await r.json();
+      if (data.forwarded) {
+        msg.textContent = "Forwarded to mini-main (outbox #" + data.outbox_id + ")";
+      } else if (data.contract_date) {
+        msg.textContent = "OK — contract: " + data.contract_date + ", expires: " + data.expiration_date;
+      } else {
+        msg.textContent = "Error " + r.status + ": " + (data.detail || JSON.stringify(data));
+      }
+    } catch(e) {
+      msg.textContent = 'Network error: ' + e;
+    }
+  };
+})();
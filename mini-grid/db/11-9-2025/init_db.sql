@@ -19,6 +19,9 @@ CREATE TABLE IF NOT EXISTS records (
   next_action_at TEXT,
   last_attempt_at TEXT,
   attempts INTEGER NOT NULL DEFAULT 0,
+  claimed_by TEXT,                                     -- seek queue lease (sync/seek_queue.py)
+  lease_until TEXT,
+  last_error TEXT,
   version INTEGER NOT NULL DEFAULT 0,
   created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ','now')),
   updated_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ','now'))
@@ -27,9 +30,18 @@ CREATE TABLE IF NOT EXISTS records (
 CREATE INDEX IF NOT EXISTS idx_records_guid ON records(guid);
 CREATE INDEX IF NOT EXISTS idx_records_hash ON records(content_hash);
 CREATE INDEX IF NOT EXISTS idx_records_seek ON records(to_seek, seek_status, seek_priority, next_action_at);
+-- seek queue: claimable rows per priority in due order, and running leases
+CREATE INDEX IF NOT EXISTS idx_records_seek_due ON records(seek_priority, IFNULL(next_action_at, ''), id)
+  WHERE to_seek=1 AND seek_status='queued';
+CREATE INDEX IF NOT EXISTS idx_records_seek_lease ON records(lease_until)
+  WHERE seek_status='in_progress';
 CREATE INDEX IF NOT EXISTS idx_records_owner ON records(owner_agent_id);
+CREATE INDEX IF NOT EXISTS idx_records_updated ON records(updated_at);
+CREATE INDEX IF NOT EXISTS idx_records_status_updated ON records(seek_status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_records_owner_updated ON records(owner_agent_id, updated_at);
 
--- auto-update updated_at
+-- auto-update updated_at (seek_queue.ensure_schema swaps in a version that skips
+-- updates to node-local seek lease state only)
 CREATE TRIGGER IF NOT EXISTS trg_records_updated_at
 AFTER UPDATE ON records
 FOR EACH ROW
@@ -50,6 +62,7 @@ CREATE TABLE IF NOT EXISTS record_notes (
   FOREIGN KEY(record_guid) REFERENCES records(guid) ON DELETE CASCADE
 );
 CREATE INDEX IF NOT EXISTS idx_record_notes_record ON record_notes(record_guid);
+CREATE INDEX IF NOT EXISTS idx_record_notes_updated ON record_notes(updated_at);
 
 CREATE TRIGGER IF NOT EXISTS trg_record_notes_updated_at
 AFTER UPDATE ON record_notes
@@ -101,6 +114,9 @@ BEGIN
 END;
 
 -- ===== change log =====
+-- filled by trg_<table>_changes_ai/au/ad on the sync tables, which
+-- life_support_api.py (ensure_change_capture) generates from the live columns;
+-- read by "export --scope changes", pruned by "compact"
 CREATE TABLE IF NOT EXISTS change_log (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   entity TEXT NOT NULL,
@@ -113,6 +129,17 @@ CREATE TABLE IF NOT EXISTS change_log (
 );
 CREATE INDEX IF NOT EXISTS idx_change_log_entity ON change_log(entity, entity_guid, version);
 
+-- ===== peer acks =====
+-- (version, content_hash) each peer has sent us per record; delta exports skip
+-- records that still match, so imported rows are not echoed back to their sender
+CREATE TABLE IF NOT EXISTS peer_acks (
+  peer TEXT NOT NULL,
+  guid TEXT NOT NULL,
+  version INTEGER,
+  content_hash TEXT NOT NULL,
+  PRIMARY KEY (peer, guid)
+) WITHOUT ROWID;
+
 -- ===== inbox/outbox =====
 CREATE TABLE IF NOT EXISTS outbox (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -126,12 +153,18 @@ CREATE TABLE IF NOT EXISTS inbox (
   bundle_guid TEXT NOT NULL,
   status TEXT CHECK(status IN ('received','applied','error')) DEFAULT 'received',
   created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ','now')),
-  error TEXT
+  error TEXT,
+  producer TEXT,                              -- bundle import progress (life_support_api.py)
+  file TEXT,
+  chunks_total INTEGER,
+  chunks_applied INTEGER NOT NULL DEFAULT 0,  -- v2 bundles resume at this chunk
+  applied_at TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_inbox_bundle ON inbox(bundle_guid, producer);
 
 -- ===== views =====
 CREATE VIEW IF NOT EXISTS v_seek_queue AS
-SELECT guid, source_name, source_url, seek_priority, seek_status, next_action_at
+SELECT guid, source_name, source_url, seek_priority, seek_status, next_action_at, attempts, claimed_by, lease_until
 FROM records
 WHERE to_seek=1 AND seek_status IN ('queued','in_progress')
 ORDER BY COALESCE(next_action_at,'9999-12-31'), seek_priority DESC, guid;
@@ -127,23 +127,67 @@ BEGIN
       AND NOT EXISTS (SELECT 1 FROM prospects WHERE gat_id=OLD.gat_id AND city_id=OLD.city_id AND company_id=OLD.company_id);
 END;
 
+-- =======================
+-- Materialized companies (kept by triggers; tools/companies_mat.py rebuild/verify)
+-- =======================
+CREATE TABLE IF NOT EXISTS mat_companies (
+    company_type      TEXT NOT NULL,              -- 'prospect' | 'sponsor'
+    gat_id            TEXT NOT NULL,
+    city_id           TEXT NOT NULL,
+    company_id        TEXT NOT NULL,
+    guid              TEXT NOT NULL,              -- gat_id~city_id~company_id
+    company_name      TEXT,
+    website_url       TEXT NOT NULL DEFAULT '',
+    lifecycle_status  TEXT,
+    created_at        TEXT,
+    updated_at        TEXT,
+    PRIMARY KEY (company_type, gat_id, city_id, company_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_mat_companies_name ON mat_companies (company_type, company_name COLLATE NOCASE, guid);
+CREATE INDEX IF NOT EXISTS idx_mat_companies_guid ON mat_companies (guid);
+CREATE INDEX IF NOT EXISTS idx_mat_companies_trio ON mat_companies (gat_id, city_id, company_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_prospects_ai AFTER INSERT ON prospects BEGIN
+    INSERT OR REPLACE INTO mat_companies (company_type, gat_id, city_id, company_id, guid, company_name, website_url, lifecycle_status, created_at, updated_at)
+    SELECT 'prospect', t.gat_id, t.city_id, t.company_id, t.gat_id || '~' || t.city_id || '~' || t.company_id, t.prospect_name, '', t.lifecycle_status, t.created_at, t.updated_at FROM prospects AS t WHERE t.gat_id = NEW.gat_id AND t.city_id = NEW.city_id AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_prospects_au AFTER UPDATE ON prospects BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = 'prospect' AND gat_id = OLD.gat_id AND city_id = OLD.city_id AND company_id = OLD.company_id;
+    INSERT OR REPLACE INTO mat_companies (company_type, gat_id, city_id, company_id, guid, company_name, website_url, lifecycle_status, created_at, updated_at)
+    SELECT 'prospect', t.gat_id, t.city_id, t.company_id, t.gat_id || '~' || t.city_id || '~' || t.company_id, t.prospect_name, '', t.lifecycle_status, t.created_at, t.updated_at FROM prospects AS t WHERE t.gat_id = NEW.gat_id AND t.city_id = NEW.city_id AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_prospects_ad AFTER DELETE ON prospects BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = 'prospect' AND gat_id = OLD.gat_id AND city_id = OLD.city_id AND company_id = OLD.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_sponsors_ai AFTER INSERT ON sponsors BEGIN
+    INSERT OR REPLACE INTO mat_companies (company_type, gat_id, city_id, company_id, guid, company_name, website_url, lifecycle_status, created_at, updated_at)
+    SELECT 'sponsor', t.gat_id, t.city_id, t.company_id, t.gat_id || '~' || t.city_id || '~' || t.company_id, t.sponsor_name, '', 'n/a', t.created_at, t.updated_at FROM sponsors AS t WHERE t.gat_id = NEW.gat_id AND t.city_id = NEW.city_id AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_sponsors_au AFTER UPDATE ON sponsors BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = 'sponsor' AND gat_id = OLD.gat_id AND city_id = OLD.city_id AND company_id = OLD.company_id;
+    INSERT OR REPLACE INTO mat_companies (company_type, gat_id, city_id, company_id, guid, company_name, website_url, lifecycle_status, created_at, updated_at)
+    SELECT 'sponsor', t.gat_id, t.city_id, t.company_id, t.gat_id || '~' || t.city_id || '~' || t.company_id, t.sponsor_name, '', 'n/a', t.created_at, t.updated_at FROM sponsors AS t WHERE t.gat_id = NEW.gat_id AND t.city_id = NEW.city_id AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_sponsors_ad AFTER DELETE ON sponsors BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = 'sponsor' AND gat_id = OLD.gat_id AND city_id = OLD.city_id AND company_id = OLD.company_id;
+END;
+
 -- =======================
 -- Views
 -- =======================
 CREATE VIEW IF NOT EXISTS ALL_COMPANIES AS
-SELECT gat_id, city_id, company_id,
-       prospect_name AS company_name,
-       'prospect'    AS company_type,
-       lifecycle_status,
-       created_at, updated_at
-FROM prospects
-UNION ALL
-SELECT gat_id, city_id, company_id,
-       sponsor_name  AS company_name,
-       'sponsor'     AS company_type,
-       'n/a'         AS lifecycle_status,
-       created_at, updated_at
-FROM sponsors;
+SELECT gat_id, city_id, company_id, company_name, company_type, lifecycle_status, created_at, updated_at
+FROM mat_companies;
 
 CREATE VIEW IF NOT EXISTS ACTIVE_PROSPECTS AS
 SELECT *
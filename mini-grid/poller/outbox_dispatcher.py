@@ -0,0 +1,270 @@
+# outbox_dispatcher.py
+# Forwards promotion_outbox rows to mini-main, replacing the 5-second curl loop
+# in poll_outbox.bat. (The bundle `outbox` table is not drained here: mini-main
+# has no endpoint that accepts bundles; they travel through the sync folders.)
+#
+# - Sleeps until there is work: server.py sends a UDP datagram to
+#   LS_OUTBOX_NOTIFY after it commits an outbox row; without one the DB is
+#   re-checked on an idle timer that doubles from --idle-min up to --idle-max.
+# - Each pass reads up to --batch due rows, POSTs them as one JSON
+#   request over a keep-alive connection, then records the outcome for the
+#   whole batch in a single transaction. /api/promote/batch answers per item;
+#   items it rejects (ok=false) go down the failure path, not 'forwarded'.
+# - Failures are retried with exponential backoff (attempts, next_attempt_at,
+#   last_error per row); after --max-attempts a row is marked 'failed'.
+# - Logs only when something was forwarded or failed; idle passes are silent.
+#
+# Same RUNNING / STOP files as before, so stop_poller.bat still works.
+#
+# Env / args:
+#   LS_MINI_DB_PATH        mini.db
+#   LS_MAIN_URL            mini-main base URL (default http://127.0.0.1:3000)
+#   LS_OUTBOX_PROMOTE_URL  default {LS_MAIN_URL}/api/promote/batch   body {"items": [{gat_id, city_id, company_id}, ...]}
+#   LS_OUTBOX_NOTIFY       host:port to listen on for wake-ups (default 127.0.0.1:3099)
+#   python outbox_dispatcher.py [--batch 200] [--idle-min 1] [--idle-max 30] [--max-attempts 10]
+
+import argparse, http.client, json, os, pathlib, socket, sqlite3, sys, time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+ROOT = pathlib.Path(os.environ.get("LS_ROOT", r"E:\life-support-mini"))
+DB_PATH = os.environ.get("LS_MINI_DB_PATH", str(ROOT / "db" / "mini.db"))
+MAIN_URL = os.environ.get("LS_MAIN_URL", "http://127.0.0.1:3000").rstrip("/")
+NOTIFY = os.environ.get("LS_OUTBOX_NOTIFY", "127.0.0.1:3099")
+
+STOP_CHECK_S = 2.0   # how often a long idle wait looks for the STOP file
+
+def log(msg):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", flush=True)
+
+# ---------- schema ----------
+
+PROMOTION_OUTBOX_DDL = """
+CREATE TABLE IF NOT EXISTS promotion_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    gat_id TEXT NOT NULL,
+    city_id TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    prospect_name TEXT,
+    payload_json TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at TEXT NOT NULL DEFAULT (DATETIME('now')),
+    forwarded_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL,
+    last_error TEXT
+)"""
+
+RETRY_COLS = {"forwarded_at": "TEXT", "attempts": "INTEGER NOT NULL DEFAULT 0",
+              "next_attempt_at": "REAL", "last_error": "TEXT"}
+
+def ensure_schema(conn):
+    """promotion_outbox as the dispatcher needs it; older DBs get the retry columns added."""
+    conn.execute(PROMOTION_OUTBOX_DDL)
+    have = {r[1] for r in conn.execute("PRAGMA table_info(promotion_outbox)")}
+    for col, decl in RETRY_COLS.items():
+        if col not in have:
+            conn.execute(f"ALTER TABLE promotion_outbox ADD COLUMN {col} {decl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_promotion_outbox_due ON promotion_outbox (status, next_attempt_at)")
+
+# ---------- queues ----------
+
+class Queue:
+    """One outbox table: how to find due rows, shape the request and mark the result.
+
+    `rejected(rows, data)` maps the id of every row the endpoint refused to its error.
+    """
+    def __init__(self, name, table, url, pending, done, failed, select, body, rejected=lambda rows, data: {}):
+        self.name, self.table, self.url = name, table, url
+        self.pending, self.done, self.failed = pending, done, failed
+        self.select, self.body, self.rejected = select, body, rejected
+
+    def due(self, conn, limit, max_attempts, now):
+        return conn.execute(
+            f"SELECT {self.select} FROM {self.table} "
+            f"WHERE status=? AND attempts < ? AND (next_attempt_at IS NULL OR next_attempt_at <= ?) "
+            f"ORDER BY id LIMIT ?", (self.pending, max_attempts, now, limit)).fetchall()
+
+    def next_due(self, conn, max_attempts):
+        row = conn.execute(f"SELECT MIN(next_attempt_at) FROM {self.table} WHERE status=? AND attempts < ?",
+                           (self.pending, max_attempts)).fetchone()
+        return row[0]
+
+def promotion_rejects(rows, data):
+    """outbox id -> error for each item /api/promote/batch answered with ok=false.
+    Its results come back one per item in request order; anything else fails the batch."""
+    results = json.loads(data or b"null")
+    results = results.get("results") if isinstance(results, dict) else None
+    if not isinstance(results, list) or len(results) != len(rows):
+        raise RuntimeError(f"expected {len(rows)} per-item results, got {data[:200].decode('utf-8', 'replace')}")
+    return {r["id"]: res.get("error") or "rejected" for r, res in zip(rows, results) if not res.get("ok")}
+
+def queues(conn):
+    return [Queue("promotions", "promotion_outbox",
+                  os.environ.get("LS_OUTBOX_PROMOTE_URL", MAIN_URL + "/api/promote/batch"),
+                  "pending", "forwarded", "failed",
+                  "id, gat_id, city_id, company_id, payload_json",
+                  lambda rows: {"items": [dict(json.loads(r["payload_json"]), outbox_id=r["id"]) for r in rows]},
+                  promotion_rejects)]
+
+# ---------- HTTP ----------
+
+class Http:
+    """Keep-alive connections, one per scheme/host/port, reopened after errors."""
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+        self._conns = {}
+
+    def post_json(self, url, obj):
+        u = urlsplit(url)
+        key = (u.scheme, u.netloc)
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        body = json.dumps(obj).encode("utf-8")
+        for attempt in (1, 2):
+            conn = self._conns.get(key)
+            reused = conn is not None
+            if conn is None:
+                cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+                conn = self._conns[key] = cls(u.netloc, timeout=self.timeout)
+            try:
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                del self._conns[key]
+                if not reused or attempt == 2:   # a reused socket may just have been closed by the server
+                    raise
+        if resp.status >= 300:
+            raise RuntimeError(f"HTTP {resp.status}: {data[:200].decode('utf-8', 'replace')}")
+        return data
+
+# ---------- dispatcher ----------
+
+class Dispatcher:
+    def __init__(self, db_path, batch=200, max_attempts=10, backoff_base=2.0, backoff_max=600.0):
+        self.conn = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=10000")
+        ensure_schema(self.conn)
+        self.queues = queues(self.conn)
+        self.http = Http()
+        self.batch, self.max_attempts = batch, max_attempts
+        self.backoff_base, self.backoff_max = backoff_base, backoff_max
+
+    def drain_once(self):
+        """One batch per queue; returns how many rows were handled (forwarded or failed)."""
+        handled = 0
+        for q in self.queues:
+            rows = q.due(self.conn, self.batch, self.max_attempts, time.time())
+            if not rows:
+                continue
+            ids = [r["id"] for r in rows]
+            t0 = time.perf_counter()
+            try:
+                errors = q.rejected(rows, self.http.post_json(q.url, q.body(rows)))
+            except Exception as e:
+                self.record(q, [], {i: f"{type(e).__name__}: {e}" for i in ids})
+                log(f"{q.name}: {len(ids)} row(s) failed -> {q.url}: {e}")
+            else:
+                done = [i for i in ids if i not in errors]
+                self.record(q, done, errors)
+                log(f"{q.name}: forwarded {len(done)} row(s) in {(time.perf_counter() - t0) * 1000:.0f} ms"
+                    + (f", {len(errors)} rejected (first: {next(iter(errors.values()))})" if errors else ""))
+            handled += len(ids)
+        return handled
+
+    def record(self, q, done, errors):
+        """Mark `done` ids forwarded and the ids in `errors` failed, in one transaction."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        # attempts counts this try; the delay doubles per attempt up to backoff_max
+        give_up = f"CASE WHEN attempts + 1 >= {int(self.max_attempts)} THEN ? ELSE status END" if q.failed else "status"
+        fail = ([q.failed] if q.failed else [])
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(f"UPDATE {q.table} SET status=?, forwarded_at=?, attempts=attempts+1, "
+                                  f"last_error=NULL, next_attempt_at=NULL WHERE id=?",
+                                  [(q.done, now, i) for i in done])
+            self.conn.executemany(f"UPDATE {q.table} SET status={give_up}, attempts=attempts+1, last_error=?, "
+                                  f"next_attempt_at = ? + MIN(? * (1 << MIN(attempts, 20)), ?) WHERE id=?",
+                                  [(*fail, err, time.time(), self.backoff_base, self.backoff_max, i)
+                                   for i, err in errors.items()])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def next_retry_in(self):
+        due = [d for d in (q.next_due(self.conn, self.max_attempts) for q in self.queues) if d is not None]
+        return max(0.0, min(due) - time.time()) if due else None
+
+def listen(addr):
+    host, port = addr.rsplit(":", 1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, int(port)))
+    return sock
+
+def wait_for_notify(sock, timeout, stop_file):
+    """Block until a datagram arrives (True), the timeout passes or STOP appears (False)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0 or stop_file.exists():
+            return False
+        sock.settimeout(min(left, STOP_CHECK_S))
+        try:
+            sock.recv(64)
+        except socket.timeout:
+            continue
+        sock.setblocking(False)   # swallow the rest of a burst of notifications
+        try:
+            while sock.recv(64):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        return True
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--idle-min", type=float, default=1.0)
+    ap.add_argument("--idle-max", type=float, default=30.0)
+    ap.add_argument("--max-attempts", type=int, default=10)
+    ap.add_argument("--notify", default=NOTIFY)
+    ap.add_argument("--state-dir", default=str(pathlib.Path(__file__).resolve().parent))
+    a = ap.parse_args()
+
+    state_dir = pathlib.Path(a.state_dir)
+    running, stop = state_dir / "RUNNING", state_dir / "STOP"
+    if running.exists():
+        sys.exit(f"Another dispatcher seems to be running [found {running}]. If not, delete it and run again.")
+    stop.unlink(missing_ok=True)
+    running.write_text(str(os.getpid()))
+    try:
+        sock = listen(a.notify)
+        d = Dispatcher(a.db, batch=a.batch, max_attempts=a.max_attempts)
+        log(f"Outbox dispatcher started (db={a.db}, notify={a.notify}, "
+            f"queues={', '.join(f'{q.name}->{q.url}' for q in d.queues)})")
+        idle = a.idle_min
+        while not stop.exists():
+            if d.drain_once():
+                idle = a.idle_min
+                continue
+            wait = idle
+            retry_in = d.next_retry_in()
+            if retry_in is not None:
+                wait = min(wait, retry_in)
+            if wait_for_notify(sock, wait, stop):
+                idle = a.idle_min
+            else:
+                idle = min(idle * 2, a.idle_max)
+        log("STOP file found. Stopping.")
+    finally:
+        running.unlink(missing_ok=True)
+        stop.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 
 #!/usr/bin/env python3
-"""Life-Support API CLI v2 (timezone fix + list command)"""
-import argparse, json, os, sqlite3, sys, zipfile
+"""Life-Support API CLI v2 (timezone fix + list command)
+
+Also importable: list_records / get_record / set_seek are the query API the
+CLI commands and ui/lsui.pyw share.
+"""
+import argparse, base64, bz2, hashlib, io, json, lzma, multiprocessing, operator, os, sqlite3, sys, time, uuid, zipfile, zlib
+from collections import ChainMap, deque
 from datetime import datetime, UTC
 from pathlib import Path
+from urllib.parse import quote
+
+# faster JSON decoding for bundle import when available; stdlib json otherwise
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from msgspec.json import decode as json_loads
+    except ImportError:
+        json_loads = json.loads
+
+import seek_queue
 
 def load_config(path: str):
     with open(path, "r", encoding="utf-8") as f:
@@ -32,45 +49,470 @@ def ensure_inbox_outbox(cfg):
 def now_iso():
     return datetime.now(UTC).strftime("%Y-%m-%dT%H-%M-%SZ")
 
-def export_bundle(conn, cfg, out_path: Path):
+SYNC_TABLES = ("records", "record_notes", "record_history", "record_doctors")
+EXPORT_BATCH = 2000
+
+# Bundle layouts. v1: one <table>.jsonl (+ <table>.deletes.jsonl) member per table.
+# v2: each table split into chunks of up to CHUNK_ROWS rows, <table>/rows-00000.jsonl
+# and <table>/deletes-00000.jsonl, listed in the manifest in apply order with their
+# row range and sha256. Export writes BUNDLE_FORMAT unless sync.bundle_format says
+# 1 (peers on an older life-support-api); import reads both.
+BUNDLE_FORMAT = 2
+CHUNK_ROWS = 20000
+
+# member compression (sync.codec / sync.level); level None is the codec's default,
+# lzma ignores it. v1 members are compressed by zipfile. v2 chunks are compressed
+# sync.compress_workers at a time with the codec's own module and stored in the zip
+# as they are; their manifest entry names the codec (CHUNK_CODECS). Chunks without
+# a codec entry (stored, or written before there was one) are plain zip members.
+CODECS = {"stored": zipfile.ZIP_STORED, "deflate": zipfile.ZIP_DEFLATED,
+          "bzip2": zipfile.ZIP_BZIP2, "lzma": zipfile.ZIP_LZMA}
+CHUNK_CODECS = {
+    "deflate": (lambda data, level: zlib.compress(data, -1 if level is None else level), zlib.decompress),
+    "bzip2": (lambda data, level: bz2.compress(data, 9 if level is None else level), bz2.decompress),
+    "lzma": (lambda data, level: lzma.compress(data), lzma.decompress),
+}
+COMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+
+# delta watermark: the local change_log id the peer has been sent rows up to, kept
+# per table as {"change_id": n}. Not the rows' own (updated_at, id): rows that came
+# in through import carry the producer's values, which can sort below the mark and
+# would never be relayed. Older (updated_at, id) marks count as no mark (one full export).
+WATERMARK_COLS = ("change_id",)
+
+# import progress per bundle, on top of init_db.sql's inbox table
+INBOX_COLUMNS = {
+    "producer": "TEXT",
+    "file": "TEXT",
+    "chunks_total": "INTEGER",
+    "chunks_applied": "INTEGER NOT NULL DEFAULT 0",
+    "applied_at": "TEXT",
+}
+
+def ensure_sync_state(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS peer_acks (
+        peer TEXT NOT NULL, guid TEXT NOT NULL, version INTEGER, content_hash TEXT NOT NULL,
+        PRIMARY KEY (peer, guid)) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS inbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, bundle_guid TEXT NOT NULL,
+        status TEXT CHECK(status IN ('received','applied','error')) DEFAULT 'received',
+        created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ','now')), error TEXT)""")
+    have = {r[1] for r in conn.execute("PRAGMA table_info(inbox)")}
+    for col, decl in INBOX_COLUMNS.items():
+        if col not in have:
+            conn.execute(f"ALTER TABLE inbox ADD COLUMN {col} {decl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inbox_bundle ON inbox(bundle_guid, producer)")
+
+def get_meta(conn, k, default=None):
+    row = conn.execute("SELECT v FROM meta WHERE k=?", (k,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn, k, v):
+    conn.execute("INSERT INTO meta (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v", (k, v))
+
+def peer_id(cfg):
+    """Who the bundles we export are for (watermarks are kept per peer)."""
+    return cfg.get("sync", {}).get("peer") or ("main" if cfg.get("role") == "mini" else "mini")
+
+def load_watermark(conn, peer, table):
+    v = json.loads(get_meta(conn, f"watermark:{peer}:{table}") or "null")
+    return v if isinstance(v, dict) and all(c in v for c in WATERMARK_COLS) else None
+
+def delta_mark(conn):
+    """The delta mark to move a peer to now: the latest change_log id (the same for
+    every table), or None if this DB has no change_log."""
+    try:
+        return {"change_id": change_high_mark(conn)}
+    except sqlite3.OperationalError:
+        return None
+
+def acked_filter(alias, producers):
+    """(SQL, params) true for records every one of `producers` sent us at their
+    current version and hash; None if there are none."""
+    if not producers:
+        return None
+    return (f"(SELECT COUNT(*) FROM peer_acks AS a WHERE a.peer IN (SELECT value FROM json_each(?))"
+            f" AND a.guid = {alias}.guid AND a.version = {alias}.version"
+            f" AND a.content_hash = {alias}.content_hash) < ?", [json.dumps(producers), len(producers)])
+
+def row_select(conn, table, alias):
+    """Select list for the rows a bundle carries: records leave their lease state
+    (seek_queue.LOCAL_COLUMNS) behind and a leased record goes out as queued."""
+    if table != "records":
+        return f"{alias}.*"
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(records)")]
+    return ", ".join(f"{seek_queue.shared_value(alias, c)} AS {qident(c)}"
+                     for c in cols if c not in seek_queue.LOCAL_COLUMNS)
+
+def range_query(table, lo, hi, acked_by=None, select="*"):
+    """SELECT for rows changed (change_log id in (lo, hi]); lo=None means every row.
+
+    acked_by=[producer, ...] (see ack_producers) leaves out records all of them sent us
+    themselves, unchanged since. select is the column list (see row_select).
+    """
+    where, params = [], []
+    if lo:
+        where.append("guid IN (SELECT entity_guid FROM change_log WHERE id > ? AND id <= ? AND entity = ?)")
+        params += [lo["change_id"], hi["change_id"], table]
+    acked = acked_filter("records", acked_by) if table == "records" else None
+    if acked:
+        where.append(acked[0])
+        params += acked[1]
+    return (f"SELECT {select} FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else "") + " ORDER BY id",
+            params)
+
+# ---------- change capture (change_log) ----------
+# AFTER INSERT/UPDATE/DELETE triggers on the sync tables append one row per
+# change to change_log: (entity, entity_guid, op 'upsert'|'delete', version).
+# The row data is read back at export time, so entries stay small. Updates are
+# watched on every column but updated_at, so the trg_*_updated_at touch (a
+# nested UPDATE of updated_at only) doesn't log a second entry. records also
+# ignores updates that only change seek lease state (see seek_queue.py).
+#
+# Export cursors and acknowledgements live in meta:
+#   watermark:<peer>:<table>      {"change_id": id} a delta export to <peer> got up to
+#   changelog:<peer>              last change_log id exported to <peer>
+#   changelog_applied:<producer>  {"to": id, "peer": name} - how far we applied a producer's
+#                                 change_log, and the name it exports to us under
+#   changelog_acked:<peer>        last id of ours <peer> reports applied; bundles carry the
+#                                 sender's changelog_applied marks as "acks", and compact
+#                                 prunes below the lowest ack
+
+CHANGE_TRIGGER = """CREATE TRIGGER {name} AFTER {event} ON {table}{when} BEGIN
+  {body}
+END"""
+CHANGE_INSERT = ("INSERT INTO change_log (entity, entity_guid, op, version, changes_json) "
+                 "SELECT '{table}', {row}.guid, '{op}', {version}, '{{}}'{where};")
+
+def change_triggers(conn, table):
+    """name -> CREATE TRIGGER sql for one table's change capture."""
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    def log(row, op, where=""):
+        version = f"COALESCE({row}.version, 0)" if "version" in cols else "0"
+        return CHANGE_INSERT.format(table=table, row=row, op=op, version=version, where=where)
+    local = seek_queue.LOCAL_COLUMNS if table == "records" else ()
+    watched = ", ".join(c for c in cols if c != "updated_at" and c not in local)
+    events = {
+        "ai": ("INSERT", "", log("NEW", "upsert")),
+        # a changed guid is a delete of the old one plus an upsert of the new
+        "au": (f"UPDATE OF {watched}", f" WHEN {seek_queue.edited(cols)}" if local else "",
+               log("OLD", "delete", " WHERE OLD.guid IS NOT NEW.guid") + "\n  " + log("NEW", "upsert")),
+        "ad": ("DELETE", "", log("OLD", "delete")),
+    }
+    return {f"trg_{table}_changes_{k}": CHANGE_TRIGGER.format(name=f"trg_{table}_changes_{k}", event=event,
+                                                             table=table, when=when, body=body)
+            for k, (event, when, body) in events.items()}
+
+def ensure_change_capture(conn):
+    """(Re)create the change_log triggers whose definition is missing or stale (e.g. a column was added)."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, entity TEXT NOT NULL, entity_guid TEXT NOT NULL,
+        op TEXT NOT NULL, version INTEGER NOT NULL, author_agent_id TEXT, changes_json TEXT NOT NULL,
+        ts TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ','now')))""")
+    have = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name LIKE 'trg_%_changes_a_'"))
+    for table in SYNC_TABLES:
+        for name, sql in change_triggers(conn, table).items():
+            if have.get(name) != sql:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                conn.execute(sql)
+    conn.commit()
+
+def change_high_mark(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+
+def stage_changes(conn, lo, hi):
+    """Latest op per (entity, guid) among change_log ids in (lo, hi], into temp.changed."""
+    conn.execute("""CREATE TEMP TABLE IF NOT EXISTS changed (
+        entity TEXT NOT NULL, guid TEXT NOT NULL, op TEXT NOT NULL, version INTEGER,
+        PRIMARY KEY (entity, guid)) WITHOUT ROWID""")
+    conn.execute("DELETE FROM temp.changed")
+    # bare columns next to MAX() come from the row holding the max id
+    conn.execute("""INSERT INTO temp.changed (entity, guid, op, version)
+                    SELECT entity, entity_guid, op, version FROM (
+                        SELECT entity, entity_guid, op, version, MAX(id) FROM change_log
+                        WHERE id > ? AND id <= ? GROUP BY entity, entity_guid)""", (lo, hi))
+
+def changed_rows_query(table, acked_by=None, select="t.*"):
+    """SELECT for the current rows of `table` (aliased t) whose latest change is an upsert."""
+    sql = (f"SELECT {select} FROM temp.changed AS c JOIN {table} AS t ON t.guid = c.guid "
+           f"WHERE c.entity = ? AND c.op = 'upsert'")
+    params = [table]
+    acked = acked_filter("t", acked_by) if table == "records" else None
+    if acked:
+        sql += " AND " + acked[0]
+        params += acked[1]
+    return sql + " ORDER BY t.id", params
+
+DELETES_QUERY = "SELECT guid, version FROM temp.changed WHERE entity = ? AND op = 'delete' ORDER BY guid"
+
+def producer_id(cfg):
+    return cfg.get("agent", {}).get("id", cfg.get("role", "unknown"))
+
+def changelog_acks(conn):
+    """Our changelog_applied marks by producer, sent back to them in each bundle's "acks"."""
+    return {k.split(":", 1)[1]: json.loads(v) for k, v in
+            conn.execute("SELECT k, v FROM meta WHERE k LIKE 'changelog_applied:%'")}
+
+def note_changelog_state(conn, cfg, manifest):
+    """After applying a bundle: remember how far we applied its producer's change_log,
+    and how far the producer says it applied ours."""
+    producer = manifest.get("producer")
+    changes = manifest.get("changes")
+    if producer and changes and changes.get("to") is not None:
+        k = f"changelog_applied:{producer}"
+        prev = json.loads(get_meta(conn, k) or "{}")
+        set_meta(conn, k, json.dumps({"to": max(changes["to"], prev.get("to", 0)), "peer": manifest.get("peer")}))
+    ack = (manifest.get("acks") or {}).get("changelog", {}).get(producer_id(cfg or {}))
+    if ack and ack.get("to") is not None:
+        k = f"changelog_acked:{ack.get('peer') or producer}"
+        set_meta(conn, k, str(max(int(ack["to"]), int(get_meta(conn, k) or 0))))
+
+def apply_deletes(conn, table, rows):
+    """Delete (guid, version) rows; a local row with a newer version than the delete survives."""
+    if not rows:
+        return 0
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS stage_deletes (guid TEXT PRIMARY KEY, version INTEGER) WITHOUT ROWID")
+    conn.execute("DELETE FROM temp.stage_deletes")
+    conn.executemany("INSERT OR REPLACE INTO temp.stage_deletes VALUES (?, ?)", rows)
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    newer = (" AND COALESCE(version, 0) <= (SELECT d.version FROM temp.stage_deletes AS d WHERE d.guid = t.guid)"
+             if "version" in cols else "")
+    return conn.execute(f"DELETE FROM {table} AS t WHERE guid IN (SELECT guid FROM temp.stage_deletes){newer}").rowcount
+
+def compact_change_log(conn, exported=False, dry_run=False):
+    """Prune change_log up to the lowest id every export peer has acknowledged
+    (exported=True: up to the lowest id exported to each, for one-way setups).
+    Delta peers are never acknowledged; their watermark bounds the prune as well."""
+    peers = [k.split(":", 1)[1] for (k,) in conn.execute("SELECT k FROM meta WHERE k LIKE 'changelog:%'")]
+    marks = {p: get_meta(conn, f"changelog:{p}" if exported else f"changelog_acked:{p}") for p in peers}
+    waiting = sorted(p for p, v in marks.items() if v is None)
+    deltas = [int(m["change_id"]) for m in (json.loads(v) for (v,) in
+              conn.execute("SELECT v FROM meta WHERE k LIKE 'watermark:%'"))
+              if isinstance(m, dict) and "change_id" in m]
+    if not (peers or deltas) or waiting:
+        return {"pruned": 0, "upto": None, "waiting_for": waiting}
+    upto = min([int(v) for v in marks.values()] + deltas)
+    if dry_run:
+        n = conn.execute("SELECT COUNT(*) FROM change_log WHERE id <= ?", (upto,)).fetchone()[0]
+    else:
+        n = conn.execute("DELETE FROM change_log WHERE id <= ?", (upto,)).rowcount
+        conn.commit()
+    return {"pruned": n, "upto": upto, "waiting_for": []}
+
+def write_jsonl(z, name, cur, query, params=(), batch=EXPORT_BATCH):
+    """Stream a query into zip member `name` one cursor batch at a time; returns the row count."""
+    cur.execute(query, params)
+    n = 0
+    with z.open(name, "w", force_zip64=True) as f:
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            chunk = "\n".join(json.dumps(dict(r)) for r in rows)
+            f.write((("\n" if n else "") + chunk).encode("utf-8"))
+            n += len(rows)
+    return n
+
+def bundle_codec(cfg):
+    """(codec name, zip compress type, level) from the sync section of the config."""
+    sync_cfg = cfg.get("sync", {})
+    codec = sync_cfg.get("codec", "deflate")
+    if codec not in CODECS:
+        raise ValueError(f"sync.codec must be one of {', '.join(CODECS)}, not {codec!r}")
+    level = sync_cfg.get("level")
+    return codec, CODECS[codec], None if level is None else int(level)
+
+def compress_member(data, codec, level):
+    """(member bytes, sha256 hex) of one chunk; zlib, bz2, lzma and hashlib all
+    drop the GIL, so this runs on the export thread pool."""
+    raw = CHUNK_CODECS[codec][0](data, level) if codec in CHUNK_CODECS else data
+    return raw, hashlib.sha256(data).hexdigest()
+
+class ChunkWriter:
+    """Writes v2 chunk members into `z`, compressing up to `workers` at a time.
+
+    Members are appended in submission order with ZipFile.writestr, stored (they
+    are compressed already); each chunk's manifest entry gets its codec and sha256
+    when it is written. close() waits for the rest.
+    """
+    def __init__(self, z, codec, level, workers=COMPRESS_WORKERS):
+        self.z, self.codec, self.level = z, codec, level
+        self.workers = max(1, workers)
+        self.pool = None
+        self.pending = deque()
+        if self.workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bundle-zip")
+
+    def add(self, entry, data):
+        if self.pool is None:
+            self._write(entry, compress_member(data, self.codec, self.level))
+            return
+        self.pending.append((entry, self.pool.submit(compress_member, data, self.codec, self.level)))
+        while len(self.pending) > 2 * self.workers:
+            self._drain_one()
+
+    def _drain_one(self):
+        entry, fut = self.pending.popleft()
+        self._write(entry, fut.result())
+
+    def _write(self, entry, done):
+        raw, sha = done
+        zinfo = zipfile.ZipInfo(entry["member"], date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = zipfile.ZIP_STORED
+        zinfo.external_attr = 0o600 << 16
+        self.z.writestr(zinfo, raw)
+        if self.codec in CHUNK_CODECS:
+            entry["codec"] = self.codec
+        entry["sha256"] = sha
+
+    def close(self):
+        try:
+            while self.pending:
+                self._drain_one()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+def write_chunks(writer, table, kind, cur, query, params, chunk_rows, chunks):
+    """Stream a query into v2 chunk members of `table`, appending their manifest
+    entries to `chunks`; returns the row count."""
+    cur.execute(query, params)
+    n = 0
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        data = "\n".join(json.dumps(dict(r)) for r in rows).encode("utf-8")
+        seq = sum(1 for c in chunks if c["table"] == table and c["kind"] == kind)
+        entry = {"member": f"{table}/{kind}-{seq:05d}.jsonl", "table": table, "kind": kind,
+                 "rows": [n, n + len(rows)]}
+        if "id" in rows[0].keys():
+            ids = [r["id"] for r in rows]
+            entry["ids"] = [min(ids), max(ids)]
+        writer.add(entry, data)
+        chunks.append(entry)
+        n += len(rows)
+    return n
+
+def apply_order(chunk):
+    """Manifest order of v2 chunks: deletes child tables first, then rows parents first."""
+    t = SYNC_TABLES.index(chunk["table"])
+    return (0, -t) if chunk["kind"] == "deletes" else (1, t)
+
+def export_bundle(conn, cfg, out_path: Path, scope="delta", peer=None):
+    """Write a bundle of rows the peer hasn't been sent yet (scope='full': every row).
+
+    A delta sends the rows with a change_log entry past the peer's watermark (every
+    row the first time) up to the change_log id taken at the start, imported rows
+    included, so main relays what one mini sent it to the others. The watermark only
+    moves once the bundle is on disk. A delta also leaves out records every agent
+    behind the peer sent us itself, unchanged since (see ack_producers).
+    scope='changes' sends the latest change per guid since the peer's change_log
+    cursor, deletes included (<table>.deletes.jsonl); the first one for a peer falls
+    back to a delta. A bundle with nothing in it is not written; returns the
+    manifest, or None in that case.
+
+    Bundles are written in format sync.bundle_format (default BUNDLE_FORMAT) with
+    sync.chunk_rows rows per chunk, compressed with sync.codec at sync.level
+    (see bundle_codec) on sync.compress_workers threads.
+    """
     out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    peer = peer or peer_id(cfg)
+    ensure_sync_state(conn)
+
+    ensure_change_capture(conn)  # delta marks are change_log ids too
+    changes = None
+    if scope == "changes":
+        lo = get_meta(conn, f"changelog:{peer}")
+        changes = {"from": None if lo is None else int(lo), "to": change_high_mark(conn)}
+        if changes["from"] is not None:
+            stage_changes(conn, changes["from"], changes["to"])
+
+    ranges = {}
+    for table in SYNC_TABLES:
+        lo = None if scope == "full" else load_watermark(conn, peer, table)
+        ranges[table] = {"from": lo, "to": delta_mark(conn) or lo}
+
+    sync_cfg = cfg.get("sync", {})
+    fmt = int(sync_cfg.get("bundle_format", BUNDLE_FORMAT))
+    chunk_rows = int(sync_cfg.get("chunk_rows", CHUNK_ROWS))
+    codec, compress_type, level = bundle_codec(cfg)
+    chunks = []
+    def emit(table, kind, query, params):
+        if fmt >= 2:
+            return write_chunks(writer, table, kind, cur, query, params, chunk_rows, chunks)
+        return write_jsonl(z, f"{table}.jsonl" if kind == "rows" else f"{table}.deletes.jsonl", cur, query, params)
 
     cur = conn.cursor()
-    def dump_jsonl(query, params=()):
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        lines = [json.dumps(dict(r)) for r in rows]
-        return "\n".join(lines)
-
-    records = dump_jsonl("SELECT * FROM records")
-    notes = dump_jsonl("SELECT * FROM record_notes")
-    hist = dump_jsonl("SELECT * FROM record_history")
-    rdoc = dump_jsonl("SELECT * FROM record_doctors")
-
-    manifest = {
-        "bundle_guid": f"bundle-{now_iso()}",
-        "direction": "auto",
-        "producer": cfg.get("agent", {}).get("id", cfg.get("role", "unknown")),
-        "created_at": datetime.now(UTC).isoformat().replace("+00:00","Z"),
-        "schema_version": "1.0.0",
-        "entities": {
-            "records": 0 if not records else len(records.splitlines()),
-            "record_notes": 0 if not notes else len(notes.splitlines()),
-            "record_history": 0 if not hist else len(hist.splitlines()),
-            "record_doctors": 0 if not rdoc else len(rdoc.splitlines()),
-        },
-        "encryption": {"alg": "none"}
-    }
+    counts, deletes = {}, {}
+    acks = changelog_acks(conn)
+    acked_by = ack_producers(cfg, peer)
+    with zipfile.ZipFile(out_path, "w", compression=compress_type, compresslevel=level) as z:
+        writer = ChunkWriter(z, codec, level, int(sync_cfg.get("compress_workers", COMPRESS_WORKERS)))
+        try:
+            for table in SYNC_TABLES:
+                if changes and changes["from"] is not None:
+                    query, params = changed_rows_query(table, acked_by=acked_by,
+                                                       select=row_select(conn, table, "t"))
+                    counts[table] = emit(table, "rows", query, params)
+                    deletes[table] = emit(table, "deletes", DELETES_QUERY, (table,))
+                    continue
+                lo, hi = ranges[table]["from"], ranges[table]["to"]
+                if hi is None or hi == lo:
+                    if fmt < 2:
+                        z.writestr(f"{table}.jsonl", "")
+                    counts[table] = 0
+                    continue
+                query, params = range_query(table, lo, hi, acked_by=None if scope == "full" else acked_by,
+                                            select=row_select(conn, table, table))
+                counts[table] = emit(table, "rows", query, params)
+        finally:
+            writer.close()
 
-    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        # manifest goes last so the counts come from what was actually streamed
+        manifest = {
+            "bundle_guid": f"bundle-{now_iso()}-{uuid.uuid4().hex[:8]}",
+            "direction": "auto",
+            "producer": producer_id(cfg),
+            "created_at": datetime.now(UTC).isoformat().replace("+00:00","Z"),
+            "schema_version": "2.0.0" if fmt >= 2 else "1.0.0",
+            "scope": scope,
+            "peer": peer,
+            "entities": counts,
+            "ranges": ranges,
+            "acks": {"changelog": acks},
+            "compression": {"codec": codec, "level": level},
+            "encryption": {"alg": "none"}
+        }
+        if changes:
+            manifest["changes"] = changes
+            manifest["deletes"] = deletes
+        if fmt >= 2:
+            manifest["format"] = 2
+            manifest["chunk_rows"] = chunk_rows
+            manifest["chunks"] = sorted(chunks, key=apply_order)
         z.writestr("manifest.json", json.dumps(manifest, indent=2))
-        z.writestr("records.jsonl", records)
-        z.writestr("record_notes.jsonl", notes)
-        z.writestr("record_history.jsonl", hist)
-        z.writestr("record_doctors.jsonl", rdoc)
 
-    print(f"Exported: {out_path}")
+    for table in SYNC_TABLES:
+        if ranges[table]["to"] is not None:
+            set_meta(conn, f"watermark:{peer}:{table}", json.dumps(ranges[table]["to"]))
+    if changes:
+        set_meta(conn, f"changelog:{peer}", str(changes["to"]))
+    # a bundle that only carries new acks still goes out, or the peer could never compact
+    acks_json = json.dumps(acks, sort_keys=True)
+    acks_moved = acks_json != get_meta(conn, f"changelog_acks_sent:{peer}", "{}")
+    set_meta(conn, f"changelog_acks_sent:{peer}", acks_json)
+    conn.commit()
+
+    if scope != "full" and not any(counts.values()) and not any(deletes.values()) and not acks_moved:
+        out_path.unlink()
+        print("Nothing to export (no changes since last bundle)")
+        return None
+    print(f"Exported: {out_path} ({scope}) {counts}" + (f" deletes {deletes}" if any(deletes.values()) else ""))
+    return manifest
 
 def upsert_record(conn, rec: dict):
     cur = conn.cursor()
@@ -104,47 +546,582 @@ def upsert_record(conn, rec: dict):
                 pass
         return "skip"
 
-def import_bundle(conn, cfg, in_path: Path):
+IMPORT_CHUNK = 5000
+
+def qident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def uniform_chunks(rows, size=IMPORT_CHUNK):
+    """Group rows into chunks that share one column set and hold each guid at most once,
+    so applying a chunk set-based gives the same outcome as applying its rows one by one."""
+    buf, keys, seen = [], None, set()
+    for r in rows:
+        if buf and (len(buf) >= size or r.keys() != keys or r["guid"] in seen):
+            yield buf
+            buf, seen = [], set()
+        if not buf:
+            keys = r.keys()
+        buf.append(r)
+        seen.add(r["guid"])
+    if buf:
+        yield buf
+
+def stage_rows(conn, table, cols, rows):
+    """Load value tuples into a TEMP copy of `table` (same columns, no constraints); returns its name."""
+    stage = f"temp.stage_{table}"
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS stage_{table} AS SELECT * FROM main.{table} WHERE 0")
+    conn.execute(f"DELETE FROM {stage}")
+    fields = ", ".join(qident(c) for c in cols)
+    qmarks = ", ".join(["?"]*len(cols))
+    conn.executemany(f"INSERT INTO {stage} ({fields}) VALUES ({qmarks})", rows)
+    return stage
+
+def bulk_insert_new(conn, table, cols, stage):
+    """Insert staged rows whose guid `table` doesn't have yet; returns how many."""
+    fields = ", ".join(qident(c) for c in cols)
+    return conn.execute(f"INSERT INTO {table} ({fields}) SELECT {fields} FROM {stage} AS s "
+                        f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE t.guid = s.guid)").rowcount
+
+def bulk_upsert_records(conn, cols, rows):
+    """Set-based upsert_record for one uniform chunk; returns insert/update/skip counts.
+
+    UPDATE ... FROM plus INSERT ... WHERE NOT EXISTS rather than ON CONFLICT(guid):
+    bundle rows carry the producer's id, and an upsert would trip over the id
+    primary key where the per-row UPDATE (which never sets id) does not.
+    """
+    stage = stage_rows(conn, "records", cols, rows)
+    iv = "s.version" if "version" in cols else "0"
+    newer = f"{iv} > r.version"
+    if "updated_at" in cols:
+        newer += f" OR ({iv} = r.version AND s.updated_at > COALESCE(r.updated_at, ''))"
+    sets = ", ".join(f"{qident(c)}=s.{qident(c)}" for c in cols if c != "id")
+    upd = conn.execute(f"UPDATE records AS r SET {sets} FROM {stage} AS s "
+                       f"WHERE s.guid = r.guid AND ({newer})").rowcount
+    ins = bulk_insert_new(conn, "records", cols, stage)
+    return {"insert": ins, "update": upd, "skip": len(rows) - ins - upd}
+
+def load_known_hashes(conn):
+    """guid -> (version, content_hash) for every hashed record, loaded once per sync."""
+    return {g: (v, h) for g, v, h in
+            conn.execute("SELECT guid, version, content_hash FROM records WHERE content_hash IS NOT NULL")}
+
+def drop_known(cols, rows, known):
+    """Rows whose version and content_hash the DB already holds for that guid removed."""
+    if known is None or "content_hash" not in cols:
+        return rows
+    g, h = cols.index("guid"), cols.index("content_hash")
+    v = cols.index("version") if "version" in cols else None
+    fresh = []
+    for r in rows:
+        key = (r[v] if v is not None else 0, r[h])
+        if r[h] is None or known.get(r[g]) != key:
+            fresh.append(r)
+            if r[h] is not None:
+                known[r[g]] = key
+    return fresh
+
+def ack_producers(cfg, peer):
+    """Agents (bundle producers) an export to `peer` goes to: sync.peer_agents[peer], or
+    the peer name itself. peer_acks are kept per producer and a record is held back
+    only once every one of them sent it to us, so one mini's ack never keeps a record
+    from the others behind the same name."""
+    return list(cfg.get("sync", {}).get("peer_agents", {}).get(peer) or [peer])
+
+def record_acks(conn, producer, cols, stage):
+    """Remember which (version, content_hash) the producing peer holds for each staged record."""
+    iv = "version" if "version" in cols else "0"
+    conn.execute(f"""INSERT INTO peer_acks (peer, guid, version, content_hash)
+                     SELECT ?, guid, {iv}, content_hash FROM {stage} WHERE content_hash IS NOT NULL
+                     ON CONFLICT(peer, guid) DO UPDATE SET version=excluded.version, content_hash=excluded.content_hash""",
+                 (producer,))
+
+def apply_chunk(conn, table, cols, rows, applied, known=None, producer=None):
+    """Apply one uniform chunk. Records already in `known` with the same version and
+    hash count as skips without touching SQLite."""
+    if table != "records":
+        bulk_insert_new(conn, table, cols, stage_rows(conn, table, cols, rows))
+        return
+    cols, rows = drop_lease_state(cols, rows)
+    fresh = drop_known(cols, rows, known)
+    applied["skip"] += len(rows) - len(fresh)
+    if not fresh:
+        return
+    for k, v in bulk_upsert_records(conn, cols, fresh).items():
+        applied[k] += v
+    if producer and "content_hash" in cols:
+        record_acks(conn, producer, cols, "temp.stage_records")
+
+def drop_lease_state(cols, rows):
+    """Strip the seek lease state bundles from older producers still carry
+    (seek_queue.LOCAL_COLUMNS); a record leased over there arrives as queued."""
+    keep = [i for i, c in enumerate(cols) if c not in seek_queue.LOCAL_COLUMNS]
+    if len(keep) == len(cols):
+        return cols, rows
+    cols = [cols[i] for i in keep]
+    status = cols.index("seek_status") if "seek_status" in cols else None
+    out = []
+    for r in rows:
+        r = [r[i] for i in keep]
+        if status is not None and r[status] == "in_progress":
+            r[status] = "queued"
+        out.append(tuple(r))
+    return cols, out
+
+def read_jsonl(z, name):
+    """Yield rows of zip member `name` line by line (nothing if the member is missing)."""
+    if name not in z.namelist():
+        return
+    with z.open(name) as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json_loads(line)
+
+def row_chunks(rows):
+    """Yield (cols, value tuples) for each uniform chunk of dict rows."""
+    for chunk in uniform_chunks(rows):
+        cols = list(chunk[0])
+        pick = operator.itemgetter(*cols) if len(cols) > 1 else (lambda r: (r[cols[0]],))
+        yield cols, list(map(pick, chunk))
+
+def delete_keys(rows):
+    return [(d["guid"], d.get("version") or 0) for d in rows]
+
+# ---------- bundle reading (v1 and v2) ----------
+
+class BundleError(ValueError):
+    """A bundle that can't be applied as it is: truncated, corrupt or failing a checksum."""
+
+def open_bundle(path):
+    """(ZipFile, manifest) of a bundle, or BundleError if it isn't a complete one."""
+    path = Path(path)
+    try:
+        z = zipfile.ZipFile(path, "r")
+    except zipfile.BadZipFile as e:
+        raise BundleError(f"{path.name} is truncated or not a bundle (still being copied?): {e}") from e
+    try:
+        manifest = json.loads(z.read("manifest.json").decode("utf-8"))
+    except KeyError:
+        z.close()
+        raise BundleError(f"{path.name} has no manifest.json")
+    return z, manifest
+
+def bundle_version(manifest):
+    return int(manifest.get("format", 1))
+
+def bundle_units(manifest):
+    """The bundle's units in apply order: its v2 chunks, or one per v1 member."""
+    if bundle_version(manifest) >= 2:
+        return manifest["chunks"]
+    return ([{"member": f"{t}.deletes.jsonl", "table": t, "kind": "deletes"} for t in reversed(SYNC_TABLES)]
+            + [{"member": f"{t}.jsonl", "table": t, "kind": "rows"} for t in SYNC_TABLES])
+
+def read_chunk(z, unit):
+    """Rows of one v2 chunk, checked against its manifest entry."""
+    codec = unit.get("codec")
+    if codec and codec not in CHUNK_CODECS:
+        raise BundleError(f"chunk {unit['member']} uses unknown codec {codec!r}")
+    try:
+        data = z.read(unit["member"])
+        if codec:
+            data = CHUNK_CODECS[codec][1](data)
+    except KeyError:
+        raise BundleError(f"chunk {unit['member']} is missing")
+    except (zipfile.BadZipFile, zlib.error, lzma.LZMAError, OSError, EOFError) as e:
+        raise BundleError(f"chunk {unit['member']} is corrupt: {e}") from e
+    if hashlib.sha256(data).hexdigest() != unit["sha256"]:
+        raise BundleError(f"chunk {unit['member']} fails its sha256 check")
+    rows = [json_loads(line) for line in data.splitlines() if line.strip()]
+    lo, hi = unit["rows"]
+    if len(rows) != hi - lo:
+        raise BundleError(f"chunk {unit['member']} holds {len(rows)} rows, manifest says {hi - lo}")
+    return rows
+
+def unit_rows(z, manifest, unit):
+    """Dict rows of one unit (streamed for v1 members)."""
+    if bundle_version(manifest) >= 2:
+        return read_chunk(z, unit)
+    return read_jsonl(z, unit["member"])
+
+def unit_payload(z, manifest, unit):
+    """What apply_unit takes: (guid, version) pairs for deletes, uniform chunks for rows."""
+    rows = unit_rows(z, manifest, unit)
+    return delete_keys(rows) if unit["kind"] == "deletes" else row_chunks(rows)
+
+def table_rows(z, manifest, table, kind="rows"):
+    """Every dict row of one table across its units."""
+    for unit in bundle_units(manifest):
+        if unit["table"] == table and unit["kind"] == kind:
+            yield from unit_rows(z, manifest, unit)
+
+# ---------- bundle import ----------
+
+def inbox_begin(conn, manifest, name):
+    """The inbox row tracking this bundle (created as 'received' on first sight)."""
+    key = (manifest.get("bundle_guid") or name, manifest.get("producer"))
+    row = conn.execute("SELECT id, status, chunks_applied FROM inbox WHERE bundle_guid=? AND producer IS ? "
+                       "ORDER BY id DESC LIMIT 1", key).fetchone()
+    if row is None:
+        row = conn.execute("INSERT INTO inbox (bundle_guid, producer, file, chunks_total) VALUES (?, ?, ?, ?) "
+                           "RETURNING id, status, chunks_applied", (*key, name, len(bundle_units(manifest)))).fetchone()
+        conn.commit()
+    return {"id": row[0], "status": row[1], "done": row[2] or 0}
+
+def apply_unit(conn, unit, payload, applied, known=None, producer=None):
+    if unit["kind"] == "deletes":
+        n = apply_deletes(conn, unit["table"], payload)
+        if n:
+            applied["delete"] = applied.get("delete", 0) + n
+        return
+    for cols, rows in payload:
+        apply_chunk(conn, unit["table"], cols, rows, applied, known, producer)
+
+def apply_units(conn, cfg, name, manifest, entry, units, known=None):
+    """Apply (unit, payload) pairs from the first one the inbox row hasn't applied yet.
+
+    v2 bundles commit each chunk together with the inbox progress, so after a crash
+    or a bad chunk the next run resumes where this one stopped; v1 bundles commit
+    once at the end. A bundle the inbox already shows as applied is skipped, and so
+    is one its producer exported before the snapshot we were restored from.
+    """
+    applied = {"insert":0,"update":0,"skip":0}
+    if entry["status"] == "applied":
+        print(f"Bundle {name} was already applied")
+        return applied
+    if in_snapshot(conn, manifest):
+        conn.execute("""UPDATE inbox SET status='applied', error='contained in snapshot',
+                        applied_at=STRFTIME('%Y-%m-%dT%H:%M:%fZ','now') WHERE id=?""", (entry["id"],))
+        conn.commit()
+        print(f"Bundle {name} is older than the snapshot this DB was restored from, skipped")
+        return applied
+    chunked = bundle_version(manifest) >= 2
+    producer = manifest.get("producer")
+    done = entry["done"]
+    # Hashes seen in this bundle go to `staged` first and reach the shared `known`
+    # only once their rows are committed, so a rollback can't leave `known`
+    # claiming rows the DB never kept.
+    staged = ChainMap({}, known) if known is not None else None
+    def commit():
+        conn.commit()
+        if staged is not None:
+            known.update(staged.maps[0])
+            staged.maps[0].clear()
+    try:
+        for unit, payload in units:
+            if isinstance(payload, Exception):  # found by a load_bundle worker
+                raise payload
+            apply_unit(conn, unit, payload, applied, staged, producer)
+            done += 1
+            if chunked:
+                conn.execute("UPDATE inbox SET chunks_applied=? WHERE id=?", (done, entry["id"]))
+                commit()
+        note_changelog_state(conn, cfg, manifest)
+        conn.execute("""UPDATE inbox SET status='applied', error=NULL, chunks_applied=?,
+                        applied_at=STRFTIME('%Y-%m-%dT%H:%M:%fZ','now') WHERE id=?""", (done, entry["id"]))
+        commit()
+    except Exception as e:
+        conn.rollback()
+        conn.execute("UPDATE inbox SET status='error', error=? WHERE id=?", (str(e), entry["id"]))
+        conn.commit()
+        raise
+    resumed = f" (resumed at chunk {entry['done'] + 1})" if entry["done"] else ""
+    print(f"Imported bundle {name}{resumed}: {applied}")
+    return applied
+
+def apply_bundle_deletes(conn, deletes, applied):
+    """Apply a bundle's deletes, child tables first. They go before its upserts: after
+    coalescing no guid is in both, and a renamed row's delete frees the id its upsert reuses."""
+    n = sum(apply_deletes(conn, table, deletes.get(table)) for table in reversed(SYNC_TABLES))
+    if n:
+        applied["delete"] = n
+
+def import_bundle(conn, cfg, in_path: Path, bulk=True, known=None):
+    """Apply a bundle; bulk=False keeps the original row-at-a-time path.
+
+    `known` is an optional load_known_hashes() map shared across the bundles of one sync.
+    Progress is kept in the inbox table (see apply_units); BundleError if the file is
+    truncated or a chunk fails its checksum.
+    """
     in_path = Path(in_path)
     assert in_path.exists(), f"file not found: {in_path}"
-    with zipfile.ZipFile(in_path, "r") as z:
-        _ = json.loads(z.read("manifest.json").decode("utf-8"))
-        def iter_jsonl(name):
-            if name in z.namelist():
-                data = z.read(name).decode("utf-8").strip()
-                if data:
-                    for line in data.splitlines():
-                        yield json.loads(line)
+    z, manifest = open_bundle(in_path)
+    with z:
+        ensure_sync_state(conn)
+        if bulk:
+            entry = inbox_begin(conn, manifest, in_path.name)
+            units = bundle_units(manifest)[entry["done"]:]
+            return apply_units(conn, cfg, in_path.name, manifest, entry,
+                               ((u, unit_payload(z, manifest, u)) for u in units), known)
 
         cur = conn.cursor()
         applied = {"insert":0,"update":0,"skip":0}
-        for rec in iter_jsonl("records.jsonl"):
+        apply_bundle_deletes(conn, {t: delete_keys(table_rows(z, manifest, t, "deletes")) for t in SYNC_TABLES},
+                             applied)
+
+        for rec in table_rows(z, manifest, "records"):
             action = upsert_record(conn, rec)
             applied[action]+=1
 
-        for note in iter_jsonl("record_notes.jsonl"):
+        for note in table_rows(z, manifest, "record_notes"):
             cur.execute("SELECT 1 FROM record_notes WHERE guid=?", (note["guid"],))
             if cur.fetchone() is None:
                 fields = ", ".join(note.keys())
                 qmarks = ", ".join(["?"]*len(note))
                 cur.execute(f"INSERT INTO record_notes ({fields}) VALUES ({qmarks})", tuple(note.values()))
 
-        for h in iter_jsonl("record_history.jsonl"):
+        for h in table_rows(z, manifest, "record_history"):
             cur.execute("SELECT 1 FROM record_history WHERE guid=?", (h["guid"],))
             if cur.fetchone() is None:
                 fields = ", ".join(h.keys())
                 qmarks = ", ".join(["?"]*len(h))
                 cur.execute(f"INSERT INTO record_history ({fields}) VALUES ({qmarks})", tuple(h.values()))
 
-        for rd in iter_jsonl("record_doctors.jsonl"):
+        for rd in table_rows(z, manifest, "record_doctors"):
             cur.execute("SELECT 1 FROM record_doctors WHERE guid=?", (rd["guid"],))
             if cur.fetchone() is None:
                 fields = ", ".join(rd.keys())
                 qmarks = ", ".join(["?"]*len(rd))
                 cur.execute(f"INSERT INTO record_doctors ({fields}) VALUES ({qmarks})", tuple(rd.values()))
 
+        note_changelog_state(conn, cfg, manifest)
         conn.commit()
         print(f"Imported bundle {in_path.name}: {applied}")
+        return applied
+
+def load_bundle(path):
+    """Decompress, verify and parse a whole bundle (runs in an ingest worker).
+
+    A unit that fails is kept as its exception, raised only if the writer gets to
+    it (a chunk applied in an earlier run is never looked at again).
+    """
+    t0 = time.perf_counter()
+    z, manifest = open_bundle(path)
+    with z:
+        units = []
+        for unit in bundle_units(manifest):
+            try:
+                payload = unit_payload(z, manifest, unit)
+                units.append((unit, payload if unit["kind"] == "deletes" else list(payload)))
+            except BundleError as e:
+                units.append((unit, e))
+    return {"manifest": manifest, "units": units, "parse_s": time.perf_counter() - t0}
+
+def apply_loaded(conn, name, loaded, known=None, cfg=None):
+    ensure_sync_state(conn)
+    entry = inbox_begin(conn, loaded["manifest"], name)
+    return apply_units(conn, cfg, name, loaded["manifest"], entry, loaded["units"][entry["done"]:], known)
+
+def ingest_inbox(conn, cfg, paths, workers=1):
+    """Import bundles in the given order, deleting each one once it is applied.
+
+    With workers > 1 a process pool decompresses and parses up to 2*workers bundles
+    ahead of this (single) writer, which still applies them strictly in order so
+    conflicts resolve exactly as in a one-by-one run. A bundle that fails stays in
+    the inbox; the next run picks it up at its first unapplied chunk.
+    """
+    stats = {"bundles": 0, "errors": 0, "records": 0, "parse_s": 0.0, "apply_s": 0.0}
+    t0 = time.perf_counter()
+    known = load_known_hashes(conn) if paths else None
+
+    def apply(p, fn):
+        t = time.perf_counter()
+        try:
+            applied = fn()
+            p.unlink()
+            stats["bundles"] += 1
+            stats["records"] += sum(applied.values())
+        except Exception as e:
+            conn.rollback()
+            stats["errors"] += 1
+            print(f"ERROR importing {p.name}: {e}")
+        stats["apply_s"] += time.perf_counter() - t
+
+    if workers <= 1:
+        for p in paths:
+            apply(p, lambda: import_bundle(conn, cfg, p, known=known))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            todo, pending = iter(paths), deque()
+            def fill():
+                while len(pending) < 2 * workers:
+                    p = next(todo, None)
+                    if p is None:
+                        return
+                    pending.append((p, pool.submit(load_bundle, p)))
+            fill()
+            while pending:
+                p, fut = pending.popleft()
+                fill()
+                def run():
+                    loaded = fut.result()
+                    stats["parse_s"] += loaded["parse_s"]
+                    return apply_loaded(conn, p.name, loaded, known, cfg)
+                apply(p, run)
+
+    if stats["bundles"] or stats["errors"]:
+        dt = time.perf_counter() - t0
+        print(f"Inbox: {stats['bundles']} bundles ({stats['errors']} errors), {stats['records']} records "
+              f"in {dt:.2f}s = {stats['bundles'] / dt:.1f} bundles/s, {stats['records'] / dt:.0f} records/s "
+              f"[workers={workers}, parse {stats['parse_s']:.2f}s, apply {stats['apply_s']:.2f}s]")
+    return stats
+
+# ---------- snapshot bootstrap ----------
+# A new or far-behind node starts from a copy of the sync tables instead of
+# replaying every bundle. "snapshot create" takes a consistent copy with VACUUM
+# INTO, keeps just the sync tables plus their high marks (snapshot_info) and
+# compacts it; "snapshot restore" replaces the local sync tables with it in one
+# transaction, then applies whatever in the inbox is newer.
+
+SNAPSHOT_INFO = "snapshot_info"
+
+def create_snapshot(conn, cfg, out_path, peer=None):
+    """Write a snapshot of the sync tables to out_path; returns its info.
+
+    With peer=<name> the watermarks and change_log cursor for that peer move to
+    the snapshot's marks, so the next bundle it gets starts right after it.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    part = out_path.with_name(out_path.name + ".part")
+    part.unlink(missing_ok=True)
+    t0 = time.perf_counter()
+    conn.commit()
+    conn.execute("VACUUM INTO ?", (str(part),))  # one read transaction: a consistent copy
+
+    snap = sqlite3.connect(part, isolation_level=None)
+    try:
+        have = {r[0] for r in snap.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        info = {
+            "producer": producer_id(cfg),
+            "peer": peer,
+            "created_at": datetime.now(UTC).isoformat().replace("+00:00","Z"),
+            "marks": {t: delta_mark(snap) for t in SYNC_TABLES},
+            "changelog": snap.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+                         if "change_log" in have else 0,
+            "rows": {t: snap.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in SYNC_TABLES},
+        }
+        for kind, name in snap.execute("SELECT type, name FROM sqlite_master WHERE type IN ('view','trigger')").fetchall():
+            snap.execute(f"DROP {kind.upper()} IF EXISTS {qident(name)}")
+        for name in have - set(SYNC_TABLES) - {"sqlite_sequence"}:
+            snap.execute(f"DROP TABLE IF EXISTS {qident(name)}")
+        snap.execute(f"CREATE TABLE {SNAPSHOT_INFO} (k TEXT PRIMARY KEY, v TEXT)")
+        snap.execute(f"INSERT INTO {SNAPSHOT_INFO} VALUES ('info', ?)", (json.dumps(info),))
+        snap.execute("VACUUM")
+    finally:
+        snap.close()
+    os.replace(part, out_path)
+
+    if peer:
+        ensure_sync_state(conn)
+        for table, mark in info["marks"].items():
+            if mark is not None:
+                set_meta(conn, f"watermark:{peer}:{table}", json.dumps(mark))
+        set_meta(conn, f"changelog:{peer}", str(info["changelog"]))
+        conn.commit()
+    print(f"Snapshot {out_path} ({out_path.stat().st_size / 2**20:.1f} MB, {time.perf_counter() - t0:.1f}s): {info['rows']}")
+    return info
+
+def read_snapshot_info(path):
+    snap = sqlite3.connect(f"file:{quote(Path(path).as_posix(), safe='/:')}?mode=ro", uri=True)
+    try:
+        check = snap.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise ValueError(f"{Path(path).name} fails quick_check: {check}")
+        try:
+            return json.loads(snap.execute(f"SELECT v FROM {SNAPSHOT_INFO} WHERE k='info'").fetchone()[0])
+        except (sqlite3.OperationalError, TypeError):
+            raise ValueError(f"{Path(path).name} is not a snapshot (no {SNAPSHOT_INFO})")
+    finally:
+        snap.close()
+
+def unsent_changes(conn, cfg):
+    """Local changes the snapshot's producer hasn't been sent (what a restore would drop)."""
+    cursor = get_meta(conn, f"changelog:{peer_id(cfg)}")
+    if cursor is not None:
+        return conn.execute("SELECT COUNT(*) FROM change_log WHERE id > ?", (int(cursor),)).fetchone()[0]
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in SYNC_TABLES)
+
+def restore_snapshot(conn, cfg, path, force=False):
+    """Replace the sync tables with a snapshot's, atomically; returns its info.
+
+    Refuses (ValueError) while this DB holds changes not yet exported to the peer,
+    unless force=True. Other tables (meta, inbox, outbox, ...) are left alone.
+    """
+    path = Path(path)
+    info = read_snapshot_info(path)
+    ensure_sync_state(conn)
+    ensure_change_capture(conn)
+    pending = unsent_changes(conn, cfg)
+    if pending and not force:
+        raise ValueError(f"{pending} local changes are not known to have been exported to {peer_id(cfg)}; "
+                         f"a restore would drop them (use --force to restore anyway)")
+    t0 = time.perf_counter()
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS snap", (str(path),))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = {}
+        # no change capture while the tables are swapped: nothing in here is a local change
+        triggers = {t: change_triggers(conn, t) for t in SYNC_TABLES}
+        for names in triggers.values():
+            for name in names:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for table in reversed(SYNC_TABLES):
+            conn.execute(f"DELETE FROM main.{table}")
+        for table in SYNC_TABLES:
+            mine = [r[1] for r in conn.execute(f"PRAGMA main.table_info({table})")]
+            theirs = {r[1] for r in conn.execute(f"PRAGMA snap.table_info({table})")}
+            # the snapshot producer's seek leases stay behind (seek_queue.LOCAL_COLUMNS)
+            cols = [c for c in mine if c in theirs and not (table == "records" and c in seek_queue.LOCAL_COLUMNS)]
+            pick = ", ".join(seek_queue.shared_value(f"snap.{table}", c) if table == "records" else qident(c) for c in cols)
+            rows[table] = conn.execute(f"INSERT INTO main.{table} ({', '.join(map(qident, cols))}) "
+                                       f"SELECT {pick} FROM snap.{table}").rowcount
+        for names in triggers.values():
+            for sql in names.values():
+                conn.execute(sql)
+
+        # nothing to send back, and the producer's change_log is applied up to the snapshot
+        me = peer_id(cfg)
+        for table in SYNC_TABLES:
+            mark = delta_mark(conn)
+            if mark is not None:
+                set_meta(conn, f"watermark:{me}:{table}", json.dumps(mark))
+        set_meta(conn, f"changelog:{me}", str(change_high_mark(conn)))
+        set_meta(conn, f"changelog_applied:{info['producer']}", json.dumps({"to": info["changelog"], "peer": info["peer"]}))
+        set_meta(conn, f"snapshot:{info['producer']}", json.dumps(info))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE snap")
+    print(f"Restored snapshot {path.name} from {info['producer']} ({info['created_at']}) "
+          f"in {time.perf_counter() - t0:.1f}s: {rows}")
+    return info
+
+def in_snapshot(conn, manifest):
+    """True if the bundle's producer exported it before the snapshot this DB was restored from."""
+    snap = get_meta(conn, f"snapshot:{manifest.get('producer')}")
+    ranges = manifest.get("ranges")
+    if not snap or not ranges:
+        return False
+    snap = json.loads(snap)
+    changes = manifest.get("changes")
+    if changes and changes.get("to") is not None and changes["to"] > snap["changelog"]:
+        return False
+    try:
+        for table in SYNC_TABLES:
+            to = (ranges.get(table) or {}).get("to")
+            if to is None:
+                continue
+            mark = snap["marks"].get(table)
+            cols = WATERMARK_COLS
+            if mark is None or tuple(to[c] for c in cols) > tuple(mark[c] for c in cols):
+                return False
+    except (KeyError, TypeError):
+        return False
+    return True
 
 def cmd_init(args):
     cfg = load_config(args.config)
@@ -152,87 +1129,205 @@ def cmd_init(args):
     run_sql_file(conn, args.schema)
     conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
     conn.commit()
+    ensure_list_indexes(conn)
+    ensure_change_capture(conn)
     print(f"Initialized DB at {cfg['db']['path']} with schema {args.schema}")
 
 def cmd_export(args):
     cfg = load_config(args.config)
     conn = connect_db(cfg)
-    export_bundle(conn, cfg, Path(args.out))
+    scope = "delta" if args.scope == "assigned" else args.scope
+    export_bundle(conn, cfg, Path(args.out), scope=scope, peer=args.peer)
+
+def cmd_compact(args):
+    cfg = load_config(args.config)
+    conn = connect_db(cfg)
+    ensure_sync_state(conn)
+    res = compact_change_log(conn, exported=args.exported, dry_run=args.dry_run)
+    left = conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    if res["waiting_for"]:
+        print(f"change_log not compacted: no {'export' if args.exported else 'ack'} yet from "
+              + ", ".join(res["waiting_for"]))
+    elif res["upto"] is None:
+        print("change_log not compacted: no peer has been sent an export yet")
+    else:
+        print(f"change_log: {'would prune' if args.dry_run else 'pruned'} {res['pruned']} entries up to id "
+              f"{res['upto']}, {left - (res['pruned'] if args.dry_run else 0)} left")
 
 def cmd_import(args):
     cfg = load_config(args.config)
     conn = connect_db(cfg)
     import_bundle(conn, cfg, Path(args.file))
 
+def cmd_snapshot(args):
+    cfg = load_config(args.config)
+    conn = connect_db(cfg)
+    if args.action == "create":
+        create_snapshot(conn, cfg, Path(args.file), peer=args.peer)
+        return
+    try:
+        restore_snapshot(conn, cfg, Path(args.file), force=args.force)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    inbox, _ = ensure_inbox_outbox(cfg)
+    ingest_inbox(conn, cfg, sorted(inbox.glob("*.lsx")), workers=args.workers)
+
 def cmd_sync_auto(args):
     cfg = load_config(args.config)
     conn = connect_db(cfg)
     inbox, outbox = ensure_inbox_outbox(cfg)
 
-    for p in sorted(inbox.glob("*.lsx")):
-        try:
-            import_bundle(conn, cfg, p)
-            p.unlink()
-        except Exception as e:
-            print(f"ERROR importing {p.name}: {e}")
+    ingest_inbox(conn, cfg, sorted(inbox.glob("*.lsx")), workers=args.workers)
 
     ts = now_iso()
     out = outbox / f"bundle_{ts}.lsx"
     try:
-        export_bundle(conn, cfg, out)
+        manifest = export_bundle(conn, cfg, out, scope="full" if args.full else "changes")
     except Exception as e:
         print(f"ERROR exporting: {e}")
+        return
+    if manifest is None:
+        return
 
     shared = cfg["paths"].get("shared_main_inbox")
     if shared and os.path.exists(shared):
         try:
             import shutil
-            shutil.copy2(out, shared)
+            # copy under a name the peer's inbox glob skips, then rename: it never sees half a bundle
+            part = Path(shared) / (out.name + ".part")
+            shutil.copy2(out, part)
+            os.replace(part, Path(shared) / out.name)
             print(f"Copied {out.name} to {shared}")
         except Exception as e:
             print(f"NOTE: could not copy to shared inbox: {e}")
 
+# ---------- record list / seek (library API) ----------
+
+LIST_COLS = ("id", "guid", "source_name", "owner_agent_id", "to_seek", "seek_priority", "seek_status",
+             "version", "updated_at")
+LIST_MAX = 1000
+
+# keyset walks for list_records: newest first, optionally filtered by seek status or owner
+# (the integer primary key rides along in each index, so (updated_at, id) is the full key)
+LIST_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_records_updated ON records(updated_at);
+CREATE INDEX IF NOT EXISTS idx_records_status_updated ON records(seek_status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_records_owner_updated ON records(owner_agent_id, updated_at);
+"""
+
+def ensure_list_indexes(conn):
+    for stmt in LIST_INDEXES.split(";"):
+        if stmt.strip():
+            conn.execute(stmt)
+    conn.commit()
+
+def encode_list_cursor(row):
+    raw = json.dumps([row["updated_at"], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_list_cursor(cursor):
+    try:
+        updated_at, rid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return updated_at, int(rid)
+    except Exception as e:
+        raise ValueError(f"bad cursor: {cursor!r}") from e
+
+def list_records(conn, limit=50, cursor=None, seek_status=None, to_seek=None, owner=None):
+    """One page of records, most recently updated first.
+
+    Returns {"items": [dict, ...], "next_cursor": str | None}; pass next_cursor
+    back to get the following page.
+    """
+    where, params = [], []
+    if seek_status:
+        where.append("seek_status = ?"); params.append(seek_status)
+    if to_seek is not None:
+        where.append("to_seek = ?"); params.append(int(to_seek))
+    if owner:
+        where.append("owner_agent_id = ?"); params.append(owner)
+    if cursor:
+        where.append("(updated_at, id) < (?, ?)"); params.extend(decode_list_cursor(cursor))
+    limit = max(1, min(int(limit), LIST_MAX))
+    sql = (f"SELECT {', '.join(LIST_COLS)} FROM records"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + " ORDER BY updated_at DESC, id DESC LIMIT ?")
+    rows = [dict(r) for r in conn.execute(sql, (*params, limit + 1))]
+    more = len(rows) > limit
+    del rows[limit:]
+    return {"items": rows, "next_cursor": encode_list_cursor(rows[-1]) if more else None}
+
+def get_record(conn, guid):
+    row = conn.execute(f"SELECT {', '.join(LIST_COLS)} FROM records WHERE guid=?", (guid,)).fetchone()
+    return dict(row) if row else None
+
+def set_seek(conn, guid, on=None, priority=None, status=None):
+    """Change a record's seek flags (on=True/False toggles to_seek); returns the updated row, None if missing."""
+    sets, params = [], []
+    if on is True:
+        sets += ["to_seek=1", "seek_status='queued'", "attempts=0"]  # fresh retry budget for the seek queue
+    elif on is False:
+        sets += ["to_seek=0", "seek_status='paused'"]
+    if priority is not None:
+        sets.append("seek_priority=?"); params.append(int(priority))
+    if status is not None:
+        sets.append("seek_status=?"); params.append(status)
+    sets.append("version=version+1")
+    sets.append("updated_at=strftime('%Y-%m-%dT%H:%M:%fZ','now')")
+    row = conn.execute(f"UPDATE records SET {', '.join(sets)} WHERE guid=? RETURNING {', '.join(LIST_COLS)}",
+                       (*params, guid)).fetchone()
+    conn.commit()
+    return dict(row) if row else None
+
 def cmd_seek(args):
     cfg = load_config(args.config)
     conn = connect_db(cfg)
-    cur = conn.cursor()
-    cur.execute("SELECT 1 FROM records WHERE guid=?", (args.guid,))
-    if cur.fetchone() is None:
+    on = True if args.on else False if args.off else None
+    row = set_seek(conn, args.guid, on=on, priority=args.priority, status=args.status)
+    if args.json:
+        print(json.dumps({"ok": row is not None, "record": row}, ensure_ascii=False))
+    elif row is None:
         print("Record not found:", args.guid)
-        return
-    sets = []
-    params = []
-    if args.on:
-        sets.append("to_seek=?"); params.append(1)
-        sets.append("seek_status=?"); params.append("queued")
-    if args.off:
-        sets.append("to_seek=?"); params.append(0)
-        sets.append("seek_status=?"); params.append("paused")
-    if args.priority is not None:
-        sets.append("seek_priority=?"); params.append(int(args.priority))
-    if args.status is not None:
-        sets.append("seek_status=?"); params.append(args.status)
-    sets.append("version=version+1")
-    sets.append("updated_at=strftime('%Y-%m-%dT%H:%M:%fZ','now')")
-    sql = f"UPDATE records SET {', '.join(sets)} WHERE guid=?"
-    params.append(args.guid)
-    cur.execute(sql, tuple(params))
-    conn.commit()
-    print("Updated seek:", args.guid)
+    else:
+        print("Updated seek:", args.guid)
 
 def cmd_list(args):
     cfg = load_config(args.config)
     conn = connect_db(cfg)
-    cur = conn.cursor()
-    cur.execute("SELECT guid, source_name, to_seek, seek_priority, seek_status, version FROM records ORDER BY updated_at DESC LIMIT ?", (args.limit,))
-    rows = cur.fetchall()
-    if not rows:
+    page = list_records(conn, args.limit, args.cursor, args.status, owner=args.owner)
+    if args.json:
+        print(json.dumps(page, ensure_ascii=False))
+        return
+    if not page["items"]:
         print("No records.")
         return
-    for r in rows:
+    for r in page["items"]:
         print(f"{r['guid']}  | {r['source_name']} | seek={r['to_seek']} pri={r['seek_priority']} {r['seek_status']} | v{r['version']}")
+    if page["next_cursor"]:
+        print(f"(more: --cursor {page['next_cursor']})")
+
+def cmd_queue(args):
+    cfg = load_config(args.config)
+    conn = connect_db(cfg)
+    conn.execute("BEGIN IMMEDIATE")
+    if not seek_queue.ensure_schema(conn):
+        print("No records table; run init first.")
+        return
+    if args.action == "claim":
+        out = {"items": seek_queue.claim(conn, args.agent, args.n, args.lease)}
+    elif args.action == "complete":
+        out = seek_queue.complete(conn, args.agent, args.guid)
+    elif args.action == "fail":
+        out = seek_queue.fail(conn, args.agent, args.guid, args.error, retry=not args.no_retry)
+    elif args.action == "expire":
+        out = {"expired": seek_queue.expire(conn)}
+    else:
+        out = seek_queue.stats(conn)
+    conn.commit()
+    print(json.dumps(out, ensure_ascii=False))
 
 def main():
+    multiprocessing.freeze_support()  # ingest workers under the PyInstaller exe
     parser = argparse.ArgumentParser(prog="life-support-api", description="Life-Support API CLI")
     sub = parser.add_subparsers(dest="cmd")
 
@@ -243,7 +1338,9 @@ def main():
     p_init.set_defaults(func=cmd_init)
 
     p_export = sub.add_parser("export")
-    p_export.add_argument("--scope", default="assigned")
+    # "assigned" is the historical default and behaves like "delta"; "changes" reads change_log
+    p_export.add_argument("--scope", choices=["assigned","delta","changes","full"], default="assigned")
+    p_export.add_argument("--peer", help="watermark key for the receiving node (default from config)")
     p_export.add_argument("--out", required=True)
     p_export.add_argument("--config", required=True)
     p_export.set_defaults(func=cmd_export)
@@ -255,9 +1352,29 @@ def main():
 
     p_sync = sub.add_parser("sync")
     p_sync.add_argument("--auto", action="store_true")
+    p_sync.add_argument("--full", action="store_true", help="export every row, not just changes since the last bundle")
+    p_sync.add_argument("--workers", type=int, default=1, help="processes parsing inbox bundles ahead of the writer")
     p_sync.add_argument("--config", required=True)
     p_sync.set_defaults(func=cmd_sync_auto)
 
+    p_snap = sub.add_parser("snapshot", help="bootstrap a node from a copy of the sync tables")
+    p_snap.add_argument("action", choices=["create", "restore"],
+                        help="create: write a snapshot of this DB; restore: replace this DB's sync tables "
+                             "with one, then apply the inbox")
+    p_snap.add_argument("--file", required=True, help="snapshot file to write / read")
+    p_snap.add_argument("--peer", help="create: node the snapshot is for; its watermarks move to the snapshot")
+    p_snap.add_argument("--force", action="store_true", help="restore even over changes never exported")
+    p_snap.add_argument("--workers", type=int, default=1, help="restore: processes parsing inbox bundles")
+    p_snap.add_argument("--config", required=True)
+    p_snap.set_defaults(func=cmd_snapshot)
+
+    p_compact = sub.add_parser("compact", help="prune change_log entries every peer has acknowledged")
+    p_compact.add_argument("--exported", action="store_true",
+                           help="prune what every peer has been sent, acknowledged or not (one-way setups)")
+    p_compact.add_argument("--dry-run", action="store_true", help="only report what would be pruned")
+    p_compact.add_argument("--config", required=True)
+    p_compact.set_defaults(func=cmd_compact)
+
     p_seek = sub.add_parser("seek")
     p_seek.add_argument("--guid", required=True)
     onoff = p_seek.add_mutually_exclusive_group()
@@ -265,15 +1382,33 @@ def main():
     onoff.add_argument("--off", action="store_true")
     p_seek.add_argument("--priority", type=int)
     p_seek.add_argument("--status", choices=["queued","in_progress","paused","done"])
+    p_seek.add_argument("--json", action="store_true", help="print the updated record as JSON")
     p_seek.add_argument("--config", required=True)
     p_seek.set_defaults(func=cmd_seek)
 
     p_list = sub.add_parser("list")
     p_list.add_argument("--config", required=True)
     p_list.add_argument("--limit", type=int, default=10)
+    p_list.add_argument("--cursor", help="next_cursor of the previous page")
+    p_list.add_argument("--status", choices=["queued","in_progress","paused","done"], help="only this seek_status")
+    p_list.add_argument("--owner", help="only records of this owner_agent_id")
+    p_list.add_argument("--json", action="store_true", help='print {"items": [...], "next_cursor": ...}')
     p_list.set_defaults(func=cmd_list)
 
+    p_queue = sub.add_parser("queue", help="seek work queue: lease due records, then complete or fail them")
+    p_queue.add_argument("action", choices=["claim", "complete", "fail", "expire", "stats"])
+    p_queue.add_argument("--agent", help="agent id holding the lease (claim/complete/fail)")
+    p_queue.add_argument("--n", type=int, default=1, help="records to claim")
+    p_queue.add_argument("--lease", type=float, help="lease seconds (default LS_SEEK_LEASE_S)")
+    p_queue.add_argument("--guid", action="append", default=[], help="record to complete/fail (repeatable)")
+    p_queue.add_argument("--error", help="reason stored with a failure")
+    p_queue.add_argument("--no-retry", action="store_true", help="pause the record instead of retrying it")
+    p_queue.add_argument("--config", required=True)
+    p_queue.set_defaults(func=cmd_queue)
+
     args = parser.parse_args()
+    if getattr(args, "cmd", None) == "queue" and args.action in ("claim", "complete", "fail") and not args.agent:
+        parser.error("queue claim/complete/fail need --agent")
     if not hasattr(args, "func"):
         parser.print_help()
         sys.exit(1)
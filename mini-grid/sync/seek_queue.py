@@ -0,0 +1,186 @@
+# seek_queue.py
+# Work queue over records.to_seek: agents lease the next due records, then
+# complete them or fail them with backoff. Used by life_support_api.py
+# ("queue" subcommand) and by api/server.py (/api/queue/*).
+#
+# A record is claimable when to_seek=1, seek_status='queued' and
+# next_action_at is NULL or past. claim() order: seek_priority 5..0 (NULL last),
+# then next_action_at (NULL = due now), then id. The v_seek_queue view keeps its
+# original due-first order (undated rows last) for the list consumers.
+#
+# claim()    one UPDATE ... RETURNING: seek_status='in_progress', attempts+1,
+#            last_attempt_at, claimed_by, lease_until. The candidate set is one
+#            LIMITed seek per priority level on idx_records_seek_due, so a claim
+#            costs a few index seeks however long the queue is.
+# complete() in_progress -> done, only for the agent holding the lease.
+# fail()     back to queued with next_action_at = now + backoff(attempts), or
+#            paused once attempts reaches max_attempts (last_error kept).
+# expire()   in_progress rows whose lease ran out -> queued (or paused, as
+#            fail()); claim() runs it first in the same transaction.
+#
+# Lease state is node-local. LOCAL_COLUMNS never travel in bundles, and the
+# records triggers (updated_at touch here, change capture in
+# life_support_api.py) skip updates that only change them or only move
+# seek_status between queued and in_progress (shared_value), so claims and
+# lease expiry are neither logged nor shipped to peers.
+#
+# Every function expects the caller to hold a write transaction (BEGIN
+# IMMEDIATE) for the writes; none of them commit.
+#
+# Env (all optional):
+#   LS_SEEK_LEASE_S        lease length in seconds (default 600)
+#   LS_SEEK_MAX_ATTEMPTS   attempts before a record is paused (default 8)
+#   LS_SEEK_BACKOFF_S      first retry delay, doubled per attempt (default 60)
+#   LS_SEEK_BACKOFF_MAX_S  retry delay cap (default 86400)
+
+import json, os
+from datetime import datetime, timedelta, UTC
+
+LEASE_S = float(os.environ.get("LS_SEEK_LEASE_S", "600"))
+MAX_ATTEMPTS = int(os.environ.get("LS_SEEK_MAX_ATTEMPTS", "8"))
+BACKOFF_S = float(os.environ.get("LS_SEEK_BACKOFF_S", "60"))
+BACKOFF_MAX_S = float(os.environ.get("LS_SEEK_BACKOFF_MAX_S", "86400"))
+CLAIM_MAX = 1000
+
+COLUMNS = {"claimed_by": "TEXT", "lease_until": "TEXT", "last_error": "TEXT"}
+LOCAL_COLUMNS = ("attempts", "last_attempt_at", *COLUMNS)
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_records_seek_due ON records(seek_priority, IFNULL(next_action_at, ''), id)
+  WHERE to_seek=1 AND seek_status='queued';
+CREATE INDEX IF NOT EXISTS idx_records_seek_lease ON records(lease_until)
+  WHERE seek_status='in_progress';
+"""
+
+VIEW = """CREATE VIEW v_seek_queue AS
+SELECT guid, source_name, source_url, seek_priority, seek_status, next_action_at, attempts, claimed_by, lease_until
+FROM records
+WHERE to_seek=1 AND seek_status IN ('queued','in_progress')
+ORDER BY COALESCE(next_action_at,'9999-12-31'), seek_priority DESC, guid"""
+
+TOUCH_TRIGGER = """CREATE TRIGGER trg_records_updated_at AFTER UPDATE ON records FOR EACH ROW WHEN {changed} BEGIN
+  UPDATE records SET updated_at = STRFTIME('%Y-%m-%dT%H:%M:%fZ','now') WHERE id = NEW.id;
+END"""
+
+ITEM = "guid, source_name, source_url, seek_priority, attempts, next_action_at, lease_until"
+
+def ts(dt):
+    """Same text form as the records defaults: 2025-09-11T08:15:02.123Z."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+def now_ts(offset_s=0.0):
+    return ts(datetime.now(UTC) + timedelta(seconds=offset_s))
+
+def shared_value(row, col):
+    """SQL for a records column as peers see it: a lease (in_progress) reads as queued."""
+    if col == "seek_status":
+        return f"CASE {row}.seek_status WHEN 'in_progress' THEN 'queued' ELSE {row}.seek_status END"
+    return f"{row}.{col}"
+
+def edited(cols):
+    """Trigger WHEN clause: the UPDATE changed more than updated_at and the lease state."""
+    return " OR ".join(f"({shared_value('OLD', c)}) IS NOT ({shared_value('NEW', c)})"
+                       for c in cols if c not in LOCAL_COLUMNS and c != "updated_at")
+
+def ensure_schema(conn):
+    """Lease columns, the lease-blind updated_at trigger, queue indexes and the
+    v_seek_queue view. False if there is no records table."""
+    have = {r[1] for r in conn.execute("PRAGMA table_info(records)")}
+    if not have:
+        return False
+    for col, decl in COLUMNS.items():
+        if col not in have:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {col} {decl}")
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(records)")]
+    # recreated only when stale: a schema change invalidates every other
+    # connection's prepared statements
+    for kind, name, sql in (("trigger", "trg_records_updated_at", TOUCH_TRIGGER.format(changed=edited(cols))),
+                            ("view", "v_seek_queue", VIEW)):
+        have = conn.execute("SELECT sql FROM sqlite_master WHERE type=? AND name=?", (kind, name)).fetchone()
+        if not have or have[0] != sql:
+            conn.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+            conn.execute(sql)
+    for stmt in INDEXES.split(";"):
+        if stmt.strip():
+            conn.execute(stmt)
+    return True
+
+def _due_ids():
+    # one LIMITed index seek per priority; UNION ALL runs them in order and
+    # stops as soon as the outer LIMIT is met
+    branches = [f"seek_priority = {p}" for p in range(5, -1, -1)] + ["seek_priority IS NULL"]
+    return " UNION ALL ".join(
+        f"SELECT * FROM (SELECT id FROM records WHERE to_seek=1 AND seek_status='queued' AND {b} "
+        f"AND IFNULL(next_action_at, '') <= :now ORDER BY IFNULL(next_action_at, ''), id LIMIT :n)"
+        for b in branches)
+
+CLAIM_SQL = f"""UPDATE records
+   SET seek_status='in_progress', attempts=attempts+1, last_attempt_at=:now,
+       claimed_by=:agent, lease_until=:until, last_error=NULL
+ WHERE id IN (SELECT id FROM ({_due_ids()}) LIMIT :n)
+RETURNING {ITEM}"""
+
+# attempts was bumped at claim time, so the n-th failure waits base * 2^(n-1)
+RETRY_SET = """seek_status = CASE WHEN attempts >= :max_attempts THEN 'paused' ELSE 'queued' END,
+       next_action_at = CASE WHEN attempts >= :max_attempts THEN next_action_at
+                        ELSE strftime('%Y-%m-%dT%H:%M:%fZ', julianday(:now)
+                             + MIN(:base * (1 << MIN(attempts - 1, 30)), :cap) / 86400.0) END,
+       claimed_by=NULL, lease_until=NULL"""
+
+def _retry_params(now):
+    return {"now": now, "max_attempts": MAX_ATTEMPTS, "base": BACKOFF_S, "cap": BACKOFF_MAX_S}
+
+def expire(conn, now=None):
+    """Requeue (with backoff) or pause in_progress records whose lease has run out."""
+    now = now or now_ts()
+    return conn.execute(f"""UPDATE records SET {RETRY_SET}, last_error='lease expired'
+                             WHERE seek_status='in_progress' AND lease_until <= :now""", _retry_params(now)).rowcount
+
+def claim(conn, agent_id, n=1, lease_s=None):
+    """Lease up to n due records to agent_id; returns them in queue order."""
+    n = max(1, min(int(n), CLAIM_MAX))
+    now = now_ts()
+    expire(conn, now)
+    rows = conn.execute(CLAIM_SQL, {"now": now, "n": n, "agent": agent_id,
+                                    "until": now_ts(LEASE_S if lease_s is None else lease_s)}).fetchall()
+    items = [dict(zip(ITEM.split(", "), r)) for r in rows]
+    items.sort(key=lambda r: (-(r["seek_priority"] if r["seek_priority"] is not None else -1),
+                              r["next_action_at"] or "", r["guid"]))
+    return items
+
+def _owned(sql, conn, agent_id, guids, params):
+    return conn.execute(f"""{sql}
+         WHERE guid IN (SELECT value FROM json_each(:guids))
+           AND seek_status='in_progress' AND claimed_by=:agent
+        RETURNING guid""", dict(params, guids=json.dumps(list(guids)), agent=agent_id)).fetchall()
+
+def _result(guids, rows):
+    done = {r[0] for r in rows}
+    return {"ok": len(done) == len(set(guids)), "updated": len(done),
+            "not_held": [g for g in dict.fromkeys(guids) if g not in done]}
+
+def complete(conn, agent_id, guids):
+    """Mark leased records done. Records the agent no longer holds are reported in not_held."""
+    rows = _owned("UPDATE records SET seek_status='done', claimed_by=NULL, lease_until=NULL, last_error=NULL",
+                  conn, agent_id, guids, {})
+    return _result(guids, rows)
+
+def fail(conn, agent_id, guids, error=None, retry=True):
+    """Give leased records back: retried after backoff, or paused when retry is off or attempts are used up."""
+    params = _retry_params(now_ts())
+    if not retry:
+        params["max_attempts"] = 0
+    rows = _owned(f"UPDATE records SET {RETRY_SET}, last_error=:error", conn, agent_id, guids,
+                  dict(params, error=error))
+    return _result(guids, rows)
+
+def stats(conn):
+    now = now_ts()
+    row = conn.execute("""SELECT
+        (SELECT COUNT(*) FROM records WHERE to_seek=1 AND seek_status='queued' AND IFNULL(next_action_at, '') <= :now),
+        (SELECT COUNT(*) FROM records WHERE to_seek=1 AND seek_status='queued' AND IFNULL(next_action_at, '') > :now),
+        (SELECT COUNT(*) FROM records WHERE seek_status='in_progress'),
+        (SELECT COUNT(*) FROM records WHERE seek_status='in_progress' AND lease_until <= :now),
+        (SELECT MIN(IFNULL(next_action_at, '')) FROM records WHERE to_seek=1 AND seek_status='queued' AND IFNULL(next_action_at, '') > :now)
+        """, {"now": now}).fetchone()
+    return dict(zip(("due", "scheduled", "in_progress", "lease_expired", "next_due_at"), row), now=now)
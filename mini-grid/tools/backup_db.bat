@@ -3,20 +3,24 @@ setlocal EnableExtensions EnableDelayedExpansion
 
 rem === Paths ===
 set "BASE=E:\life-support-mini"
-set "DB=%BASE%\db\mini.db"
-set "BACKUP_DIR=%BASE%\db\backups"
+if not defined LS_MINI_DB_PATH set "LS_MINI_DB_PATH=%BASE%\db\mini.db"
+if not defined LS_BACKUP_DIR set "LS_BACKUP_DIR=%BASE%\db\backups"
+if not defined LS_BACKUP_KEEP set "LS_BACKUP_KEEP=14"
+rem Deduplicated store (backup_store.py): each backup only writes its changed pages.
+rem Drop this line to go back to one full mini_*.db file per backup.
+if not defined LS_BACKUP_STORE set "LS_BACKUP_STORE=%LS_BACKUP_DIR%\store"
 
-if not exist "%BACKUP_DIR%" mkdir "%BACKUP_DIR%"
+where python >nul 2>&1
+if %errorlevel% neq 0 (
+  set "PY=py -3"
+) else (
+  set "PY=python"
+)
 
-rem === Timestamp (yyyyMMdd_HHmmss, locale-safe via PowerShell) ===
-for /f %%t in ('powershell -NoProfile -Command "(Get-Date).ToString(\"yyyyMMdd_HHmmss\")"') do set "ts=%%t"
-
-rem === Make backup ===
-copy /y "%DB%" "%BACKUP_DIR%\mini_%ts%.db" >nul
-
-rem === Rotate: keep newest 14 backups by name (timestamped), delete the rest ===
-powershell -NoProfile -Command "$dir='%BACKUP_DIR%'; $keep=14; if (Test-Path $dir) { Get-ChildItem -Path $dir -Filter 'mini_*.db' | Sort-Object Name -Descending | Select-Object -Skip $keep | Remove-Item -Force }"
-
-echo Backed up to %BACKUP_DIR%\mini_%ts%.db
-echo (kept latest 14 backups)
+rem === Online backup (SQLite backup API, quick_check, keep newest %LS_BACKUP_KEEP%) ===
+rem Safe while the API is writing: no "copy /y" of a live file.
+%PY% "%BASE%\tools\backup_db.py" backup
+set "rc=%errorlevel%"
+if %rc% neq 0 echo [ERROR] Backup failed with exit code %rc%
 pause
+exit /b %rc%
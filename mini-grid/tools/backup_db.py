@@ -0,0 +1,207 @@
+# backup_db.py
+# Online backup / restore of mini.db with the SQLite backup API (what
+# backup_db.bat / restore_db.bat call; replaces "copy /y" of a live file).
+#
+# backup: copies the DB a few pages at a time (LS_BACKUP_STEP_PAGES per step,
+# LS_BACKUP_SLEEP_S between steps) so writers only ever wait for one short step,
+# into mini_<yyyyMMdd_HHmmss>.db.part. If writers keep restarting the copy it
+# falls back to a single step (one read transaction; under WAL that doesn't
+# block writers at all). The copy is switched to journal_mode=DELETE so it is
+# one self-contained file, must pass PRAGMA quick_check, and only then gets its
+# final name. The newest LS_BACKUP_KEEP mini_*.db are kept.
+#
+# restore: checks the backup, takes a safety backup of the current DB, then
+# writes the backup into the live DB through SQLite (one step): other
+# connections wait for that copy at most (WAL readers keep reading their
+# snapshot), nobody has to be stopped, and no reader sees a half-copied file.
+#
+# With LS_BACKUP_STORE (or --store) set, backups go into that deduplicated
+# store (backup_store.py) instead of one mini_*.db file each: only the changed
+# chunks are written, rotation prunes manifests and unreferenced chunks, and
+# restore takes a backup name (or its manifests\<name>.json path), rebuilds it
+# next to the store and restores from that.
+#
+# Usage:
+#   python backup_db.py [backup] [--db mini.db] [--dir backups] [--keep 14] [--store DIR]
+#   python backup_db.py restore --file backups\mini_20250911_033935.db [--db mini.db] [--no-safety]
+#   python backup_db.py restore --file mini_20250911_033935 --store DIR
+#   python backup_db.py list [--store DIR]
+#
+# Env (all optional):
+#   LS_MINI_DB_PATH        database (default E:\life-support-mini\db\mini.db)
+#   LS_BACKUP_DIR          backup folder (default <db folder>\backups)
+#   LS_BACKUP_KEEP         backups kept by rotation (default 14)
+#   LS_BACKUP_STEP_PAGES   pages copied per step (default 1024)
+#   LS_BACKUP_SLEEP_S      pause between steps (default 0.01)
+#   LS_BACKUP_RESTARTS     restarts tolerated before the single-step fallback (default 3)
+#   LS_BACKUP_STORE        deduplicated backup store folder (default: none, one file per backup)
+
+import argparse, os, pathlib, sqlite3, sys, time
+import backup_store
+from urllib.parse import quote
+
+DB = os.environ.get("LS_MINI_DB_PATH", r"E:\life-support-mini\db\mini.db")
+KEEP = int(os.environ.get("LS_BACKUP_KEEP", "14"))
+STEP_PAGES = int(os.environ.get("LS_BACKUP_STEP_PAGES", "1024"))
+SLEEP_S = float(os.environ.get("LS_BACKUP_SLEEP_S", "0.01"))
+MAX_RESTARTS = int(os.environ.get("LS_BACKUP_RESTARTS", "3"))
+STORE = os.environ.get("LS_BACKUP_STORE") or None
+PATTERN = "mini_*.db"
+
+def backup_dir(db):
+    return pathlib.Path(os.environ.get("LS_BACKUP_DIR") or pathlib.Path(db).parent / "backups")
+
+def timestamp():
+    return time.strftime("%Y%m%d_%H%M%S")
+
+class Restarted(Exception):
+    pass
+
+def online_copy(src, dest, pages=STEP_PAGES, sleep=SLEEP_S, max_restarts=MAX_RESTARTS):
+    """Copy connection src into dest in steps of `pages`; returns the restarts seen.
+
+    A write to the source by another connection makes the backup start over;
+    after max_restarts of those the rest goes in one step.
+    """
+    state = {"restarts": 0, "remaining": None}
+    def progress(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise Restarted()
+        state["remaining"] = remaining
+    try:
+        src.backup(dest, pages=pages, progress=progress, sleep=sleep)
+    except Restarted:
+        src.backup(dest, pages=-1)
+    return state["restarts"]
+
+def ro_uri(path):
+    """Read-only SQLite URI for a file path; '#', '?' and '%' in it are percent-quoted."""
+    return f"file:{quote(pathlib.Path(path).as_posix(), safe='/:')}?mode=ro"
+
+def quick_check(path):
+    con = sqlite3.connect(ro_uri(path), uri=True)
+    try:
+        return con.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        con.close()
+
+def backup(db=DB, out_dir=None, keep=KEEP, prefix="mini_", suffix="", store=STORE):
+    """Take a verified online backup; returns its path (its name with a store)."""
+    out_dir = pathlib.Path(store or out_dir or backup_dir(db))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{prefix}{timestamp()}{suffix}"
+    final = out_dir / f"{stem}.db"
+    part = final.with_name(final.name + ".part")
+    t0 = time.perf_counter()
+    src = sqlite3.connect(db, timeout=30)
+    dest = sqlite3.connect(part)
+    try:
+        restarts = online_copy(src, dest)
+        dest.execute("PRAGMA journal_mode=DELETE")
+    except BaseException:
+        dest.close()
+        part.unlink(missing_ok=True)
+        raise
+    finally:
+        dest.close()
+        src.close()
+    check = quick_check(part)
+    if check != "ok":
+        part.unlink(missing_ok=True)
+        raise RuntimeError(f"backup failed quick_check: {check}")
+    if store:
+        try:
+            name = backup_store.add_backup(store, part, stem)["name"]
+        finally:
+            part.unlink(missing_ok=True)
+        if keep:
+            backup_store.prune(store, keep)
+        return name
+    n = 1
+    while final.exists():  # a second backup within the same second
+        n += 1
+        final = out_dir / f"{stem}_{n}.db"
+    os.replace(part, final)
+    print(f"Backed up {db} to {final} ({final.stat().st_size / 2**20:.1f} MB, {time.perf_counter() - t0:.1f}s"
+          + (f", {restarts} restarts" if restarts else "") + ")")
+    if keep:
+        rotate(out_dir, keep)
+    return final
+
+def rotate(out_dir, keep=KEEP):
+    """Keep the newest `keep` backups by (timestamped) name, delete the rest."""
+    old = sorted(pathlib.Path(out_dir).glob(PATTERN), key=lambda p: p.name, reverse=True)[keep:]
+    for p in old:
+        p.unlink()
+    if old:
+        print(f"Rotated out {len(old)} old backups (kept latest {keep})")
+
+def restore(backup_file, db=DB, safety=True, store=STORE):
+    """Write a backup into the live DB through SQLite, after checking it.
+
+    backup_file may also be a backup in the store: its name, or the path of its
+    manifest. It is rebuilt next to the store first.
+    """
+    backup_file = pathlib.Path(backup_file)
+    if backup_file.suffix == ".json":
+        store, backup_file = backup_file.parent.parent, pathlib.Path(backup_file.stem)
+    if store and not backup_file.is_file():
+        rebuilt = pathlib.Path(store) / f"{backup_file.name}.restore.db"
+        backup_store.restore_backup(store, backup_file.name, rebuilt)
+        try:
+            return restore(rebuilt, db, safety, store)
+        finally:
+            rebuilt.unlink(missing_ok=True)
+    check = quick_check(backup_file)
+    if check != "ok":
+        raise RuntimeError(f"{backup_file.name} fails quick_check, not restoring: {check}")
+    if safety and os.path.exists(db):
+        backup(db, keep=0, suffix="_pre_restore", store=store)  # kept out of rotation until the next backup
+    t0 = time.perf_counter()
+    src = sqlite3.connect(ro_uri(backup_file), uri=True)
+    live = sqlite3.connect(db, timeout=60)
+    try:
+        src.backup(live)  # one step: the live DB switches over in a single write transaction
+    finally:
+        src.close()
+        live.close()
+    check = quick_check(db)
+    print(f"Restored {db} from {backup_file} in {time.perf_counter() - t0:.1f}s (quick_check: {check})")
+    if check != "ok":
+        raise RuntimeError(f"restored DB fails quick_check: {check}")
+
+def list_backups(db=DB, store=STORE):
+    if store:
+        return backup_store.list_backups(store)
+    for p in sorted(backup_dir(db).glob(PATTERN), key=lambda p: p.name, reverse=True):
+        print(f"{p.name}  {p.stat().st_size / 2**20:8.1f} MB")
+
+def main():
+    ap = argparse.ArgumentParser(description="online backup / restore of the mini DB")
+    ap.add_argument("action", nargs="?", default="backup", choices=["backup", "restore", "list"])
+    ap.add_argument("--db", default=DB)
+    ap.add_argument("--dir", help="backup folder (default LS_BACKUP_DIR or <db folder>\\backups)")
+    ap.add_argument("--keep", type=int, default=KEEP, help="backups kept by rotation (0: no rotation)")
+    ap.add_argument("--file", help="restore: backup to restore from")
+    ap.add_argument("--no-safety", action="store_true", help="restore: skip the backup of the current DB")
+    ap.add_argument("--store", default=STORE, help="deduplicated backup store (LS_BACKUP_STORE)")
+    a = ap.parse_args()
+    if a.dir:
+        os.environ["LS_BACKUP_DIR"] = a.dir
+    try:
+        if a.action == "backup":
+            backup(a.db, a.dir, a.keep, store=a.store)
+        elif a.action == "restore":
+            if not a.file:
+                ap.error("restore needs --file")
+            restore(a.file, a.db, safety=not a.no_safety, store=a.store)
+        else:
+            list_backups(a.db, a.store)
+    except (RuntimeError, sqlite3.Error) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
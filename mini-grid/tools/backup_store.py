@@ -0,0 +1,254 @@
+# backup_store.py
+# Deduplicated backup repository for mini.db (used by backup_db.py when
+# LS_BACKUP_STORE is set).
+#
+# A backup is split into fixed chunks (a whole number of DB pages; default
+# 4 KiB, one page, since a few hundred scattered row updates already touch
+# most 64 KiB chunks). Each chunk is stored once, zlib-compressed, under the
+# sha256 of its raw bytes; a backup is just a manifest listing its chunk
+# hashes in order.
+# The backup API copies page N of the DB to page N of the copy, so between two
+# runs only the chunks holding changed pages are new, and a backup every few
+# minutes costs roughly the changed pages. Restore streams the chunks back
+# into a file and checks every chunk hash and the whole-file sha256. Pruning
+# keeps the newest N manifests and deletes chunks no kept manifest refers to.
+#
+# Layout:
+#   <store>/store.json              {"format", "chunk_size", "codec"}
+#   <store>/chunks/ab/abcdef...     zlib(chunk), named by sha256(chunk)
+#   <store>/manifests/<name>.json   {"name", "size", "sha256", "chunks": [...], ...}
+#
+# Usage:
+#   python backup_store.py list    --store DIR
+#   python backup_store.py add     --store DIR --file backup.db [--name mini_20250911_033935]
+#   python backup_store.py restore --store DIR --name mini_20250911_033935 --out mini.db
+#   python backup_store.py prune   --store DIR --keep 14 [--dry-run]
+#   python backup_store.py verify  --store DIR [--name NAME]
+
+import argparse, collections, contextlib, hashlib, json, os, pathlib, sys, time, zlib
+
+FORMAT = 1
+CHUNK_SIZE = int(os.environ.get("LS_BACKUP_CHUNK_KB", "4")) * 1024
+LEVEL = 6
+LOCK_STALE_S = 3600
+
+class StoreError(RuntimeError):
+    pass
+
+def open_store(store, chunk_size=CHUNK_SIZE):
+    """Create the store layout if needed; returns its settings."""
+    store = pathlib.Path(store)
+    meta = store / "store.json"
+    if meta.exists():
+        info = json.loads(meta.read_text(encoding="utf-8"))
+        if info.get("format") != FORMAT:
+            raise StoreError(f"unsupported backup store format {info.get('format')} in {store}")
+        return info
+    (store / "chunks").mkdir(parents=True, exist_ok=True)
+    (store / "manifests").mkdir(exist_ok=True)
+    info = {"format": FORMAT, "chunk_size": chunk_size, "codec": "zlib"}
+    write_atomic(meta, json.dumps(info, indent=2).encode("utf-8"))
+    return info
+
+def write_atomic(path, data):
+    part = path.with_name(path.name + ".part")
+    with open(part, "wb") as f:
+        f.write(data)
+    os.replace(part, path)
+
+@contextlib.contextmanager
+def store_lock(store):
+    """One writer (add / prune) at a time; a lock older than an hour is stale."""
+    lock = pathlib.Path(store) / "lock"
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - lock.stat().st_mtime < LOCK_STALE_S:
+            raise StoreError(f"backup store is busy ({lock} exists)")
+        lock.unlink()
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        lock.unlink(missing_ok=True)
+
+def chunk_path(store, digest):
+    return pathlib.Path(store) / "chunks" / digest[:2] / digest
+
+def db_page_size(path):
+    with open(path, "rb") as f:
+        head = f.read(100)
+    if not head.startswith(b"SQLite format 3\0"):
+        return None
+    size = int.from_bytes(head[16:18], "big")
+    return 65536 if size == 1 else size
+
+def manifest_path(store, name):
+    return pathlib.Path(store) / "manifests" / f"{name}.json"
+
+def add_backup(store, file, name):
+    """Store a (checked, closed) DB copy as backup `name` (`name_2`, `name_3`, ...
+    if that one exists, e.g. two backups in the same second); returns its manifest."""
+    store = pathlib.Path(store)
+    info = open_store(store)
+    chunk_size = info["chunk_size"]
+    page = db_page_size(file)
+    if page and chunk_size % page:
+        chunk_size = max(page, chunk_size // page * page)  # keep chunks page-aligned
+    t0 = time.perf_counter()
+    with store_lock(store):
+        base, n = name, 1
+        while manifest_path(store, name).exists():
+            n += 1
+            name = f"{base}_{n}"
+        whole = hashlib.sha256()
+        chunks, new, new_bytes, size = [], 0, 0, 0
+        with open(file, "rb") as f:
+            while data := f.read(chunk_size):
+                whole.update(data)
+                size += len(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                path = chunk_path(store, digest)
+                if not path.exists():
+                    path.parent.mkdir(exist_ok=True)
+                    packed = zlib.compress(data, LEVEL)
+                    write_atomic(path, packed)
+                    new += 1
+                    new_bytes += len(packed)
+        manifest = {"format": FORMAT, "name": name, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "size": size, "page_size": page, "chunk_size": chunk_size,
+                    "sha256": whole.hexdigest(), "new_chunks": new, "new_bytes": new_bytes,
+                    "chunks": chunks}
+        write_atomic(manifest_path(store, name), json.dumps(manifest).encode("utf-8"))
+    print(f"Stored {name}: {len(chunks)} chunks, {new} new ({new_bytes / 2**20:.1f} MB written "
+          f"for {size / 2**20:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+    return manifest
+
+def load_manifest(store, name):
+    path = manifest_path(store, name)
+    if not path.exists():
+        raise StoreError(f"no backup {name} in {store}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def read_chunk(store, digest):
+    path = chunk_path(store, digest)
+    try:
+        data = zlib.decompress(path.read_bytes())
+    except FileNotFoundError:
+        raise StoreError(f"chunk {digest} is missing from the store") from None
+    except zlib.error as e:
+        raise StoreError(f"chunk {digest} is corrupt: {e}") from None
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise StoreError(f"chunk {digest} fails its checksum")
+    return data
+
+def restore_backup(store, name, out):
+    """Rebuild backup `name` into file `out` (via out.part); returns the path."""
+    m = load_manifest(store, name)
+    out = pathlib.Path(out)
+    part = out.with_name(out.name + ".part")
+    whole = hashlib.sha256()
+    try:
+        with open(part, "wb") as f:
+            for digest in m["chunks"]:
+                data = read_chunk(store, digest)
+                whole.update(data)
+                f.write(data)
+        if whole.hexdigest() != m["sha256"]:
+            raise StoreError(f"rebuilt {name} does not match its manifest checksum")
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    os.replace(part, out)
+    return out
+
+def verify_backup(store, name):
+    """Read back every chunk of backup `name` without writing anything."""
+    m = load_manifest(store, name)
+    whole = hashlib.sha256()
+    for digest in m["chunks"]:
+        whole.update(read_chunk(store, digest))
+    if whole.hexdigest() != m["sha256"]:
+        raise StoreError(f"{name} does not match its manifest checksum")
+
+def backup_names(store):
+    """Backup names, newest first (names are timestamped)."""
+    folder = pathlib.Path(store) / "manifests"
+    if not folder.exists():
+        return []
+    return sorted((p.stem for p in folder.glob("*.json")), reverse=True)
+
+def chunk_refs(store, names):
+    refs = collections.Counter()
+    for name in names:
+        refs.update(load_manifest(store, name)["chunks"])
+    return refs
+
+def prune(store, keep, dry_run=False):
+    """Keep the newest `keep` backups; delete the other manifests, then every
+    chunk no kept manifest refers to. Returns (manifests, chunks, bytes) removed."""
+    store = pathlib.Path(store)
+    with store_lock(store):
+        names = backup_names(store)
+        drop = names[keep:]
+        refs = chunk_refs(store, names[:keep])
+        dead = [p for p in (store / "chunks").glob("*/*")
+                if not p.name.endswith(".part") and p.name not in refs]
+        freed = sum(p.stat().st_size for p in dead)
+        if not dry_run:
+            for name in drop:
+                manifest_path(store, name).unlink()
+            for p in dead:
+                p.unlink()
+    if drop or dead:
+        print(f"{'Would prune' if dry_run else 'Pruned'} {len(drop)} backups (kept latest {keep}), "
+              f"{len(dead)} chunks, {freed / 2**20:.1f} MB")
+    return len(drop), len(dead), freed
+
+def list_backups(store):
+    names = backup_names(store)
+    for name in names:
+        m = load_manifest(store, name)
+        print(f"{name}  {m['size'] / 2**20:8.1f} MB  {len(m['chunks']):6} chunks  "
+              f"{m['new_chunks']:6} new ({m['new_bytes'] / 2**20:.1f} MB)")
+    total = sum(p.stat().st_size for p in (pathlib.Path(store) / "chunks").glob("*/*"))
+    print(f"{len(names)} backups, {total / 2**20:.1f} MB of chunks")
+
+def main():
+    ap = argparse.ArgumentParser(description="deduplicated backup store for the mini DB")
+    ap.add_argument("action", choices=["list", "add", "restore", "prune", "verify"])
+    ap.add_argument("--store", default=os.environ.get("LS_BACKUP_STORE"), help="store folder (LS_BACKUP_STORE)")
+    ap.add_argument("--file", help="add: DB copy to store")
+    ap.add_argument("--name", help="backup name (add: default the file name)")
+    ap.add_argument("--out", help="restore: file to rebuild")
+    ap.add_argument("--keep", type=int, default=int(os.environ.get("LS_BACKUP_KEEP", "14")))
+    ap.add_argument("--dry-run", action="store_true")
+    a = ap.parse_args()
+    if not a.store:
+        ap.error("--store (or LS_BACKUP_STORE) is required")
+    try:
+        if a.action == "list":
+            list_backups(a.store)
+        elif a.action == "add":
+            if not a.file:
+                ap.error("add needs --file")
+            add_backup(a.store, a.file, a.name or pathlib.Path(a.file).stem)
+        elif a.action == "restore":
+            if not (a.name and a.out):
+                ap.error("restore needs --name and --out")
+            print(f"Rebuilt {restore_backup(a.store, a.name, a.out)}")
+        elif a.action == "prune":
+            prune(a.store, a.keep, a.dry_run)
+        else:
+            for name in [a.name] if a.name else backup_names(a.store):
+                verify_backup(a.store, name)
+                print(f"{name}: ok")
+    except StoreError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
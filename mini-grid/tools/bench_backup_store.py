@@ -0,0 +1,75 @@
+# bench_backup_store.py
+# Repeated backups of a DB that changes a little between runs: one mini_*.db
+# file per backup (backup_db.py's default) against the deduplicated store
+# (LS_BACKUP_STORE). Reports bytes written per backup and in total, then
+# rebuilds the first and last backup from the store and checks them.
+# Usage:
+#   python bench_backup_store.py [--rows 200000] [--runs 10] [--touch 500] [--workdir DIR]
+
+import argparse, hashlib, pathlib, random, tempfile, time
+from bench_common import make_db, seed_records
+import backup_db, backup_store
+
+def folder_bytes(path):
+    return sum(p.stat().st_size for p in pathlib.Path(path).rglob("*") if p.is_file())
+
+def sha(path):
+    return hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--touch", type=int, default=500, help="records updated between backups")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_backup_store_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    db = work / "mini.db"
+    con = make_db(db)
+    seed_records(con, a.rows)
+    con.commit()
+    files, store = work / "files", work / "store"
+    rng = random.Random(1)
+    plain_s = store_s = 0.0
+    names, copies = [], []
+    for run in range(a.runs):
+        if run:
+            ids = rng.sample(range(1, a.rows + 1), a.touch)
+            con.executemany("UPDATE records SET seek_priority=?, version=version+1 WHERE id=?",
+                            [(run % 6, i) for i in ids])
+            con.commit()
+        t0 = time.perf_counter()
+        copies.append(backup_db.backup(str(db), files, keep=0, prefix=f"mini_{run:03}_", store=None))
+        plain_s += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        names.append(backup_db.backup(str(db), keep=0, prefix=f"mini_{run:03}_", store=store))
+        store_s += time.perf_counter() - t0
+    con.close()
+
+    size = db.stat().st_size
+    print()
+    print(f"{a.rows:,} records ({size / 2**20:.1f} MB), {a.runs} backups, {a.touch:,} records updated between them")
+    print(f"one file per backup  {folder_bytes(files) / 2**20:8.1f} MB  {plain_s:6.2f}s")
+    print(f"deduplicated store   {folder_bytes(store) / 2**20:8.1f} MB  {store_s:6.2f}s")
+    later = [backup_store.load_manifest(store, n)["new_bytes"] for n in names[1:]]
+    if later:
+        print(f"  each later backup writes {sum(later) / len(later) / 2**20:.2f} MB on average")
+
+    ok = True
+    for name, copy in ((names[0], copies[0]), (names[-1], copies[-1])):
+        out = work / f"{name}.rebuilt.db"
+        t0 = time.perf_counter()
+        backup_store.restore_backup(store, name, out)
+        dt = time.perf_counter() - t0
+        same = sha(out) == sha(copy)
+        ok &= same
+        print(f"rebuild {name}: {dt:.2f}s, {'identical' if same else 'DIFFERS'} to its file backup, "
+              f"quick_check {backup_db.quick_check(out)}")
+    backup_store.prune(store, 1)
+    print(f"after prune to 1 backup: {folder_bytes(store) / 2**20:.1f} MB")
+    print("ok" if ok else "MISMATCH")
+
+if __name__ == "__main__":
+    main()
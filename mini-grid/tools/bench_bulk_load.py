@@ -0,0 +1,78 @@
+# bench_bulk_load.py
+# Rows/sec of bulk_load.py against the row-at-a-time way lead lists were
+# loaded before (INSERT OR IGNORE prospect + INSERT contact per row, one commit
+# per row, guard trigger firing per contact), on a scratch mini.db built from
+# setup_mini.sql. bulk_load.py is run with and without --defer-guard.
+# Usage:
+#   python bench_bulk_load.py [--rows 200000] [--baseline-rows 20000] [--workdir DIR]
+
+import argparse, csv, pathlib, random, sqlite3, subprocess, sys, tempfile, time
+from bench_common import ROOT
+
+TOOL = pathlib.Path(__file__).resolve().parent / "bulk_load.py"
+HEADER = ["gat_id", "city_id", "company_id", "prospect_name", "contact_name", "role_title", "email", "phone", "notes"]
+
+def make_csv(path, rows):
+    rnd = random.Random(1)
+    companies = max(rows // 3, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for _ in range(rows):
+            c, k = rnd.randrange(companies), rnd.randrange(4)
+            w.writerow(["GAT001", "DE-BER-1101", f"C{c:07d}", f"Company {c}", f"Person {c}-{k}", "Procurement",
+                        f"p{c}.{k}@example.com" if k < 3 else "", f"+49-30-{c}{k}", "bench"])
+
+def make_db(path):
+    for p in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        p.unlink(missing_ok=True)
+    con = sqlite3.connect(path)
+    con.executescript((ROOT / "setup_mini.sql").read_text(encoding="utf-8"))
+    con.close()
+
+def baseline(db, src, limit):
+    con = sqlite3.connect(db)
+    con.execute("PRAGMA journal_mode=WAL")
+    n = 0
+    t0 = time.perf_counter()
+    with open(src, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            con.execute("INSERT OR IGNORE INTO prospects (gat_id, city_id, company_id, prospect_name) VALUES (?,?,?,?)",
+                        (r["gat_id"], r["city_id"], r["company_id"], r["prospect_name"]))
+            con.execute("INSERT INTO contact_grid (gat_id, city_id, company_id, contact_name, role_title, email, phone, notes) "
+                        "VALUES (?,?,?,?,?,?,?,?)", (r["gat_id"], r["city_id"], r["company_id"], r["contact_name"],
+                                                     r["role_title"], r["email"], r["phone"], r["notes"]))
+            con.commit()
+            n += 1
+            if n >= limit:
+                break
+    con.close()
+    return n / (time.perf_counter() - t0)
+
+def run_tool(db, src, *flags):
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, str(TOOL), str(src), "--db", str(db), "--restart", *flags],
+                         check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - t0, out.strip().splitlines()[-1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--baseline-rows", type=int, default=20_000, help="row-at-a-time is slow; time a prefix")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_bulk_"))
+    work.mkdir(parents=True, exist_ok=True)
+    src = work / "leads.csv"
+    make_csv(src, a.rows)
+
+    db = work / "mini.db"
+    make_db(db)
+    print(f"row-at-a-time       {baseline(db, src, a.baseline_rows):>10,.0f} rows/s  (first {a.baseline_rows:,} rows)")
+    for label, flags in (("bulk_load", ()), ("bulk_load --defer", ("--defer-guard",))):
+        make_db(db)
+        dt, summary = run_tool(db, src, *flags)
+        print(f"{label:<20}{a.rows / dt:>10,.0f} rows/s  {summary}")
+
+if __name__ == "__main__":
+    main()
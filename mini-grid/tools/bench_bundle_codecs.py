@@ -0,0 +1,54 @@
+# bench_bundle_codecs.py
+# Wall time and bundle size of a full export per sync.codec / sync.level, with
+# chunk compression on one thread and on the export thread pool, plus the time
+# load_bundle takes to decompress and parse the result.
+# Usage:
+#   python bench_bundle_codecs.py [--rows 200000] [--workers 4] [--workdir DIR]
+
+import argparse, os, pathlib, tempfile, time
+from bench_common import make_db, seed_records
+import life_support_api as lsa
+
+CODECS = [("stored", None), ("deflate", 1), ("deflate", 6), ("deflate", 9), ("bzip2", 9), ("lzma", None)]
+
+def export(conn, out, codec, level, workers):
+    cfg = {"role": "bench", "sync": {"codec": codec, "level": level, "compress_workers": workers}}
+    t0 = time.perf_counter()
+    lsa.export_bundle(conn, cfg, out, scope="full")
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, default=lsa.COMPRESS_WORKERS)
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_codecs_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    conn = make_db(work / "codecs.db")
+    seed_records(conn, a.rows)
+    raw_mb = None
+
+    rows = []
+    for codec, level in CODECS:
+        out = work / f"bundle_{codec}_{level}.lsx"
+        one = export(conn, out, codec, level, 1)
+        many = export(conn, out, codec, level, a.workers)
+        t0 = time.perf_counter()
+        loaded = lsa.load_bundle(out)
+        load = time.perf_counter() - t0
+        size = os.path.getsize(out) / 2**20
+        if codec == "stored":
+            raw_mb = size
+        rows.append((f"{codec}" + ("" if level is None else f" {level}"), one, many, size, load))
+        del loaded
+
+    print()
+    print(f"{a.rows:,} records, {a.workers} compress workers")
+    print(f"{'codec':<11}{'export 1 thr':>13}{f'export {a.workers} thr':>13}{'speedup':>9}{'size MB':>9}{'ratio':>7}{'load':>8}")
+    for name, one, many, size, load in rows:
+        print(f"{name:<11}{one:>12.2f}s{many:>12.2f}s{one / many:>8.1f}x{size:>9.1f}{raw_mb / size:>6.1f}x{load:>7.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench_changelog.py
+# Cost and payoff of the change_log triggers: seeding N records with and
+# without them, then after touching K records (several updates each) and
+# deleting K more, a "changes" export against a watermark "delta" export of
+# the same DB. Only the changes bundle can carry the deletes.
+# Usage:
+#   python bench_changelog.py [--rows 200000] [--touch 2000] [--workdir DIR]
+
+import argparse, json, pathlib, random, shutil, tempfile, time, zipfile
+from bench_common import make_db, seed_records
+import life_support_api as lsa
+
+def seed(db, rows, capture):
+    con = make_db(db)
+    if capture:
+        lsa.ensure_change_capture(con)
+    t0 = time.perf_counter()
+    seed_records(con, rows)
+    return con, time.perf_counter() - t0
+
+def timed_export(db, scope, out):
+    cfg = {"db": {"path": str(db)}, "role": "bench", "sync": {"peer": "peer"}}
+    con = lsa.connect_db(cfg)
+    t0 = time.perf_counter()
+    m = lsa.export_bundle(con, cfg, out, scope=scope)
+    dt = time.perf_counter() - t0
+    con.close()
+    return m, dt
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--touch", type=int, default=2_000, help="records updated (3x each), and as many deleted")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_changelog_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    con, plain = seed(work / "plain.db", a.rows, False)
+    con.close()
+    db = work / "source.db"
+    con, captured = seed(db, a.rows, True)
+    print(f"seed {a.rows:,} records: {plain:.2f}s without triggers, {captured:.2f}s with "
+          f"({captured / plain - 1:+.0%})")
+
+    # first export to the peer: falls back to a delta and sets the change_log cursor
+    con.commit()
+    con.close()
+    timed_export(db, "changes", work / "initial.lsx")
+
+    con = lsa.connect_db({"db": {"path": str(db)}})
+    ids = random.Random(1).sample(range(1, a.rows + 1), 2 * a.touch)
+    for n in range(3):
+        con.executemany("UPDATE records SET seek_priority=?, version=version+1 WHERE id=?",
+                        [(n % 6, i) for i in ids[:a.touch]])
+    con.executemany("DELETE FROM records WHERE id=?", [(i,) for i in ids[a.touch:]])
+    con.commit()
+    log = con.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    con.close()
+    print(f"{a.touch:,} records updated 3x, {a.touch:,} deleted: {log:,} change_log entries")
+
+    for scope in ("delta", "changes"):
+        copy = work / f"{scope}.db"
+        shutil.copyfile(db, copy)
+        out = work / f"{scope}.lsx"
+        m, dt = timed_export(copy, scope, out)
+        with zipfile.ZipFile(out) as z:
+            size = sum(i.file_size for i in z.infolist())
+        print(f"{scope:<8} export {dt * 1000:8.1f} ms  rows {json.dumps(m['entities'])}  "
+              f"deletes {sum(m.get('deletes', {}).values()):,}  {size / 2**20:.1f} MB")
+
+if __name__ == "__main__":
+    main()
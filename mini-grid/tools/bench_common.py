@@ -0,0 +1,48 @@
+# bench_common.py
+# Shared helpers for the tools/bench_*.py scripts: locate the sync CLI, build a
+# scratch DB from init_db.sql, generate synthetic rows and read peak RSS.
+
+import os, sys, sqlite3, pathlib, hashlib
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+SCHEMA = ROOT / "db" / "11-9-2025" / "init_db.sql"
+sys.path.insert(0, str(ROOT / "sync"))
+
+def make_db(path, schema=SCHEMA):
+    path = pathlib.Path(path)
+    if path.exists():
+        path.unlink()
+    con = sqlite3.connect(path)
+    con.row_factory = sqlite3.Row
+    con.executescript(pathlib.Path(schema).read_text(encoding="utf-8"))
+    con.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+    con.commit()
+    return con
+
+def synthetic_records(n, start=0, version=1):
+    for i in range(start, start + n):
+        raw = f"synthetic record {i} " + ("lorem ipsum dolor sit amet " * 6)
+        yield (f"rec-{i:08d}", "AGENT-BENCH", f"https://example.org/r/{i}", f"Source {i % 997}",
+               "2025-09-11", raw, hashlib.sha1(raw.encode()).hexdigest(), i % 2, i % 6, version,
+               f"2025-09-11T00:00:{i % 60:02d}.000Z")
+
+def seed_records(con, n, start=0, version=1):
+    con.executemany("""INSERT INTO records (guid, owner_agent_id, source_url, source_name, date_collected,
+                       raw_content, content_hash, to_seek, seek_priority, version, updated_at)
+                       VALUES (?,?,?,?,?,?,?,?,?,?,?)""", synthetic_records(n, start, version))
+    con.commit()
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if it can't be read here)."""
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / (1024 * 1024) if sys.platform == "darwin" else kb / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mi = psutil.Process(os.getpid()).memory_info()
+        return getattr(mi, "peak_wset", mi.rss) / (1024 * 1024)
+    except ImportError:
+        return None
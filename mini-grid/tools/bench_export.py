@@ -0,0 +1,43 @@
+# bench_export.py
+# Export N synthetic records with life_support_api.export_bundle and report
+# peak RSS and rows/sec. The export runs in a child process so its RSS is
+# not polluted by the seeding step.
+# Usage:
+#   python bench_export.py --rows 1000000 --workdir E:\tmp\bench
+
+import argparse, json, os, subprocess, sys, time, pathlib
+from bench_common import make_db, seed_records, peak_rss_mb
+
+def run_export(db, out):
+    import life_support_api as lsa
+    cfg = {"db": {"path": db}, "role": "bench"}
+    conn = lsa.connect_db(cfg)
+    n = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    t0 = time.perf_counter()
+    lsa.export_bundle(conn, cfg, pathlib.Path(out))
+    dt = time.perf_counter() - t0
+    print(json.dumps({"rows": n, "seconds": round(dt, 2), "rows_per_sec": int(n / dt) if dt else None,
+                      "peak_rss_mb": peak_rss_mb(), "bundle_mb": round(os.path.getsize(out) / 2**20, 1)}))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--workdir", default=".")
+    ap.add_argument("--export-only", action="store_true", help=argparse.SUPPRESS)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir); work.mkdir(parents=True, exist_ok=True)
+    db, out = str(work / "bench_export.db"), str(work / "bench_export.lsx")
+
+    if a.export_only:
+        run_export(db, out)
+        return
+
+    t0 = time.perf_counter()
+    con = make_db(db)
+    seed_records(con, a.rows)
+    con.close()
+    print(f"seeded {a.rows} records in {time.perf_counter() - t0:.1f}s")
+    subprocess.run([sys.executable, __file__, "--export-only", "--workdir", str(work)], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_geo_import.py
+# import_geo_from_json.py on a generated world city list (nested-map shape,
+# {"CC": {"CITY": "ABBR", ...}, ...}) against the previous row-at-a-time
+# importer (a SELECT ... WHERE UPPER(cc)=UPPER(?) plus an upsert per city).
+# The new importer also runs a second time over the same files, which must
+# report everything unchanged.
+# Usage:
+#   python bench_geo_import.py [--cities 500000] [--old-cities 100000] [--workdir DIR]
+
+import argparse, json, pathlib, random, sqlite3, tempfile, time
+from bench_common import ROOT, peak_rss_mb
+import import_geo_from_json as geo
+
+COUNTRIES = ROOT / "prospecting" / "country_codes.json"
+
+def make_cities(path, n):
+    ccs = list(json.loads(COUNTRIES.read_text(encoding="utf-8-sig")))
+    rnd = random.Random(1)
+    out = {cc: {} for cc in ccs}
+    for i in range(n):
+        out[rnd.choice(ccs)][f"CITY {i:07d}"] = f"C{i:06d}"[-8:]
+    path.write_text(json.dumps(out), encoding="utf-8")
+
+def old_import(db, cities_path, limit):
+    """The previous importer's city loop, row by row."""
+    con = sqlite3.connect(db)
+    cur = con.cursor()
+    raw = json.loads(cities_path.read_text(encoding="utf-8"))
+    n = 0
+    t0 = time.perf_counter()
+    for cc, m in raw.items():
+        for name, abbr in m.items():
+            cur.execute("SELECT id FROM country WHERE UPPER(cc)=UPPER(?)", (cc,))
+            r = cur.fetchone()
+            if r:
+                cur.execute("""INSERT INTO city(country_id,name,abbr) VALUES(?,?,?)
+                               ON CONFLICT(country_id,name) DO UPDATE SET abbr=excluded.abbr""", (r[0], name, abbr))
+            n += 1
+            if n >= limit:
+                break
+        if n >= limit:
+            break
+    con.commit()
+    con.close()
+    return n, time.perf_counter() - t0
+
+def fresh(db):
+    db.unlink(missing_ok=True)
+    con, _ = geo.run(str(db), str(COUNTRIES))
+    con.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cities", type=int, default=500_000)
+    ap.add_argument("--old-cities", type=int, default=100_000, help="row-at-a-time is slow; time a prefix")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_geo_"))
+    work.mkdir(parents=True, exist_ok=True)
+    cities = work / "cities.json"
+    make_cities(cities, a.cities)
+    db = work / "geo.db"
+
+    fresh(db)
+    n, dt = old_import(db, cities, a.old_cities)
+    print(f"old importer     {n:>9,} cities in {dt:6.1f} s  ({n / dt:>9,.0f}/s)")
+
+    fresh(db)
+    for label in ("new, empty DB", "new, same file"):
+        t0 = time.perf_counter()
+        con, stats = geo.run(str(db), str(COUNTRIES), str(cities))
+        con.close()
+        dt = time.perf_counter() - t0
+        print(f"{label:<17}{a.cities:>9,} cities in {dt:6.1f} s  ({a.cities / dt:>9,.0f}/s)  {stats['cities']}")
+    rss = peak_rss_mb()
+    if rss:
+        print(f"peak RSS {rss:.0f} MB")
+
+if __name__ == "__main__":
+    main()
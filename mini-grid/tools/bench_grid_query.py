@@ -0,0 +1,90 @@
+# bench_grid_query.py
+# Page latency of the /grid/companies query: the old LIKE '%q%' + OFFSET +
+# COUNT(*) pair vs grid_query.py (keyset cursor, FTS5 trigram, cached totals),
+# at growing table sizes. Each cell is the mean ms per page.
+# Usage:
+#   python bench_grid_query.py [--sizes 10000,100000,1000000] [--depth 200] [--workdir DIR]
+
+import argparse, pathlib, random, sqlite3, tempfile, time
+import grid_query
+
+WORDS = ["Medical", "Care", "Bau", "Logistik", "Handel", "Tech", "Pflege", "Apotheke", "Klinik", "Service"]
+LIMIT = 50
+
+def make_db(path, rows):
+    if path.exists():
+        path.unlink()
+    con = sqlite3.connect(path)
+    con.executescript("""
+      CREATE TABLE grid_companies (guid INTEGER NOT NULL, cc TEXT NOT NULL, ccc TEXT NOT NULL,
+        company_name TEXT, website_url TEXT, email TEXT, phone TEXT, notes TEXT, main_id INTEGER,
+        lobby_flag INTEGER DEFAULT 1, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+      CREATE INDEX idx_grid_guid_cc_ccc ON grid_companies(guid, cc, ccc);
+      CREATE INDEX idx_grid_name_nocase ON grid_companies(company_name COLLATE NOCASE);""")
+    rnd = random.Random(1)
+    con.executemany("INSERT INTO grid_companies (guid, cc, ccc, company_name, website_url) VALUES (?,?,?,?,?)",
+                    ((i, "DE", "BER", f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} {i:07d}", f"https://c{i}.example")
+                     for i in range(rows)))
+    con.commit()
+    con.row_factory = sqlite3.Row
+    grid_query.ensure_schema(con)
+    return con
+
+def old_page(con, q, offset):
+    base = "SELECT guid, company_name, website_url, email, phone, notes, main_id, cc, ccc FROM grid_companies"
+    if q:
+        items = con.execute(base + " WHERE company_name LIKE ? COLLATE NOCASE ORDER BY company_name COLLATE NOCASE LIMIT ? OFFSET ?",
+                            (f"%{q}%", LIMIT, offset)).fetchall()
+        total = con.execute("SELECT COUNT(*) FROM grid_companies WHERE company_name LIKE ? COLLATE NOCASE", (f"%{q}%",)).fetchone()[0]
+    else:
+        items = con.execute(base + " ORDER BY company_name COLLATE NOCASE LIMIT ? OFFSET ?", (LIMIT, offset)).fetchall()
+        total = con.execute("SELECT COUNT(*) FROM grid_companies").fetchone()[0]
+    return items, total
+
+def time_old(con, q, pages):
+    t0 = time.perf_counter()
+    for i in pages:
+        old_page(con, q, i * LIMIT)
+    return (time.perf_counter() - t0) / len(pages) * 1000
+
+def time_new(con, q, depth, pages):
+    # walk to the first requested page, then time the same pages via cursors
+    cursor, page, ms, n = None, 0, 0.0, 0
+    want = set(pages)
+    while page <= depth:
+        t0 = time.perf_counter()
+        r = grid_query.companies(con, q, LIMIT, cursor)
+        if page in want:
+            ms += time.perf_counter() - t0
+            n += 1
+        cursor = r["next_cursor"]
+        page += 1
+        if not cursor:
+            break
+    return ms / n * 1000 if n else None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--depth", type=int, default=200, help="deepest page number measured")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_gridq_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    cases = [("all, page 1", "", [0]), ("all, deep", "", None),
+             ("'klinik', page 1", "klinik", [0]), ("'klinik', deep", "klinik", None),
+             ("rare '0004242'", "0004242", [0])]
+    print(f"{'rows':>9}  {'case':<18}{'old ms':>10}{'new ms':>10}")
+    for n in [int(x) for x in a.sizes.split(",")]:
+        con = make_db(work / f"grid_{n}.db", n)
+        for name, q, pages in cases:
+            pages = pages or list(range(a.depth - 9, a.depth + 1))
+            new = time_new(con, q, a.depth, pages)
+            if new is None:  # fewer matching pages than --depth
+                continue
+            print(f"{n:>9}  {name:<18}{time_old(con, q, pages):>10.2f}{new:>10.2f}")
+        con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_grid_worker.py
+# Latency of a /grid/companies-style query: one fresh `python -c` per request
+# (the old runPyCode path in api/server.js) vs. the resident grid_worker.py.
+# Usage:
+#   python bench_grid_worker.py --requests 200 --rows 20000 --workdir E:\tmp\bench
+
+import argparse, json, os, pathlib, sqlite3, statistics, subprocess, sys, time
+
+SPAWN_CODE = """
+import sys, json, sqlite3
+d = json.load(sys.stdin)
+con = sqlite3.connect(d["db"])
+con.row_factory = sqlite3.Row
+cur = con.cursor()
+base = "SELECT guid, company_name, website_url, email, phone, notes, main_id, cc, ccc FROM grid_companies"
+cur.execute(base + " WHERE company_name LIKE ? COLLATE NOCASE ORDER BY company_name COLLATE NOCASE LIMIT ? OFFSET ?", (f"%{d['q']}%", d["limit"], d["offset"]))
+items = [dict(r) for r in cur.fetchall()]
+cur.execute("SELECT COUNT(*) AS n FROM grid_companies WHERE company_name LIKE ? COLLATE NOCASE", (f"%{d['q']}%",))
+total = cur.fetchone()[0]
+con.close()
+print(json.dumps({"ok": True, "items": items, "total": total}))
+"""
+
+def make_db(path, rows):
+    if path.exists():
+        path.unlink()
+    con = sqlite3.connect(path)
+    con.executescript("""
+      CREATE TABLE grid_companies (guid TEXT PRIMARY KEY, company_name TEXT, website_url TEXT, email TEXT,
+        phone TEXT, notes TEXT, main_id TEXT, cc TEXT, ccc TEXT, lobby_flag INTEGER DEFAULT 0);
+      CREATE TABLE grid_settings (key TEXT PRIMARY KEY, value TEXT);""")
+    con.executemany("INSERT INTO grid_companies (guid, company_name, website_url, cc, ccc) VALUES (?,?,?,?,?)",
+                    ((f"G~C~{i}", f"Company {i:06d} Medical", f"https://c{i}.example", "DE", "BER") for i in range(rows)))
+    con.commit(); con.close()
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+def report(name, lat):
+    print(f"{name:>9}: n={len(lat)} mean={statistics.mean(lat):7.2f}ms p50={pct(lat, .5):7.2f}ms p95={pct(lat, .95):7.2f}ms")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--workdir", default=".")
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir); work.mkdir(parents=True, exist_ok=True)
+    db = work / "bench_grid.db"
+    make_db(db, a.rows)
+    params = [{"q": f"{i % 97:02d}", "limit": 50, "offset": 0} for i in range(a.requests)]
+
+    spawn = []
+    for p in params:
+        t = time.perf_counter()
+        r = subprocess.run([sys.executable, "-c", SPAWN_CODE], input=json.dumps({"db": str(db), **p}),
+                           capture_output=True, text=True, check=True)
+        json.loads(r.stdout)
+        spawn.append((time.perf_counter() - t) * 1000)
+
+    env = {**os.environ, "LS_GRID_DB_PATH": str(db)}
+    w = subprocess.Popen([sys.executable, str(pathlib.Path(__file__).with_name("grid_worker.py"))], env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+    resident = []
+    for i, p in enumerate(params):
+        t = time.perf_counter()
+        w.stdin.write(json.dumps({"id": i, "op": "companies", "params": p}) + "\n"); w.stdin.flush()
+        msg = json.loads(w.stdout.readline())
+        assert msg["ok"] and msg["id"] == i, msg
+        resident.append((time.perf_counter() - t) * 1000)
+    w.stdin.close(); w.wait()
+
+    report("spawn", spawn)
+    report("resident", resident)
+    print(f"  speedup: {statistics.mean(spawn) / statistics.mean(resident):.1f}x (mean)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_import.py
+# Compare bundle import rows/sec for the per-row path (import_bundle(bulk=False))
+# against the set-based staging path, and check both give the same counts.
+# The target DB already holds the first half of the records at version 1; the
+# bundle bumps every other one of those to version 2, so it exercises
+# inserts, updates and skips.
+# Usage:
+#   python bench_import.py --sizes 10000 100000 1000000 --workdir E:\tmp\bench
+
+import argparse, json, shutil, time, pathlib
+from bench_common import make_db, seed_records
+import life_support_api as lsa
+
+def build(work, n):
+    src = make_db(work / "bench_import_src.db")
+    seed_records(src, n, version=2)
+    src.execute("DROP TRIGGER trg_records_updated_at")
+    src.execute("UPDATE records SET version=1 WHERE id % 2 = 0")
+    src.commit()
+    bundle = work / f"bench_import_{n}.lsx"
+    lsa.export_bundle(src, {"role": "bench"}, bundle, scope="full")
+    src.close()
+    tgt = make_db(work / "bench_import_tgt.db")
+    seed_records(tgt, n // 2, version=1)
+    tgt.close()
+    return bundle
+
+def run(work, bundle, bulk):
+    db = work / f"bench_import_{'bulk' if bulk else 'rows'}.db"
+    shutil.copy(work / "bench_import_tgt.db", db)
+    conn = lsa.connect_db({"db": {"path": str(db)}})
+    t0 = time.perf_counter()
+    applied = lsa.import_bundle(conn, {}, bundle, bulk=bulk)
+    dt = time.perf_counter() - t0
+    conn.close()
+    return applied, dt
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--workdir", default=".")
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir); work.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for n in a.sizes:
+        bundle = build(work, n)
+        rows_applied, rows_dt = run(work, bundle, bulk=False)
+        bulk_applied, bulk_dt = run(work, bundle, bulk=True)
+        results.append({"rows": n, "per_row_rps": int(n / rows_dt), "bulk_rps": int(n / bulk_dt),
+                        "speedup": round(rows_dt / bulk_dt, 1), "counts": bulk_applied,
+                        "counts_match": rows_applied == bulk_applied})
+    print()
+    print(f"{'rows':>9} {'per-row r/s':>12} {'bulk r/s':>10} {'speedup':>8}  counts")
+    for r in results:
+        print(f"{r['rows']:>9} {r['per_row_rps']:>12} {r['bulk_rps']:>10} {r['speedup']:>7}x  "
+              f"{json.dumps(r['counts'])}{'' if r['counts_match'] else '  MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# bench_outbox.py
+# End-to-end check of poller/outbox_dispatcher.py against a local stub of
+# mini-main: forwarding latency (commit + notify -> stub receives the row),
+# retry after a failing endpoint, idle CPU and log lines while nothing happens.
+# The old poll_outbox.bat loop for comparison: ~2.5 s mean latency (5 s poll),
+# one curl process and two log lines every 5 s whether or not there was work.
+# Usage:
+#   python bench_outbox.py [--rows 500] [--idle 20] [--workdir DIR]
+
+import argparse, json, os, pathlib, socket, sqlite3, subprocess, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bench_common import ROOT
+
+DISPATCHER = ROOT / "poller" / "outbox_dispatcher.py"
+CITY = "DE-BER-1101"
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like a real server
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    received = {}                   # outbox_id -> perf_counter at receipt
+    fail_next = 0
+    requests = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        cls.requests += 1
+        if cls.fail_next > 0:
+            cls.fail_next -= 1
+            self.send_response(503); self.send_header("Content-Length", "0"); self.end_headers()
+            return
+        now = time.perf_counter()
+        items = body.get("items", [])
+        for it in items:
+            cls.received.setdefault(it["outbox_id"], now)
+        out = json.dumps({"ok": True, "results": [{"ok": True} for _ in items]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *a):
+        pass
+
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def notify(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.sendto(b"1", ("127.0.0.1", port))
+
+def enqueue(con, i):
+    payload = json.dumps({"gat_id": f"GAT{i}", "city_id": CITY, "company_id": f"C{i}"})
+    cur = con.execute("INSERT INTO promotion_outbox (gat_id, city_id, company_id, payload_json) VALUES (?,?,?,?)",
+                      (f"GAT{i}", CITY, f"C{i}", payload))
+    con.commit()
+    return cur.lastrowid
+
+def wait_until(pred, timeout):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.005)
+    return False
+
+def proc_cpu_s(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except OSError:
+        try:
+            import psutil
+            t = psutil.Process(pid).cpu_times()
+            return t.user + t.system
+        except Exception:
+            return float("nan")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--idle", type=float, default=20, help="seconds of idle time to measure")
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_outbox_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    db = work / "mini.db"
+    db.unlink(missing_ok=True)
+    con = sqlite3.connect(db)
+    con.executescript((ROOT / "setup_mini.sql").read_text(encoding="utf-8"))
+    con.execute("PRAGMA journal_mode=WAL")
+
+    http_port, udp_port = free_port(), free_port(socket.SOCK_DGRAM)
+    srv = ThreadingHTTPServer(("127.0.0.1", http_port), Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    log_path = work / "dispatcher.log"
+    env = dict(os.environ, LS_OUTBOX_PROMOTE_URL=f"http://127.0.0.1:{http_port}/api/promote/batch")
+    with open(log_path, "w") as logf:
+        proc = subprocess.Popen([sys.executable, str(DISPATCHER), "--db", str(db), "--notify", f"127.0.0.1:{udp_port}",
+                                 "--state-dir", str(work), "--idle-max", "30"], env=env, stdout=logf, stderr=subprocess.STDOUT)
+    try:
+        time.sleep(1.0)  # let it bind and settle into its idle wait
+
+        # 1) single promotions, one at a time: commit -> notify -> stub sees it
+        lat = []
+        for i in range(min(a.rows, 50)):
+            t0 = time.perf_counter()
+            oid = enqueue(con, i)
+            notify(udp_port)
+            wait_until(lambda: oid in Stub.received, 10)
+            lat.append((Stub.received[oid] - t0) * 1000)
+        lat.sort()
+        print(f"single rows: mean {sum(lat) / len(lat):.1f} ms, p95 {lat[int(len(lat) * 0.95) - 1]:.1f} ms")
+
+        # 2) a burst: rows committed back to back, one notify each
+        t0 = time.perf_counter()
+        ids = [enqueue(con, 10_000 + i) for i in range(a.rows)]
+        for _ in range(3):
+            notify(udp_port)
+        wait_until(lambda: all(i in Stub.received for i in ids), 30)
+        dt = time.perf_counter() - t0
+        print(f"burst of {a.rows}: all forwarded in {dt * 1000:.0f} ms ({a.rows / dt:,.0f} rows/s), "
+              f"{Stub.requests} HTTP requests so far")
+
+        # 3) endpoint down for two tries: row is retried with backoff, then delivered
+        Stub.fail_next = 2
+        t0 = time.perf_counter()
+        oid = enqueue(con, 99_999)
+        notify(udp_port)
+        ok = wait_until(lambda: oid in Stub.received, 30)
+        row = con.execute("SELECT status, attempts, last_error FROM promotion_outbox WHERE id=?", (oid,)).fetchone()
+        print(f"retry: delivered={ok} after {(time.perf_counter() - t0):.1f} s, row={row}")
+
+        # 4) idle: CPU and log lines with nothing to do
+        lines0, cpu0 = sum(1 for _ in open(log_path)), proc_cpu_s(proc.pid)
+        time.sleep(a.idle)
+        lines1, cpu1 = sum(1 for _ in open(log_path)), proc_cpu_s(proc.pid)
+        print(f"idle {a.idle:.0f} s: cpu {(cpu1 - cpu0) * 1000:.0f} ms, log lines {lines1 - lines0} "
+              f"(old poller: {int(a.idle // 5)} curl runs, {2 * int(a.idle // 5)} log lines)")
+    finally:
+        (work / "STOP").write_text("stop")
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
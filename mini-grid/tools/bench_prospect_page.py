@@ -0,0 +1,93 @@
+# bench_prospect_page.py
+# Pages/sec for the printable prospect page: the old inline f-string handler
+# vs prospect_page.py (cold = every page misses the cache, warm = repeat views).
+# Measures the handler work (DB reads + render) on one pooled connection,
+# without HTTP overhead, over a scratch DB built from setup_mini.sql.
+# Usage:
+#   python bench_prospect_page.py [--prospects 2000] [--contacts 8] [--views 20000]
+
+import argparse, pathlib, random, sys, tempfile, time
+from bench_common import ROOT, make_db
+
+sys.path.insert(0, str(ROOT / "api"))
+import prospect_page  # noqa: E402
+from db_pool import Pool  # noqa: E402
+
+CITY = "DE-BER-1101"
+LEGACY_CSS = (prospect_page.STATIC_DIR / "prospect.css").read_text(encoding="utf-8")
+LEGACY_JS = (prospect_page.STATIC_DIR / "prospect.js").read_text(encoding="utf-8")
+
+def legacy_view(conn, gat_id, city_id, company_id):
+    # The handler body as it was before prospect_page.py: CSS/JS inlined into
+    # every page, hand-rolled escaping, both queries on every hit.
+    p = conn.execute("SELECT * FROM prospects WHERE gat_id=? AND city_id=? AND company_id=?",
+                     (gat_id, city_id, company_id)).fetchone()
+    contacts = conn.execute(
+        "SELECT contact_name, role_title, email, phone, COALESCE(notes,'') AS notes "
+        "FROM contact_grid WHERE gat_id=? AND city_id=? AND company_id=? ORDER BY contact_id DESC",
+        (gat_id, city_id, company_id)).fetchall()
+    def esc(x):
+        return (x or "").replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+    rows = "".join(
+        f"<tr><td>{esc(c['contact_name'])}</td><td>{esc(c['role_title'])}</td>"
+        f"<td>{esc(c['email'])}</td><td>{esc(c['phone'])}</td><td>{esc(c['notes'])}</td></tr>"
+        for c in contacts) or "<tr><td colspan='5'>No contacts yet</td></tr>"
+    css, js = LEGACY_CSS, LEGACY_JS
+    return f"""<!doctype html><meta charset="utf-8"><title>Prospect • {esc(p['prospect_name'])}</title>
+<style>{css}</style><h1>Prospect</h1><p class="meta"><b>GAT</b> {esc(p['gat_id'])} •
+<b>City</b> {esc(p['city_id'])} • <b>Company</b> {esc(p['company_id'])}<br>
+<b>Name</b> {esc(p['prospect_name'])}<br><b>Status</b> {esc(p['lifecycle_status'] or '')} •
+<b>Created</b> {esc(p['created_at'] or '')} • <b>Updated</b> {esc(p['updated_at'] or '')}</p>
+<table><tbody>{rows}</tbody></table>
+<script>const trio = {{gat_id: {gat_id!r}, city_id: {city_id!r}, company_id: {company_id!r}}};{js}</script>"""
+
+def seed(con, n, per):
+    con.executemany("INSERT INTO prospects (gat_id, city_id, company_id, prospect_name) VALUES (?,?,?,?)",
+                    [(f"GAT-{i:05d}", CITY, f"CO-{i:05d}", f"Company {i} & Sons <GmbH>") for i in range(n)])
+    con.executemany("INSERT INTO contact_grid (gat_id, city_id, company_id, contact_name, role_title, email, phone, notes) "
+                    "VALUES (?,?,?,?,?,?,?,?)",
+                    [(f"GAT-{i:05d}", CITY, f"CO-{i:05d}", f"Contact {i}.{j}", "Manager",
+                      f"c{i}.{j}@example.org", f"+49 30 {i:05d}{j}", "met at fair") for i in range(n) for j in range(per)])
+    con.commit()
+
+def run(fn, conn, trios):
+    t0 = time.perf_counter()
+    for t in trios:
+        fn(conn, *t)
+    return len(trios) / (time.perf_counter() - t0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prospects", type=int, default=2000)
+    ap.add_argument("--contacts", type=int, default=8)
+    ap.add_argument("--views", type=int, default=20000)
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_page_"))
+    work.mkdir(parents=True, exist_ok=True)
+    db = work / "page.db"
+    seed(make_db(db, schema=ROOT / "setup_mini.sql"), a.prospects, a.contacts)
+
+    cache = prospect_page.CACHE
+
+    all_trios = [(f"GAT-{i:05d}", CITY, f"CO-{i:05d}") for i in range(a.prospects)]
+    rnd = random.Random(1)
+    views = [rnd.choice(all_trios) for _ in range(a.views)]
+
+    with Pool(db, size=1).read() as conn:
+        before = run(legacy_view, conn, views)
+        cache.size = 0
+        cold = run(prospect_page.prospect_page, conn, views)
+        cache.size = max(a.prospects, 1)
+        run(prospect_page.prospect_page, conn, all_trios)  # fill
+        warm = run(prospect_page.prospect_page, conn, views)
+
+    print(f"prospects={a.prospects} contacts/prospect={a.contacts} views={a.views}")
+    print(f"{'path':<22}{'pages/s':>12}{'speedup':>10}")
+    for name, r in (("before (f-string)", before), ("after, cache off", cold), ("after, cache warm", warm)):
+        print(f"{name:<22}{r:>12,.0f}{r / before:>9.1f}x")
+    print("cache:", cache.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_seek_queue.py
+# Claims/sec of sync/seek_queue.py with many concurrent agents (one process
+# and connection each, claim -> complete loops) against the old access path:
+# SELECT from the COALESCE-ordered v_seek_queue, then UPDATE each guid.
+# Also checks that no record was leased to two agents.
+# Usage:
+#   python bench_seek_queue.py [--records 200000] [--agents 1,4,16] [--batch 10] [--seconds 5] [--workdir DIR]
+
+import argparse, multiprocessing, pathlib, sqlite3, tempfile, time
+from bench_common import make_db, seed_records
+import seek_queue
+
+OLD_VIEW = """CREATE VIEW IF NOT EXISTS v_seek_queue_old AS
+SELECT guid, seek_status FROM records
+WHERE to_seek=1 AND seek_status IN ('queued','in_progress')
+ORDER BY COALESCE(next_action_at,'9999-12-31'), seek_priority DESC, guid"""
+
+def connect(db):
+    con = sqlite3.connect(db, timeout=30, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+def claim_new(con, agent, n):
+    con.execute("BEGIN IMMEDIATE")
+    items = seek_queue.claim(con, agent, n)
+    con.execute("COMMIT")
+    return [i["guid"] for i in items]
+
+def complete_new(con, agent, guids):
+    con.execute("BEGIN IMMEDIATE")
+    seek_queue.complete(con, agent, guids)
+    con.execute("COMMIT")
+
+def claim_old(con, agent, n):
+    con.execute("BEGIN IMMEDIATE")
+    guids = [r[0] for r in con.execute("SELECT guid FROM v_seek_queue_old WHERE seek_status='queued' LIMIT ?", (n,))]
+    for g in guids:
+        con.execute("UPDATE records SET seek_status='in_progress', attempts=attempts+1, claimed_by=? WHERE guid=?", (agent, g))
+    con.execute("COMMIT")
+    return guids
+
+def complete_old(con, agent, guids):
+    con.execute("BEGIN IMMEDIATE")
+    for g in guids:
+        con.execute("UPDATE records SET seek_status='done' WHERE guid=?", (g,))
+    con.execute("COMMIT")
+
+def agent(args):
+    db, name, mode, batch, seconds, start_at = args
+    con = connect(db)
+    claim, complete = (claim_new, complete_new) if mode == "new" else (claim_old, complete_old)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    got, end = [], time.time() + seconds
+    while time.time() < end:
+        guids = claim(con, name, batch)
+        if not guids:
+            break
+        got.extend(guids)
+        complete(con, name, guids)
+    con.close()
+    return got
+
+def prepare(work, records):
+    db = work / "seek.db"
+    for p in (db, db.with_name(db.name + "-wal"), db.with_name(db.name + "-shm")):
+        p.unlink(missing_ok=True)
+    con = make_db(db)
+    seed_records(con, records)
+    con.execute("""UPDATE records SET to_seek=1, seek_status='queued', seek_priority=abs(random()) % 6,
+                   next_action_at=CASE WHEN id % 4 = 0 THEN '2099-01-01T00:00:00.000Z' END""")
+    con.commit()
+    seek_queue.ensure_schema(con)
+    con.execute(OLD_VIEW)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.commit()
+    con.close()
+    return db
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=200_000)
+    ap.add_argument("--agents", default="1,4,16")
+    ap.add_argument("--batch", type=int, default=10, help="records per claim")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_seekq_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    print(f"{'path':<6}{'agents':>7}{'claims/s':>11}{'records/s':>11}{'dupes':>7}")
+    for mode in ("old", "new"):
+        for n in [int(x) for x in a.agents.split(",")]:
+            db = prepare(work, a.records)
+            start_at = time.time() + 0.5
+            with multiprocessing.Pool(n) as pool:
+                res = pool.map(agent, [(str(db), f"agent-{i}", mode, a.batch, a.seconds, start_at) for i in range(n)])
+            got = [g for r in res for g in r]
+            print(f"{mode:<6}{n:>7}{len(got) / a.batch / a.seconds:>11,.0f}{len(got) / a.seconds:>11,.0f}"
+                  f"{len(got) - len(set(got)):>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# bench_snapshot.py
+# Onboarding a new node: importing one full bundle (what a fresh mini does
+# today) against "snapshot create" on the source plus "snapshot restore" on
+# the target. Both targets must end up with the same records.
+# Usage:
+#   python bench_snapshot.py [--rows 200000] [--workdir DIR]
+
+import argparse, pathlib, tempfile, time
+from bench_common import make_db, seed_records
+import life_support_api as lsa
+
+def timed(fn, *args, **kw):
+    t0 = time.perf_counter()
+    out = fn(*args, **kw)
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    work = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_snapshot_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    src = make_db(work / "source.db")
+    seed_records(src, a.rows)
+    cfg = {"role": "main", "agent": {"id": "MAIN"}, "sync": {"peer": "mini"}}
+    tcfg = {"role": "mini", "agent": {"id": "mini"}, "sync": {"peer": "MAIN"}}
+
+    bundle = work / "full.lsx"
+    _, export_s = timed(lsa.export_bundle, src, cfg, bundle, scope="full")
+    tgt = make_db(work / "target_bundle.db")
+    _, import_s = timed(lsa.import_bundle, tgt, tcfg, bundle)
+
+    snap = work / "snapshot.db"
+    _, create_s = timed(lsa.create_snapshot, src, cfg, snap, peer="mini")
+    tgt2 = make_db(work / "target_snapshot.db")
+    _, restore_s = timed(lsa.restore_snapshot, tgt2, tcfg, snap)
+
+    q = "SELECT guid, version, content_hash FROM records ORDER BY guid"
+    same = tgt.execute(q).fetchall() == tgt2.execute(q).fetchall()
+    print()
+    print(f"{a.rows:,} records")
+    print(f"full bundle   export {export_s:6.2f}s  import  {import_s:6.2f}s  total {export_s + import_s:6.2f}s  "
+          f"{bundle.stat().st_size / 2**20:6.1f} MB")
+    print(f"snapshot      create {create_s:6.2f}s  restore {restore_s:6.2f}s  total {create_s + restore_s:6.2f}s  "
+          f"{snap.stat().st_size / 2**20:6.1f} MB")
+    print("targets match" if same else "TARGETS DIFFER")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# bulk_load.py
+# Bulk loader for lead lists: prospects + contact_grid from CSV or JSONL in the
+# grid/grid_sample.csv column layout
+#   gat_id,city_id,company_id,prospect_name,contact_name,role_title,email,phone,notes
+# (one row per contact; a row with no contact_name only upserts the prospect).
+#
+# - Streams the file in chunks of --batch rows, one transaction per chunk.
+# - Prospects: staged, then one UPDATE ... FROM (name changed) and one
+#   INSERT ... WHERE NOT EXISTS per chunk. Parents go in before contacts, so
+#   every staged contact already has its parent.
+# - Contacts: deduplicated by (trio, email) or (trio, phone digits), or by
+#   (trio, name) when a contact has neither, against the DB and within the
+#   file; inserted with one INSERT ... SELECT.
+# - trg_contacts_guard_insert checks each inserted row for a parent. With
+#   --defer-guard the trigger is dropped inside the chunk's transaction, the
+#   parent check runs once as a set, and the trigger is recreated before
+#   COMMIT (a failed check rolls the chunk back).
+# - Bad rows go to a reject file next to the input (<input>.rejects.csv /
+#   .jsonl) with the reason.
+# - Progress is checkpointed in meta (k = 'bulk_load:<path>') in the same
+#   transaction as each chunk, so a rerun after a crash resumes exactly after
+#   the last committed chunk. --restart ignores the checkpoint.
+#
+# Usage:
+#   set LS_MINI_DB_PATH=E:\life-support-mini\db\mini.db
+#   python bulk_load.py leads.csv [--batch 50000] [--defer-guard] [--restart] [--rejects FILE]
+
+import argparse, csv, json, os, pathlib, re, sqlite3, sys, time
+
+FIELDS = ("gat_id", "city_id", "company_id", "prospect_name", "contact_name", "role_title", "email", "phone", "notes")
+REQUIRED = ("gat_id", "city_id", "company_id", "prospect_name")
+GUARD = "trg_contacts_guard_insert"
+_NOT_DIGIT = re.compile(r"\D+")
+
+# ---------- input ----------
+
+def clean(v):
+    if v is None:
+        return ""
+    return str(v).strip()
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        r = csv.reader(f)
+        header = [h.strip() for h in next(r, [])]
+        missing = [c for c in REQUIRED if c not in header]
+        if missing:
+            sys.exit(f"{path}: header is missing {', '.join(missing)}")
+        idx = [header.index(k) if k in header else None for k in FIELDS]
+        for n, row in enumerate(r, 1):
+            width = len(row)
+            rec = {k: row[i].strip() if i is not None and i < width else "" for k, i in zip(FIELDS, idx)}
+            yield n, rec, rec, None
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8-sig") as f:
+        n = 0
+        for line in f:
+            if not line.strip():
+                continue
+            n += 1
+            try:
+                obj = json.loads(line)
+                if not isinstance(obj, dict):
+                    raise ValueError("not an object")
+            except ValueError as e:
+                yield n, None, {"_raw": line.rstrip("\n")}, f"bad json: {e}"
+                continue
+            yield n, {k: clean(obj.get(k)) for k in FIELDS}, obj, None
+
+def records(path, fmt):
+    return read_jsonl(path) if fmt == "jsonl" else read_csv(path)
+
+class Rejects:
+    """Reject file in the input's format, plus _record and _reason.
+
+    The checkpoint stores the file size at each commit; a resume cuts the
+    file back to it, so rejects from a chunk that never committed are not
+    written twice.
+    """
+    def __init__(self, path, fmt, pos=None):
+        self.path, self.fmt = path, fmt
+        if pos is not None and path.exists():
+            self.f = open(path, "r+", newline="", encoding="utf-8")
+            self.f.seek(pos)
+            self.f.truncate()
+        else:
+            self.f = open(path, "w", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self.w = csv.DictWriter(self.f, fieldnames=[*FIELDS, "_record", "_reason"], extrasaction="ignore")
+            if not self.f.tell():
+                self.w.writeheader()
+
+    def add(self, n, raw, reason):
+        if self.fmt == "csv":
+            self.w.writerow({**raw, "_record": n, "_reason": reason})
+        else:
+            self.f.write(json.dumps({**raw, "_record": n, "_reason": reason}, ensure_ascii=False) + "\n")
+
+    def sync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+# ---------- checkpoint ----------
+
+def fingerprint(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{int(st.st_mtime)}"
+
+def load_checkpoint(conn, key):
+    row = conn.execute("SELECT v FROM meta WHERE k=?", (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def save_checkpoint(conn, key, state):
+    conn.execute("INSERT INTO meta (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+                 (key, json.dumps(state)))
+
+# ---------- load ----------
+
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS stage_prospects (
+    gat_id TEXT, city_id TEXT, company_id TEXT, prospect_name TEXT,
+    PRIMARY KEY (gat_id, city_id, company_id)) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS stage_contacts (
+    gat_id TEXT, city_id TEXT, company_id TEXT, contact_name TEXT, role_title TEXT,
+    email TEXT, phone TEXT, notes TEXT, email_key TEXT, phone_key TEXT, name_key TEXT);
+"""
+
+# digits-only phone, in SQL, to compare against contacts already in the DB
+PHONE_SQL = "replace(replace(replace(replace(replace(replace(replace(c.phone,' ',''),'-',''),'+',''),'(',''),')',''),'/',''),'.','')"
+
+def contact_keys(r):
+    email = r["email"].lower()
+    phone = _NOT_DIGIT.sub("", r["phone"])
+    return email, phone, (r["contact_name"].lower() if not email and not phone else "")
+
+def load_chunk(conn, rows, stats, defer_guard):
+    """rows: validated dicts. Duplicates within the chunk are dropped here;
+    the INSERT's NOT EXISTS catches those already in the DB (earlier chunks too)."""
+    prospects = {}
+    contacts = []
+    seen = {}
+    for r in rows:
+        trio = (r["gat_id"], r["city_id"], r["company_id"])
+        prospects[trio] = r["prospect_name"]          # last name in the file wins
+        if not r["contact_name"]:
+            continue
+        email, phone, name = contact_keys(r)
+        keys = seen.setdefault(trio, set())
+        mine = {k for k in (email and "e:" + email, phone and "p:" + phone, name and "n:" + name) if k}
+        if keys & mine:
+            stats["contacts_dup"] += 1
+            continue
+        keys |= mine
+        contacts.append((*trio, r["contact_name"], r["role_title"] or None, r["email"] or None,
+                         r["phone"] or None, r["notes"] or None, email, phone, name))
+
+    conn.execute("DELETE FROM temp.stage_prospects")
+    conn.execute("DELETE FROM temp.stage_contacts")
+    conn.executemany("INSERT INTO temp.stage_prospects VALUES (?,?,?,?)",
+                     [(*t, n) for t, n in prospects.items()])
+    stats["prospects_updated"] += conn.execute("""
+        UPDATE prospects SET prospect_name = s.prospect_name
+        FROM temp.stage_prospects AS s
+        WHERE prospects.gat_id = s.gat_id AND prospects.city_id = s.city_id AND prospects.company_id = s.company_id
+          AND prospects.prospect_name IS NOT s.prospect_name""").rowcount
+    stats["prospects_inserted"] += conn.execute("""
+        INSERT INTO prospects (gat_id, city_id, company_id, prospect_name)
+        SELECT s.gat_id, s.city_id, s.company_id, s.prospect_name FROM temp.stage_prospects AS s
+        WHERE NOT EXISTS (SELECT 1 FROM prospects p
+                          WHERE p.gat_id = s.gat_id AND p.city_id = s.city_id AND p.company_id = s.company_id)""").rowcount
+
+    conn.executemany("INSERT INTO temp.stage_contacts VALUES (?,?,?,?,?,?,?,?,?,?,?)", contacts)
+    guard_sql = None
+    if defer_guard:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (GUARD,)).fetchone()
+        if row:
+            guard_sql = row[0]
+            conn.execute(f"DROP TRIGGER {GUARD}")
+    inserted = conn.execute(f"""
+        INSERT INTO contact_grid (gat_id, city_id, company_id, contact_name, role_title, email, phone, notes)
+        SELECT s.gat_id, s.city_id, s.company_id, s.contact_name, s.role_title, s.email, s.phone, s.notes
+        FROM temp.stage_contacts AS s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM contact_grid c
+            WHERE c.gat_id = s.gat_id AND c.city_id = s.city_id AND c.company_id = s.company_id
+              AND ((s.email_key <> '' AND lower(trim(c.email)) = s.email_key)
+                OR (s.phone_key <> '' AND {PHONE_SQL} = s.phone_key)
+                OR (s.name_key <> '' AND lower(trim(c.contact_name)) = s.name_key)))""").rowcount
+    stats["contacts_inserted"] += inserted
+    stats["contacts_dup"] += len(contacts) - inserted
+    if guard_sql:
+        # the guard's check, once for the whole chunk
+        orphans = conn.execute("""
+            SELECT COUNT(*) FROM temp.stage_contacts s
+            WHERE NOT EXISTS (SELECT 1 FROM prospects p WHERE p.gat_id=s.gat_id AND p.city_id=s.city_id AND p.company_id=s.company_id)
+              AND NOT EXISTS (SELECT 1 FROM sponsors  p WHERE p.gat_id=s.gat_id AND p.city_id=s.city_id AND p.company_id=s.company_id)
+        """).fetchone()[0]
+        if orphans:
+            raise RuntimeError(f"{orphans} contact(s) without a Prospects or Sponsors parent")
+        conn.execute(guard_sql)
+
+def validate(n, rec, raw, err, rejects):
+    if err:
+        rejects.add(n, raw, err)
+        return None
+    missing = [k for k in REQUIRED if not rec[k]]
+    if missing:
+        rejects.add(n, raw, "missing " + ", ".join(missing))
+        return None
+    return rec
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input")
+    ap.add_argument("--db", default=os.environ.get("LS_MINI_DB_PATH", "mini.db"))
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    ap.add_argument("--batch", type=int, default=50000, help="rows per transaction")
+    ap.add_argument("--defer-guard", action="store_true", help="check contact parents once per chunk, not per row")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    ap.add_argument("--rejects", help="reject file (default: <input>.rejects.<fmt>)")
+    a = ap.parse_args()
+
+    src = pathlib.Path(a.input).resolve()
+    fmt = a.format or ("jsonl" if src.suffix.lower() in (".jsonl", ".ndjson", ".json") else "csv")
+    key = f"bulk_load:{src}"
+
+    conn = sqlite3.connect(a.db, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+    conn.executescript(STAGE_DDL)
+
+    ck = None if a.restart else load_checkpoint(conn, key)
+    if ck and ck.get("fingerprint") != fingerprint(src):
+        sys.exit(f"{src} changed since the checkpoint ({ck['records']} records done); rerun with --restart")
+    done = ck["records"] if ck else 0
+    stats = ck["stats"] if ck else dict.fromkeys(
+        ("rows", "rejected", "prospects_inserted", "prospects_updated", "contacts_inserted", "contacts_dup"), 0)
+    if done:
+        print(f"Resuming {src.name} after record {done:,}")
+
+    rows0 = stats["rows"]
+    rejects = Rejects(pathlib.Path(a.rejects) if a.rejects else src.with_name(src.name + f".rejects.{fmt}"),
+                      fmt, ck.get("rejects_pos") if ck else None)
+    t0 = time.perf_counter()
+    loaded = 0
+
+    def flush(chunk, last_n):
+        nonlocal loaded
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            load_chunk(conn, chunk, stats, a.defer_guard)
+            save_checkpoint(conn, key, {"fingerprint": fingerprint(src), "records": last_n, "stats": stats,
+                                        "rejects_pos": rejects.sync()})
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        loaded += len(chunk)
+        dt = time.perf_counter() - t0
+        print(f"  {last_n:>10,} records  {loaded / dt:>9,.0f} rows/s  "
+              f"+{stats['prospects_inserted']:,} prospects  +{stats['contacts_inserted']:,} contacts", flush=True)
+
+    try:
+        chunk, n = [], done
+        for n, rec, raw, err in records(src, fmt):
+            if n <= done:
+                continue
+            stats["rows"] += 1
+            ok = validate(n, rec, raw, err, rejects)
+            if ok is None:
+                stats["rejected"] += 1
+                continue
+            chunk.append(ok)
+            if len(chunk) >= a.batch:
+                flush(chunk, n)
+                chunk = []
+        if chunk or n > done:
+            flush(chunk, n)
+    finally:
+        rejects.close()
+        conn.close()
+
+    dt = time.perf_counter() - t0
+    print(f"Done: {stats['rows']:,} rows in {dt:.1f} s ({(stats['rows'] - rows0) / max(dt, 1e-9):,.0f} rows/s) | "
+          f"prospects +{stats['prospects_inserted']:,} ~{stats['prospects_updated']:,} | "
+          f"contacts +{stats['contacts_inserted']:,} dup {stats['contacts_dup']:,} | rejected {stats['rejected']:,}"
+          + (f" -> {rejects.path}" if stats["rejected"] else ""))
+
+if __name__ == "__main__":
+    main()
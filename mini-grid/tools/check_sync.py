@@ -0,0 +1,115 @@
+# check_sync.py
+# Multi-node sync scenarios run end to end on scratch DBs: two minis and a main
+# exchanging bundles through export_bundle / import_bundle with the shipped
+# configs' peer naming. Prints one line per scenario, exits 1 if any fails.
+# Usage:
+#   python check_sync.py [--workdir DIR]
+
+import argparse, pathlib, sys, tempfile
+from bench_common import make_db
+import life_support_api as lsa
+import seek_queue
+
+class Node:
+    """One DB plus the config a node of that role runs with. Bundles carry the
+    producer's row ids, so each node writes its own block of ids."""
+    def __init__(self, work, name, role, agent=None, ids=0, peer_agents=None):
+        self.name, self.work, self.next_id = name, work, ids
+        self.cfg = {"role": role, "db": {"path": str(work / f"{name}.db")}}
+        if agent:
+            self.cfg["agent"] = {"id": agent}
+        if peer_agents:
+            self.cfg["sync"] = {"peer_agents": peer_agents}
+        make_db(work / f"{name}.db").close()
+        self.conn = lsa.connect_db(self.cfg)
+        lsa.ensure_change_capture(self.conn)
+        self.sent = 0
+
+    def add(self, guid, updated_at, version=1):
+        self.next_id += 1
+        self.conn.execute("INSERT INTO records (id, guid, content_hash, version, updated_at) VALUES (?, ?, ?, ?, ?)",
+                          (self.next_id, guid, f"hash-{guid}-{version}", version, updated_at))
+        self.conn.commit()
+
+    def export(self, scope="delta"):
+        self.sent += 1
+        out = self.work / f"{self.name}_{self.sent}.lsx"
+        return out if lsa.export_bundle(self.conn, self.cfg, out, scope=scope) else None
+
+    def take(self, bundle):
+        return lsa.import_bundle(self.conn, self.cfg, bundle) if bundle else None
+
+    def guids(self):
+        return {r[0] for r in self.conn.execute("SELECT guid FROM records")}
+
+def relay_through_main(work):
+    """A mini record older than main's delta watermark still reaches the other mini."""
+    main = Node(work, "main", "main", ids=1_000_000, peer_agents={"mini": ["mini1", "mini2"]})
+    mini1 = Node(work, "mini1", "mini", "mini1", ids=2_000_000)
+    mini2 = Node(work, "mini2", "mini", "mini2", ids=3_000_000)
+    main.add("main-rec", "2026-01-01T00:00:00.000Z")
+    mini2.take(main.export())              # main's watermark for "mini" now sits past main-rec
+    mini1.add("mini1-rec", "2020-01-01T00:00:00.000Z")
+    main.take(mini1.export())
+    mini2.take(main.export())              # main_sync_stub.bat: export --scope assigned (= delta)
+    return "mini1-rec" in mini2.guids(), f"mini2 has {sorted(mini2.guids())}"
+
+def echo_suppressed(work):
+    """Records a mini sent main don't come straight back to it (config.main.json setup)."""
+    main = Node(work, "main", "main", ids=1_000_000, peer_agents={"mini": ["mini1"]})
+    mini1 = Node(work, "mini1", "mini", "mini1", ids=2_000_000)
+    for i in range(4):
+        mini1.add(f"mini1-rec-{i}", "2026-01-01T00:00:00.000Z")
+    main.take(mini1.export("changes"))
+    main.add("main-rec", "2026-01-01T00:00:00.000Z")
+    back = main.export("changes")
+    applied = mini1.take(back)
+    sent = lsa.open_bundle(back)[1]["entities"]["records"] if back else 0
+    return sent == 1 and applied["insert"] == 1, f"main sent {sent} records back, mini1 applied {applied}"
+
+def ack_per_mini(work):
+    """mini1's ack doesn't hold a record back from mini2 behind the same peer name."""
+    main = Node(work, "main", "main", ids=1_000_000, peer_agents={"mini": ["mini1", "mini2"]})
+    mini1 = Node(work, "mini1", "mini", "mini1", ids=2_000_000)
+    mini2 = Node(work, "mini2", "mini", "mini2", ids=3_000_000)
+    mini1.add("mini1-rec", "2026-01-01T00:00:00.000Z")
+    main.take(mini1.export("changes"))
+    mini2.take(main.export("changes"))
+    return "mini1-rec" in mini2.guids(), f"mini2 has {sorted(mini2.guids())}"
+
+def lease_stays_local(work):
+    """Claiming a record neither queues it for the next delta nor ships the lease."""
+    main = Node(work, "main", "main", ids=1_000_000, peer_agents={"mini": ["mini1"]})
+    mini1 = Node(work, "mini1", "mini", "mini1", ids=2_000_000)
+    seek_queue.ensure_schema(mini1.conn)
+    lsa.ensure_change_capture(mini1.conn)
+    mini1.add("mini1-rec", "2026-01-01T00:00:00.000Z")
+    mini1.conn.execute("UPDATE records SET to_seek=1, seek_status='queued'")
+    main.take(mini1.export())
+    mini1.conn.execute("BEGIN IMMEDIATE")
+    seek_queue.claim(mini1.conn, "seeker")
+    mini1.conn.commit()
+    after_claim = mini1.export()
+    main.take(mini1.export("full"))
+    row = main.conn.execute("SELECT seek_status, claimed_by, attempts FROM records").fetchone()
+    return after_claim is None and tuple(row) == ("queued", None, 0), \
+        f"delta after claim: {after_claim and after_claim.name}, main has {tuple(row)}"
+
+SCENARIOS = [relay_through_main, echo_suppressed, ack_per_mini, lease_stays_local]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workdir", default=None)
+    a = ap.parse_args()
+    base = pathlib.Path(a.workdir or tempfile.mkdtemp(prefix="ls_check_sync_"))
+    failed = 0
+    for scenario in SCENARIOS:
+        work = base / scenario.__name__
+        work.mkdir(parents=True, exist_ok=True)
+        ok, detail = scenario(work)
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {scenario.__name__}: {detail}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# companies_mat.py
+# Materialized companies table for mini.db.
+#
+# mat_companies holds one row per prospect and per sponsor (company_type tells
+# which), with the grid guid (gat_id~city_id~company_id) precomputed and
+# indexed. Triggers on prospects/sponsors keep it current row by row, and the
+# ALL_COMPANIES / grid_companies views become thin selects over it, so list
+# and grid reads hit one indexed table instead of re-running a UNION ALL.
+#
+# Usage:
+#   python companies_mat.py --db E:\life-support-mini\db\mini.db setup     (table, indexes, triggers, views + rebuild)
+#   python companies_mat.py --db ... rebuild                               (full refresh from prospects/sponsors)
+#   python companies_mat.py --db ... verify                                (diff against the base tables; exit 1 on drift)
+
+import argparse, sqlite3, sys
+
+DEFAULT_DB = r"E:\life-support-mini\db\mini.db"
+
+COLS = ("company_type, gat_id, city_id, company_id, guid, company_name, website_url, "
+        "lifecycle_status, created_at, updated_at")
+
+TABLE = """
+CREATE TABLE IF NOT EXISTS mat_companies (
+    company_type      TEXT NOT NULL,              -- 'prospect' | 'sponsor'
+    gat_id            TEXT NOT NULL,
+    city_id           TEXT NOT NULL,
+    company_id        TEXT NOT NULL,
+    guid              TEXT NOT NULL,              -- gat_id~city_id~company_id
+    company_name      TEXT,
+    website_url       TEXT NOT NULL DEFAULT '',
+    lifecycle_status  TEXT,
+    created_at        TEXT,
+    updated_at        TEXT,
+    PRIMARY KEY (company_type, gat_id, city_id, company_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_mat_companies_name ON mat_companies (company_type, company_name COLLATE NOCASE, guid);
+CREATE INDEX IF NOT EXISTS idx_mat_companies_guid ON mat_companies (guid);
+CREATE INDEX IF NOT EXISTS idx_mat_companies_trio ON mat_companies (gat_id, city_id, company_id);
+"""
+
+TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_mat_{table}_ai AFTER INSERT ON {table} BEGIN
+    INSERT OR REPLACE INTO mat_companies ({cols})
+    {select} WHERE t.gat_id = NEW.gat_id AND t.{city} = NEW.{city} AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_{table}_au AFTER UPDATE ON {table} BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = '{kind}' AND gat_id = OLD.gat_id AND city_id = OLD.{city} AND company_id = OLD.company_id;
+    INSERT OR REPLACE INTO mat_companies ({cols})
+    {select} WHERE t.gat_id = NEW.gat_id AND t.{city} = NEW.{city} AND t.company_id = NEW.company_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mat_{table}_ad AFTER DELETE ON {table} BEGIN
+    DELETE FROM mat_companies
+     WHERE company_type = '{kind}' AND gat_id = OLD.gat_id AND city_id = OLD.{city} AND company_id = OLD.company_id;
+END;
+"""
+# The insert re-reads the base row rather than using NEW.*: trg_*_updated
+# touches updated_at in a nested UPDATE, and the outer trigger may run last.
+
+VIEWS = """
+DROP VIEW IF EXISTS ALL_COMPANIES;
+CREATE VIEW ALL_COMPANIES AS
+SELECT gat_id, city_id, company_id, company_name, company_type, lifecycle_status, created_at, updated_at
+FROM mat_companies;
+"""
+
+GRID_VIEW = """
+DROP VIEW IF EXISTS grid_companies;
+CREATE VIEW grid_companies AS
+SELECT gat_id, city_id, company_id, guid, company_name, website_url
+FROM mat_companies
+WHERE company_type = 'prospect';
+"""
+
+def columns(con, table):
+    return {r[1] for r in con.execute(f"PRAGMA table_info({table})")}
+
+def pick(cols, *names):
+    return next((n for n in names if n in cols), None)
+
+def sources(con):
+    """Per base table: (table, kind, city column, SELECT producing COLS from alias t).
+
+    Column names are discovered the way fix_grid_view2.py does, so older
+    prospects layouts (city_code / company_name / website) still map.
+    """
+    p = columns(con, "prospects")
+    s = columns(con, "sponsors")
+    city = pick(p, "city_id", "city_code")
+    name = pick(p, "prospect_name", "company_name")
+    web = pick(p, "website_url", "website")
+    if not city or not name or not s:
+        raise SystemExit(f"prospects/sponsors missing expected columns: prospects={sorted(p)} sponsors={sorted(s)}")
+    web_expr = f"COALESCE(t.{web}, '')" if web else "''"
+    status = "t.lifecycle_status" if "lifecycle_status" in p else "'active'"
+    guid = "t.gat_id || '~' || t.{c} || '~' || t.company_id"
+    return [
+        ("prospects", "prospect", city,
+         f"SELECT 'prospect', t.gat_id, t.{city}, t.company_id, {guid.format(c=city)}, t.{name}, "
+         f"{web_expr}, {status}, t.created_at, t.updated_at FROM prospects AS t"),
+        ("sponsors", "sponsor", "city_id",
+         f"SELECT 'sponsor', t.gat_id, t.city_id, t.company_id, {guid.format(c='city_id')}, t.sponsor_name, "
+         f"'', 'n/a', t.created_at, t.updated_at FROM sponsors AS t"),
+    ]
+
+def grid_view_replaceable(con):
+    row = con.execute("SELECT type FROM sqlite_master WHERE name='grid_companies'").fetchone()
+    return row is None or row[0] == "view"   # never touch the Grid's own grid_companies table
+
+def setup(con):
+    srcs = sources(con)
+    script = TABLE + "".join(TRIGGERS.format(table=t, kind=k, city=c, cols=COLS, select=sel)
+                             for t, k, c, sel in srcs)
+    script += VIEWS + (GRID_VIEW if grid_view_replaceable(con) else "")
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        for stmt in split_script(script):
+            con.execute(stmt)
+        refresh(con, srcs)
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+
+def split_script(script):
+    """executescript() commits first; split on statement ends so setup runs in one transaction."""
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                yield buf
+            buf = ""
+
+def refresh(con, srcs):
+    con.execute("DELETE FROM mat_companies")
+    for _, _, _, sel in srcs:
+        con.execute(f"INSERT INTO mat_companies ({COLS}) {sel}")
+
+def rebuild(con):
+    srcs = sources(con)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        refresh(con, srcs)
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return con.execute("SELECT COUNT(*) FROM mat_companies").fetchone()[0]
+
+def verify(con, sample=10):
+    """Diff mat_companies against the base tables: row counts each way plus a sample."""
+    base = " UNION ALL ".join(sel for _, _, _, sel in sources(con))
+    missing_sql = f"SELECT * FROM ({base}) EXCEPT SELECT {COLS} FROM mat_companies"
+    extra_sql = f"SELECT {COLS} FROM mat_companies EXCEPT SELECT * FROM ({base})"
+    n_missing = con.execute(f"SELECT COUNT(*) FROM ({missing_sql})").fetchone()[0]
+    n_extra = con.execute(f"SELECT COUNT(*) FROM ({extra_sql})").fetchone()[0]
+    return {
+        "ok": n_missing == 0 and n_extra == 0,
+        "missing": n_missing, "extra": n_extra,
+        "missing_sample": [tuple(r) for r in con.execute(f"{missing_sql} LIMIT {sample}")],
+        "extra_sample": [tuple(r) for r in con.execute(f"{extra_sql} LIMIT {sample}")],
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=DEFAULT_DB)
+    ap.add_argument("cmd", choices=["setup", "rebuild", "verify"])
+    a = ap.parse_args()
+    con = sqlite3.connect(a.db, isolation_level=None)
+    try:
+        if a.cmd == "setup":
+            setup(con)
+            print({"ok": True, "rows": con.execute("SELECT COUNT(*) FROM mat_companies").fetchone()[0]})
+        elif a.cmd == "rebuild":
+            print({"ok": True, "rows": rebuild(con)})
+        else:
+            res = verify(con)
+            print(res)
+            if not res["ok"]:
+                sys.exit(1)
+    finally:
+        con.close()
+
+if __name__ == "__main__":
+    main()
@@ -24,8 +24,7 @@ SELECT
   (p.gat_id || '~' || p.{city} || '~' || p.company_id) AS guid,
   p.{name}      AS company_name,
   {web_expr}    AS website_url
-FROM prospects AS p
-ORDER BY p.{name} COLLATE NOCASE;
+FROM prospects AS p;  -- no ORDER BY here: callers order (and page) themselves
 '''
 cur.executescript(sql)
 con.commit(); con.close()
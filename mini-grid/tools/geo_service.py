@@ -1,10 +1,131 @@
-﻿import sys, json, sqlite3
-DB = r"E:\life-support-mini\db\mini.db"
+﻿# geo_service.py
+# Countries / cities lookup for the prospecting pages.
+#
+# GeoCache reads country + city once into immutable maps and pre-renders every
+# JSON response with its ETag, so a lookup is a dict hit. The importer
+# (import_geo_from_json.py) bumps meta 'geo:version' on every import; the cache
+# re-reads that key at most every LS_GEO_CHECK_S seconds and reloads when it
+# moved. Clients revalidate with If-None-Match and get 304 while nothing changed.
+#
+# Usage:
+#   python geo_service.py countries                      (one-shot, JSON to stdout)
+#   python geo_service.py cities DE
+#   python geo_service.py serve [--host 127.0.0.1] [--port 3012]
+#       GET /geo/countries     [{"cc","name"}, ...] by name
+#       GET /geo/cities/DE     {"cc","cities":[{"name","abbr"}, ...]} (also /geo/cities?cc=DE)
+#       GET /geo/version       {"version", "countries", "cities"}
+# api/server.py mounts the same routes on the mini API.
+#
+# Env (all optional):
+#   LS_MINI_DB_PATH   database (default E:\life-support-mini\db\mini.db)
+#   LS_GEO_CHECK_S    seconds between version checks (default 5)
+#   LS_GEO_MAX_AGE    Cache-Control max-age for clients (default 60)
+#   LS_GEO_PORT       serve port (default 3012)
+
+import argparse, hashlib, json, os, pathlib, sqlite3, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
+from urllib.parse import parse_qs, quote, urlsplit
+
+DB = os.environ.get("LS_MINI_DB_PATH", r"E:\life-support-mini\db\mini.db")
+CHECK_S = float(os.environ.get("LS_GEO_CHECK_S", "5"))
+MAX_AGE = int(os.environ.get("LS_GEO_MAX_AGE", "60"))
+VERSION_KEY = "geo:version"
+
+# cc is COLLATE NOCASE (ux_country_cc), so a plain = on an upper-cased
+# parameter seeks the index; city rows come back in ux_city_country_name order
+COUNTRIES_SQL = "SELECT id, UPPER(cc), name FROM country ORDER BY name"
+CITIES_SQL = "SELECT country_id, name, abbr FROM city ORDER BY country_id, name"
+COUNTRY_BY_CC_SQL = "SELECT id FROM country WHERE cc = ?"
+
+def read_version(con):
+    try:
+        row = con.execute("SELECT v FROM meta WHERE k=?", (VERSION_KEY,)).fetchone()
+    except sqlite3.OperationalError:  # no meta table yet
+        return None
+    return row[0] if row else None
+
+class Body:
+    """One pre-rendered JSON response."""
+    __slots__ = ("body", "etag")
+
+    def __init__(self, obj):
+        self.body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=12).hexdigest() + '"'
+
+class Snapshot:
+    """Everything served, built once per DB version and never mutated."""
+    def __init__(self, con):
+        self.version = read_version(con)
+        have = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('country','city')")}
+        countries = con.execute(COUNTRIES_SQL).fetchall() if "country" in have else []
+        by_id = {cid: cc for cid, cc, _ in countries}
+        cities = {cc: [] for cc in by_id.values()}
+        for country_id, name, abbr in (con.execute(CITIES_SQL) if "city" in have else ()):
+            cc = by_id.get(country_id)
+            if cc is not None:
+                cities[cc].append({"name": name, "abbr": abbr})
+        self.countries = Body([{"cc": cc, "name": name} for _, cc, name in countries])
+        self.cities = MappingProxyType({cc: Body({"cc": cc, "cities": rows}) for cc, rows in cities.items()})
+        self.counts = {"countries": len(countries), "cities": sum(len(r) for r in cities.values())}
+        self.info = Body({"version": self.version, **self.counts})
+
+    def city_body(self, cc):
+        cc = cc.upper()
+        return self.cities.get(cc) or Body({"cc": cc, "cities": []})
+
+def ro_uri(path):
+    """Read-only SQLite URI for a file path; '#', '?' and '%' in it are percent-quoted."""
+    return f"file:{quote(pathlib.Path(path).as_posix(), safe='/:')}?mode=ro"
+
+class GeoCache:
+    def __init__(self, db=DB, check_s=CHECK_S):
+        self.db, self.check_s = db, check_s
+        self._lock = threading.Lock()
+        self._con = None
+        self._snap = None
+        self._checked = 0.0
+
+    def _connect(self):
+        if self._con is None:
+            self._con = sqlite3.connect(ro_uri(self.db), uri=True, check_same_thread=False)
+        return self._con
+
+    def snapshot(self):
+        """Current snapshot; at most one cheap version read per check_s, a reload only when it changed."""
+        snap, now = self._snap, time.monotonic()
+        if snap is not None and now - self._checked < self.check_s:
+            return snap
+        with self._lock:
+            if self._snap is not None and now - self._checked < self.check_s:
+                return self._snap
+            con = self._connect()
+            if self._snap is None or read_version(con) != self._snap.version:
+                self._snap = Snapshot(con)
+            self._checked = now
+            return self._snap
+
+    def countries(self):
+        return self.snapshot().countries
+
+    def cities(self, cc):
+        return self.snapshot().city_body(cc)
+
+    def info(self):
+        return self.snapshot().info
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+# ---------- one-shot CLI ----------
 
 def countries():
     con = sqlite3.connect(DB)
     rows = [{"cc": cc, "name": name}
-            for cc,name in con.execute("SELECT cc,name FROM country ORDER BY name")]
+            for _, cc, name in con.execute(COUNTRIES_SQL)]
     con.close()
     print(json.dumps(rows, ensure_ascii=False))
 
@@ -13,17 +134,73 @@ def cities(cc):
     rows = [{"name": name, "abbr": abbr}
             for (name,abbr) in con.execute("""
               SELECT ci.name, ci.abbr
-              FROM country c JOIN city ci ON ci.country_id=c.id
-              WHERE UPPER(c.cc)=?
+              FROM city ci
+              WHERE ci.country_id = (""" + COUNTRY_BY_CC_SQL + """)
               ORDER BY ci.name
             """, (cc.upper(),))]
     con.close()
     print(json.dumps({"cc": cc.upper(), "cities": rows}, ensure_ascii=False))
 
+# ---------- resident HTTP service ----------
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cache = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["geo", "countries"]:
+            body = self.cache.countries()
+        elif parts[:2] == ["geo", "cities"] and len(parts) <= 3:
+            cc = parts[2] if len(parts) == 3 else parse_qs(url.query).get("cc", [""])[0]
+            if len(cc) != 2:
+                return self.reply(400, b'{"error":"cc must be a 2-letter country code"}')
+            body = self.cache.cities(cc)
+        elif parts == ["geo", "version"]:
+            body = self.cache.info()
+        else:
+            return self.reply(404, b'{"error":"not found"}')
+        if etag_matches(self.headers.get("If-None-Match"), body.etag):
+            return self.reply(304, b"", body.etag)
+        self.reply(200, body.body, body.etag)
+
+    def reply(self, code, payload, etag=None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"public, max-age={MAX_AGE}, must-revalidate")
+        if code != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *a):
+        pass
+
+def serve(host, port):
+    Handler.cache = GeoCache()
+    info = Handler.cache.snapshot()
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    print(f"geo service on http://{host}:{port}/geo/ ({info.counts['countries']} countries, "
+          f"{info.counts['cities']} cities, version {info.version})", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
 if __name__ == "__main__":
     if len(sys.argv) >= 2 and sys.argv[1].lower() == "countries":
         countries()
     elif len(sys.argv) >= 3 and sys.argv[1].lower() == "cities":
         cities(sys.argv[2])
+    elif len(sys.argv) >= 2 and sys.argv[1].lower() == "serve":
+        ap = argparse.ArgumentParser(prog="geo_service.py serve")
+        ap.add_argument("--host", default="127.0.0.1")
+        ap.add_argument("--port", type=int, default=int(os.environ.get("LS_GEO_PORT", "3012")))
+        a = ap.parse_args(sys.argv[2:])
+        serve(a.host, a.port)
     else:
         sys.exit(2)
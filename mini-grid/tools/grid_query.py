@@ -0,0 +1,228 @@
+# grid_query.py
+# Company list/search for the Grid API (used by grid_worker.py's "companies" op).
+#
+# - Keyset pagination on (company_name COLLATE NOCASE, guid, rowid): a page
+#   seeks straight to the previous page's last key instead of skipping OFFSET
+#   rows, so page 1000 costs the same as page 1. The cursor handed to clients
+#   is that key, base64url-encoded; treat it as opaque.
+# - Substring search goes through an FTS5 trigram index (grid_companies_fts)
+#   kept in sync by triggers; queries shorter than 3 characters (too short for
+#   trigrams) fall back to LIKE. Terms matching a large share of the table
+#   walk the name index with a LIKE filter instead, which finds a page of
+#   matches sooner than sorting every FTS hit.
+# - Totals are cached per query string and dropped whenever the table changes:
+#   the same triggers bump a generation counter in grid_search_state.
+#
+# Usage:
+#   python grid_query.py --db E:\life-support-mini-grid\db\grid.db setup     (create index/FTS/triggers, backfill)
+#   python grid_query.py --db ... rebuild                                  (rebuild the FTS index from the table)
+#   python grid_query.py --db ... search "med" [--limit 50] [--cursor ...]
+
+import argparse, base64, json, sqlite3, threading
+from collections import OrderedDict
+
+COLS = "guid, company_name, website_url, email, phone, notes, main_id, cc, ccc"
+ORDER = "g.company_name COLLATE NOCASE, g.guid, g.rowid"
+MIN_FTS_LEN = 3          # trigram tokenizer needs at least 3 characters
+COUNT_CACHE_SIZE = 512
+SCAN_BUDGET = 20000      # max rows an index walk may touch per page before FTS is used instead
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_grid_name_key ON grid_companies (company_name COLLATE NOCASE, guid);
+
+CREATE TABLE IF NOT EXISTS grid_search_state (k TEXT PRIMARY KEY, v INTEGER NOT NULL);
+INSERT OR IGNORE INTO grid_search_state (k, v) VALUES ('gen', 0);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS grid_companies_fts USING fts5(
+  company_name, content='grid_companies', content_rowid='rowid', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_grid_fts_ai AFTER INSERT ON grid_companies BEGIN
+  INSERT INTO grid_companies_fts (rowid, company_name) VALUES (NEW.rowid, NEW.company_name);
+  UPDATE grid_search_state SET v = v + 1 WHERE k = 'gen';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grid_fts_ad AFTER DELETE ON grid_companies BEGIN
+  INSERT INTO grid_companies_fts (grid_companies_fts, rowid, company_name) VALUES ('delete', OLD.rowid, OLD.company_name);
+  UPDATE grid_search_state SET v = v + 1 WHERE k = 'gen';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grid_fts_au AFTER UPDATE OF company_name ON grid_companies BEGIN
+  INSERT INTO grid_companies_fts (grid_companies_fts, rowid, company_name) VALUES ('delete', OLD.rowid, OLD.company_name);
+  INSERT INTO grid_companies_fts (rowid, company_name) VALUES (NEW.rowid, NEW.company_name);
+  UPDATE grid_search_state SET v = v + 1 WHERE k = 'gen';
+END;
+"""
+
+def is_table(con, name):
+    return con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+def ensure_schema(con):
+    """Create the key index, FTS table and triggers; backfill FTS on first run.
+
+    Returns False (and does nothing) when grid_companies is not a plain table,
+    e.g. the grid_companies view fix_grid_view.py puts on a mini.db.
+    """
+    if not is_table(con, "grid_companies"):
+        return False
+    fresh = not is_table(con, "grid_companies_fts")
+    with con:
+        con.executescript(SCHEMA)
+        if fresh:
+            con.execute("INSERT INTO grid_companies_fts (grid_companies_fts) VALUES ('rebuild')")
+    return True
+
+def rebuild(con):
+    with con:
+        con.execute("INSERT INTO grid_companies_fts (grid_companies_fts) VALUES ('rebuild')")
+        con.execute("UPDATE grid_search_state SET v = v + 1 WHERE k = 'gen'")
+
+# ---------- cursors ----------
+
+def encode_cursor(name, guid, rid):
+    raw = json.dumps([name, guid, rid], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, guid, rid = json.loads(raw)
+        return name, guid, int(rid)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"bad cursor: {cursor!r}") from e
+
+def after_clause(key):
+    """WHERE fragment selecting rows strictly after `key` in ORDER."""
+    if key is None:
+        return "1", {}
+    name, guid, rid = key
+    if name is None:
+        # NULL names sort first; the row-value compare would be NULL for them
+        return ("((g.company_name IS NULL AND (g.guid, g.rowid) > (:k_guid, :k_rid))"
+                " OR g.company_name IS NOT NULL)"), {"k_guid": guid, "k_rid": rid}
+    # the leading >= is redundant but lets SQLite seek the name index; a
+    # row-value compare alone under COLLATE NOCASE makes it scan from the start
+    return ("g.company_name COLLATE NOCASE >= :k_name"
+            " AND (g.company_name COLLATE NOCASE, g.guid, g.rowid) > (:k_name, :k_guid, :k_rid)",
+            {"k_name": name, "k_guid": guid, "k_rid": rid})
+
+# ---------- search ----------
+
+def fts_phrase(q):
+    return '"' + q.replace('"', '""') + '"'
+
+def match_clause(q, use_fts):
+    """WHERE fragment for the search term (substring, case-insensitive)."""
+    if not q:
+        return "1", {}
+    if use_fts:
+        return ("g.rowid IN (SELECT rowid FROM grid_companies_fts WHERE grid_companies_fts MATCH :q_fts)",
+                {"q_fts": fts_phrase(q)})
+    return "g.company_name LIKE :q_like COLLATE NOCASE", {"q_like": f"%{q}%"}
+
+class CountCache:
+    """Totals per query string, valid for one table generation."""
+    def __init__(self, size=COUNT_CACHE_SIZE):
+        self.size = size
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, gen):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is None or hit[0] != gen:
+                return None
+            self._d.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, gen, total):
+        with self._lock:
+            self._d[key] = (gen, total)
+            self._d.move_to_end(key)
+            while len(self._d) > self.size:
+                self._d.popitem(last=False)
+
+COUNTS = CountCache()
+
+def generation(con):
+    row = con.execute("SELECT v FROM grid_search_state WHERE k='gen'").fetchone()
+    return row[0] if row else None
+
+def count(con, q, fts):
+    gen = generation(con) if fts else None
+    if gen is not None:
+        total = COUNTS.get(q, gen)
+        if total is not None:
+            return total
+    if fts and len(q) >= MIN_FTS_LEN:
+        sql, params = "SELECT COUNT(*) FROM grid_companies_fts WHERE grid_companies_fts MATCH ?", (fts_phrase(q),)
+    else:
+        where, params = match_clause(q, False)
+        sql = f"SELECT COUNT(*) FROM grid_companies AS g WHERE {where}"
+    total = con.execute(sql, params).fetchone()[0]
+    if gen is not None:
+        COUNTS.put(q, gen, total)
+    return total
+
+def companies(con, q="", limit=50, cursor=None, offset=0, fts=True):
+    """One page of grid_companies ordered by name.
+
+    Pass `cursor` (the previous page's next_cursor) to continue; `offset` is
+    only honoured without a cursor, for older clients.
+    """
+    q = (q or "").strip()
+    key = decode_cursor(cursor) if cursor else None
+    total = count(con, q, fts)
+    # Frequent terms: walk the name index and filter, a page then touches about
+    # limit * rows / total rows. Rare terms: fetch the FTS matches and sort them.
+    use_fts = (fts and len(q) >= MIN_FTS_LEN
+               and (total == 0 or limit * count(con, "", fts) > SCAN_BUDGET * total))
+    m_sql, m_params = match_clause(q, use_fts)
+    a_sql, a_params = after_clause(key)
+    sql = (f"SELECT g.rowid AS _rid, {COLS} FROM grid_companies AS g "
+           f"WHERE {m_sql} AND {a_sql} ORDER BY {ORDER} LIMIT :limit")
+    params = {**m_params, **a_params, "limit": limit}
+    if key is None and offset:
+        sql += " OFFSET :offset"
+        params["offset"] = offset
+    rows = con.execute(sql, params).fetchall()
+    items = []
+    for r in rows:
+        d = dict(r)
+        d.pop("_rid")
+        items.append(d)
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["company_name"], last["guid"], last["_rid"])
+    return {"ok": True, "items": items, "total": total, "limit": limit,
+            "offset": offset if key is None else None, "next_cursor": next_cursor}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("setup")
+    sub.add_parser("rebuild")
+    s = sub.add_parser("search")
+    s.add_argument("q", nargs="?", default="")
+    s.add_argument("--limit", type=int, default=50)
+    s.add_argument("--cursor")
+    a = ap.parse_args()
+
+    con = sqlite3.connect(a.db)
+    con.row_factory = sqlite3.Row
+    fts = ensure_schema(con)
+    if a.cmd == "setup":
+        print({"ok": fts, "fts": fts})
+    elif a.cmd == "rebuild":
+        if not fts:
+            raise SystemExit("grid_companies is not a table; nothing to index")
+        rebuild(con)
+        print({"ok": True})
+    else:
+        print(json.dumps(companies(con, a.q, a.limit, a.cursor, fts=fts), ensure_ascii=False, indent=2))
+    con.close()
+
+if __name__ == "__main__":
+    main()
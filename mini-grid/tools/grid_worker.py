@@ -0,0 +1,109 @@
+# grid_worker.py
+# Resident SQLite query worker for api/server.js.
+# Speaks line-delimited JSON-RPC on stdin/stdout so the Grid API no longer
+# starts a fresh Python per HTTP request:
+#   -> {"id": 7, "op": "companies", "params": {"q": "med", "limit": 50, "cursor": null}}
+#   <- {"id": 7, "ok": true, "result": {...}}      or {"id": 7, "ok": false, "error": "..."}
+# Requests run on a small thread pool, each thread holding its own warm
+# connection (and with it SQLite's prepared-statement cache); responses may
+# come back out of order, matched by id.
+# Usage:
+#   set LS_GRID_DB_PATH=E:\life-support-mini-grid\db\grid.db
+#   python grid_worker.py [--threads 4]
+
+import argparse, json, os, sqlite3, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+import grid_query
+
+DB = os.environ.get("LS_GRID_DB_PATH", "grid.db")
+_local = threading.local()
+_state = {"fts": False}
+
+def db():
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = sqlite3.connect(DB, timeout=5, cached_statements=256, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        _local.con = con
+    return con
+
+# ---------- operations ----------
+
+def op_companies(p):
+    limit = max(1, min(int(p.get("limit", 50)), 200))
+    return grid_query.companies(db(), p.get("q", ""), limit, cursor=p.get("cursor") or None,
+                                offset=int(p.get("offset", 0) or 0), fts=_state["fts"])
+
+def op_apply_main_updates(p):
+    updates = p.get("updates", []) or []
+    con = db()
+    with con:
+        con.executemany("UPDATE grid_companies SET main_id=?, lobby_flag=0 WHERE guid=? AND cc=? AND ccc=?",
+                        [(u.get("company_id"), u.get("guid"), u.get("cc"), u.get("ccc")) for u in updates])
+    return {"ok": True, "updated": len(updates)}
+
+def op_auto_flag_get(p):
+    row = db().execute("SELECT value FROM grid_settings WHERE key='auto_flag'").fetchone()
+    val = row[0] if row else '0'
+    return {"ok": True, "auto_flag": val == '1'}
+
+def op_auto_flag_set(p):
+    val = '1' if p.get("auto_flag") else '0'
+    con = db()
+    with con:
+        con.execute("INSERT OR REPLACE INTO grid_settings (key, value) VALUES ('auto_flag', ?)", (val,))
+    return {"ok": True, "auto_flag": val == '1'}
+
+def op_ping(p):
+    return {"ok": True, "pid": os.getpid(), "db": DB}
+
+OPS = {
+    "companies": op_companies,
+    "apply_main_updates": op_apply_main_updates,
+    "auto_flag.get": op_auto_flag_get,
+    "auto_flag.set": op_auto_flag_set,
+    "ping": op_ping,
+}
+
+# ---------- loop ----------
+
+_out_lock = threading.Lock()
+
+def reply(msg):
+    line = json.dumps(msg, ensure_ascii=False)
+    with _out_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def handle(req):
+    rid = req.get("id")
+    fn = OPS.get(req.get("op"))
+    if fn is None:
+        return reply({"id": rid, "ok": False, "error": f"unknown op: {req.get('op')}"})
+    try:
+        reply({"id": rid, "ok": True, "result": fn(req.get("params") or {})})
+    except Exception as e:
+        reply({"id": rid, "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=4)
+    a = ap.parse_args()
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+    _state["fts"] = grid_query.ensure_schema(db())  # search index + triggers, see grid_query.py
+    with ThreadPoolExecutor(max_workers=a.threads) as pool:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = json.loads(line)
+            except ValueError as e:
+                reply({"id": None, "ok": False, "error": f"bad request: {e}"})
+                continue
+            pool.submit(handle, req)
+    # stdin closed: the parent went away; the pool drains in-flight requests on exit
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,22 @@
-﻿import argparse, json, os, sqlite3
+﻿# import_geo_from_json.py
+# Load countries (and optionally cities) from JSON into country / city.
+#
+#   countries: [{"cc":"SA","name":"Saudi Arabia"}, ...]  or  {"SA":"Saudi Arabia", ...}
+#   cities:    [{"cc":"SA","name":"Riyadh","abbr":"RYD"}, ...]  or  {"SA":{"RIYADH":"RYD", ...}, ...}
+#
+# The files are read incrementally (one list item / one top-level country at a
+# time), staged into temp tables with executemany and applied with a handful of
+# set-based statements in one transaction. Re-running the same files changes
+# nothing. A city whose abbr is already used by another city of that country is
+# skipped and counted, not fatal. geo:version in meta is bumped only when
+# something changed (geo_service.py caches reload on it).
+#
+# Usage:
+#   python import_geo_from_json.py --db mini.db --countries country_codes.json [--cities cities.json]
 
-p = argparse.ArgumentParser()
-p.add_argument("--db", required=True)
-p.add_argument("--countries", required=True)
-p.add_argument("--cities", default="")
-a = p.parse_args()
+import argparse, json, os, sqlite3, time
 
-def load_json(path):
-    if not path or not os.path.exists(path): return None
-    with open(path, "r", encoding="utf-8-sig") as f:
-        return json.load(f)
-
-con = sqlite3.connect(a.db)
-cur = con.cursor()
-
-# Ensure tables & unique indexes exist (matches our upserts)
-cur.executescript("""
+SCHEMA = """
 PRAGMA foreign_keys=ON;
 CREATE TABLE IF NOT EXISTS country(
   id INTEGER PRIMARY KEY,
@@ -33,53 +34,193 @@ CREATE TABLE IF NOT EXISTS city(
 );
 CREATE UNIQUE INDEX IF NOT EXISTS ux_city_country_name ON city(country_id, name COLLATE NOCASE);
 CREATE UNIQUE INDEX IF NOT EXISTS ux_city_country_abbr ON city(country_id, abbr COLLATE NOCASE);
-""")
-
-# --- import countries ---
-raw_c = load_json(a.countries)
-count_c = 0
-if raw_c is not None:
-    if isinstance(raw_c, list):
-        items = [(str(x.get("cc","")).upper(), str(x.get("name",""))) for x in raw_c if x]
-    else:  # map {"SA":"Saudi Arabia",...}
-        items = [(k.upper(), str(v)) for k,v in (raw_c or {}).items()]
-    for cc, name in items:
-        if len(cc)==2 and name:
-            cur.execute("""INSERT INTO country(cc,name) VALUES(?,?)
-                           ON CONFLICT(cc) DO UPDATE SET name=excluded.name""", (cc, name))
-            count_c += 1
-
-# --- import cities (optional) ---
-raw_ct = load_json(a.cities)
-count_ct = 0
-if raw_ct:
-    rows = []
-    if isinstance(raw_ct, list):
-        for x in raw_ct:
-            rows.append((str(x.get("cc","")).upper(), str(x.get("name","")).upper(), str(x.get("abbr","")).upper()))
-    else:  # {"SA":{"RIYADH":"RYD",...}, ...}
-        for cc, m in (raw_ct or {}).items():
-            for name, abbr in (m or {}).items():
-                rows.append((str(cc).upper(), str(name).upper(), str(abbr).upper()))
-    for cc, name, abbr in rows:
-        if not (cc and name and abbr): continue
-        cur.execute("SELECT id FROM country WHERE UPPER(cc)=UPPER(?)", (cc,))
-        r = cur.fetchone()
-        if r:
-            cur.execute("""INSERT INTO city(country_id,name,abbr) VALUES(?,?,?)
-                           ON CONFLICT(country_id,name) DO UPDATE SET abbr=excluded.abbr""",
-                        (r[0], name, abbr))
-            count_ct += 1
-
-con.commit()
-
-# sample output
-cur.execute("SELECT cc,name FROM country ORDER BY name LIMIT 8")
-print("Countries sample:", cur.fetchall())
-cur.execute("""SELECT c.cc, ci.name, ci.abbr
-              FROM country c JOIN city ci ON ci.country_id=c.id
-              ORDER BY c.cc, ci.name LIMIT 8""")
-print("Cities sample   :", cur.fetchall())
-
-con.close()
-print(f"Imported/updated {count_c} countries, {count_ct} cities.")
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+"""
+
+STAGE = """
+CREATE TEMP TABLE IF NOT EXISTS stage_city (
+  country_id INTEGER NOT NULL,
+  name TEXT NOT NULL COLLATE NOCASE,
+  abbr TEXT NOT NULL,
+  PRIMARY KEY (country_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS temp.ix_stage_city_abbr ON stage_city(country_id, abbr COLLATE NOCASE);
+"""
+BATCH = 20000
+
+# ---------- incremental JSON reading ----------
+
+_DEC = json.JSONDecoder()
+_WS = " \t\r\n"
+
+class _Reader:
+    """Top-level list items / object members of a JSON file, decoded one at a time."""
+    def __init__(self, f, chunk=1 << 20):
+        self.f, self.chunk = f, chunk
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _fill(self):
+        data = self.f.read(self.chunk)
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self.eof = not data
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def take(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} near {self.buf[self.pos:self.pos + 40]!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _DEC.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:  # a number at the buffer end may continue
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def iter_json(path):
+    """Yield (None, item) per list item, or (key, value) per member of a top-level object."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        r = _Reader(f)
+        first = r.peek()
+        if first not in ("[", "{"):
+            raise ValueError(f"{path}: expected a JSON list or object")
+        close = "]" if first == "[" else "}"
+        r.pos += 1
+        if r.peek() == close:
+            return
+        while True:
+            if first == "[":
+                yield None, r.value()
+            else:
+                key = r.value()
+                r.take(":")
+                yield key, r.value()
+            if r.peek() == ",":
+                r.pos += 1
+                continue
+            r.take(close)
+            return
+
+def country_items(path):
+    for key, v in iter_json(path):
+        if key is None:
+            if v:
+                yield str(v.get("cc", "")).upper(), str(v.get("name", ""))
+        else:
+            yield key.upper(), str(v)
+
+def city_items(path):
+    for key, v in iter_json(path):
+        if key is None:
+            if v:
+                yield str(v.get("cc", "")).upper(), str(v.get("name", "")).upper(), str(v.get("abbr", "")).upper()
+        else:
+            for name, abbr in (v or {}).items():
+                yield str(key).upper(), str(name).upper(), str(abbr).upper()
+
+# ---------- import ----------
+
+def import_countries(con, path):
+    have = {cc.upper(): name for cc, name in con.execute("SELECT cc, name FROM country")}
+    new = {}
+    for cc, name in country_items(path):
+        if len(cc) == 2 and name:
+            new[cc] = name
+    added = [(cc, n) for cc, n in new.items() if cc not in have]
+    changed = [(cc, n) for cc, n in new.items() if cc in have and have[cc] != n]
+    con.executemany("""INSERT INTO country(cc,name) VALUES(?,?)
+                       ON CONFLICT(cc) DO UPDATE SET name=excluded.name""", added + changed)
+    return {"added": len(added), "changed": len(changed), "unchanged": len(new) - len(added) - len(changed)}
+
+def import_cities(con, path):
+    ids = {cc.upper(): cid for cid, cc in con.execute("SELECT id, cc FROM country")}
+    con.execute("DELETE FROM temp.stage_city")
+    skipped_cc = skipped_bad = 0
+    batch = []
+    for cc, name, abbr in city_items(path):
+        if not (cc and name and 2 <= len(abbr) <= 8):
+            skipped_bad += 1
+            continue
+        cid = ids.get(cc)
+        if cid is None:
+            skipped_cc += 1
+            continue
+        batch.append((cid, name, abbr))
+        if len(batch) >= BATCH:
+            con.executemany("INSERT OR REPLACE INTO temp.stage_city VALUES (?,?,?)", batch)  # last one in the file wins
+            batch = []
+    con.executemany("INSERT OR REPLACE INTO temp.stage_city VALUES (?,?,?)", batch)
+
+    # abbr already taken by a different city (in the DB, or earlier in the file): skip, don't abort
+    clash = con.execute("""DELETE FROM temp.stage_city AS s WHERE
+          EXISTS (SELECT 1 FROM city c WHERE c.country_id = s.country_id AND c.abbr = s.abbr AND c.name <> s.name)
+       OR EXISTS (SELECT 1 FROM temp.stage_city t WHERE t.country_id = s.country_id AND t.abbr = s.abbr COLLATE NOCASE
+                  AND t.name < s.name)""").rowcount
+
+    staged = con.execute("SELECT COUNT(*) FROM temp.stage_city").fetchone()[0]
+    changed = con.execute("""UPDATE city SET abbr = s.abbr FROM temp.stage_city AS s
+                             WHERE city.country_id = s.country_id AND city.name = s.name
+                               AND city.abbr IS NOT s.abbr""").rowcount
+    added = con.execute("""INSERT INTO city(country_id, name, abbr)
+                           SELECT s.country_id, s.name, s.abbr FROM temp.stage_city AS s
+                           WHERE NOT EXISTS (SELECT 1 FROM city c WHERE c.country_id = s.country_id AND c.name = s.name)""").rowcount
+    return {"added": added, "changed": changed, "unchanged": staged - added - changed,
+            "skipped_abbr_clash": clash, "skipped_unknown_cc": skipped_cc, "skipped_invalid": skipped_bad}
+
+def run(db, countries_path, cities_path=""):
+    con = sqlite3.connect(db, isolation_level=None)
+    con.executescript(SCHEMA + STAGE)
+    stats = {}
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        if countries_path and os.path.exists(countries_path):
+            stats["countries"] = import_countries(con, countries_path)
+        if cities_path and os.path.exists(cities_path):
+            stats["cities"] = import_cities(con, cities_path)
+        if any(s["added"] or s["changed"] for s in stats.values()):
+            # tell geo_service.py caches to reload
+            con.execute("""INSERT INTO meta (k, v) VALUES ('geo:version', strftime('%Y-%m-%dT%H:%M:%fZ','now'))
+                           ON CONFLICT(k) DO UPDATE SET v=excluded.v""")
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return con, stats
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", required=True)
+    p.add_argument("--countries", required=True)
+    p.add_argument("--cities", default="")
+    a = p.parse_args()
+
+    t0 = time.perf_counter()
+    con, stats = run(a.db, a.countries, a.cities)
+    dt = time.perf_counter() - t0
+
+    # sample output
+    print("Countries sample:", con.execute("SELECT cc,name FROM country ORDER BY name LIMIT 8").fetchall())
+    print("Cities sample   :", con.execute("""SELECT c.cc, ci.name, ci.abbr
+                                              FROM country c JOIN city ci ON ci.country_id=c.id
+                                              ORDER BY c.cc, ci.name LIMIT 8""").fetchall())
+    con.close()
+    for kind, s in stats.items():
+        print(f"{kind:<10}" + "  ".join(f"{k.replace('_', ' ')} {v:,}" for k, v in s.items()))
+    print(f"Done in {dt:.1f} s.")
+
+if __name__ == "__main__":
+    main()
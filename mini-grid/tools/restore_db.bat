@@ -5,9 +5,23 @@ title Life-Support Mini — Restore DB
 rem --- Paths ---
 set "DB=E:\life-support-mini\db\mini.db"
 set "BACKUP_DIR=E:\life-support-mini\db\backups"
-set "API_START=E:\life-support-mini\api\start_mini_api.bat"
-set "API_STOP=E:\life-support-mini\api\stop_mini_api.bat"
-set "BACKUP_BAT=E:\life-support-mini\tools\backup_db.bat"
+set "BACKUP_PY=E:\life-support-mini\tools\backup_db.py"
+
+rem Backups in the deduplicated store (backup_db.bat's default) are listed by
+rem manifest; backup_db.py rebuilds the chosen one before restoring it.
+set "LIST_DIR=%BACKUP_DIR%"
+set "LIST_PAT=*.db"
+if exist "%BACKUP_DIR%\store\manifests\*.json" (
+  set "LIST_DIR=%BACKUP_DIR%\store\manifests"
+  set "LIST_PAT=*.json"
+)
+
+where python >nul 2>&1
+if %errorlevel% neq 0 (
+  set "PY=py -3"
+) else (
+  set "PY=python"
+)
 
 echo ===============================================
 echo  Life-Support Mini — Restore Database
@@ -16,15 +30,15 @@ echo  Backups:  %BACKUP_DIR%
 echo ===============================================
 echo.
 
-if not exist "%BACKUP_DIR%\*.db" (
-  echo [ERROR] No backups found in "%BACKUP_DIR%".
+if not exist "%LIST_DIR%\%LIST_PAT%" (
+  echo [ERROR] No backups found in "%LIST_DIR%".
   pause
   exit /b 1
 )
 
 echo Recent backups:
 set /a i=0
-for /f "delims=" %%F in ('dir /b /a:-d /o-d "%BACKUP_DIR%\*.db"') do (
+for /f "delims=" %%F in ('dir /b /a:-d /o-d "%LIST_DIR%\%LIST_PAT%"') do (
   set /a i+=1
   set "file!i!=%%F"
   echo   !i!. %%F
@@ -45,7 +59,7 @@ for /f "delims=0123456789" %%A in ("%n%") do (
 if %n% LSS 1 goto choose
 if %n% GTR %i% goto choose
 
-set "BACKUP=%BACKUP_DIR%\!file%n%!"
+set "BACKUP=%LIST_DIR%\!file%n%!"
 echo You chose: "!BACKUP!"
 set /p "ok=Confirm restore? This will OVERWRITE mini.db. (Y/N): "
 if /i not "%ok%"=="Y" (
@@ -55,31 +69,17 @@ if /i not "%ok%"=="Y" (
 )
 
 echo.
-echo [1/4] Safety backup of current DB...
-if exist "%BACKUP_BAT%" (
-  call "%BACKUP_BAT%"
-) else (
-  if exist "%DB%" (
-    set "STAMP=%DATE:~10,4%%DATE:~4,2%%DATE:~7,2%_%TIME:~0,2%%TIME:~3,2%%TIME:~6,2%"
-    set "STAMP=%STAMP: =0%"
-    copy /Y "%DB%" "%BACKUP_DIR%\mini_pre_restore_%STAMP%.db" >nul
-  )
-)
-
-echo [2/4] Stopping API...
-if exist "%API_STOP%" call "%API_STOP%"
-
-echo [3/4] Restoring DB from "!BACKUP!" ...
-copy /Y "!BACKUP!" "%DB%"
+rem The API keeps running: backup_db.py checks the backup, takes a safety
+rem backup of the current DB (mini_*_pre_restore.db) and writes the backup into
+rem mini.db through SQLite, so readers only wait for that one copy.
+echo Restoring DB from "!BACKUP!" ...
+%PY% "%BACKUP_PY%" restore --file "!BACKUP!" --db "%DB%"
 if errorlevel 1 (
   echo [ERROR] Restore failed.
   pause
   exit /b 1
 )
 
-echo [4/4] Starting API...
-if exist "%API_START%" call "%API_START%"
-
 echo.
 echo Done. DB restored from:
 echo   !BACKUP!
@@ -3,8 +3,15 @@
 # Place this file inside your Mini folder:
 #   E:\life-support-project\life-support-starter-mini-main\
 # It will locate life-support-api.exe and config.mini.json in the same folder.
+#
+# Records are read through life_support_api imported as a library (found next
+# to this file or in ..\sync), on one background thread with its own DB
+# connection. The list is paged: the first page loads on Refresh and the next
+# one when the scrollbar nears the bottom. Seek/priority edits update their row
+# in place. Without the module (e.g. only the .exe is shipped) the same calls
+# go through "life-support-api.exe ... --json".
 
-import subprocess, sys, os
+import json, queue, subprocess, sys, os, threading
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 
@@ -19,6 +26,16 @@ APP_DIR = app_dir()
 EXE = os.path.join(APP_DIR, "life-support-api.exe")
 CFG = os.path.join(APP_DIR, "config.mini.json")
 SYNC_BAT = os.path.join(APP_DIR, "sync_mini.bat")
+PAGE = 200
+STATUSES = ("All", "queued", "in_progress", "paused", "done")
+
+for d in (APP_DIR, os.path.join(os.path.dirname(APP_DIR), "sync")):
+    if d not in sys.path:
+        sys.path.append(d)
+try:
+    import life_support_api as lsapi
+except ImportError:
+    lsapi = None
 
 def run_cmd(args):
     try:
@@ -27,55 +44,143 @@ def run_cmd(args):
     except Exception as e:
         return 1, "", str(e)
 
-def list_records():
-    if not os.path.exists(EXE) or not os.path.exists(CFG):
-        messagebox.showerror("Missing files", "life-support-api.exe or config.mini.json not found in this folder:\n" + APP_DIR)
-        return []
-    code, out, err = run_cmd([EXE, "list", "--config", CFG])
+def run_json(args):
+    code, out, err = run_cmd(args)
     if code != 0:
-        messagebox.showerror("List error", (err or out or "Unknown error"))
-        return []
-    rows = []
-    for line in out.splitlines():
-        parts = [p.strip() for p in line.split("|")]
-        if len(parts) < 4:
-            continue
-        guid = parts[0]; source = parts[1]; seek_part = parts[2]; version_part = parts[3]
-        seek="0"; pri="0"; status=""
-        for t in seek_part.replace("  "," ").split():
-            if t.startswith("seek="): seek = t.split("=",1)[1]
-            elif t.startswith("pri="): pri = t.split("=",1)[1]
-            else: status = t
-        rows.append((guid, source, seek, pri, status, version_part))
-    return rows
-
-def refresh():
-    for i in tree.get_children(): tree.delete(i)
-    for row in list_records(): tree.insert("", "end", values=row)
+        raise RuntimeError(err or out or "Unknown error")
+    return json.loads(out)
+
+# ---------- backend: runs on the worker thread only ----------
+
+class Backend:
+    def __init__(self):
+        self.conn = None
+
+    def db(self):
+        if self.conn is None:
+            self.conn = lsapi.connect_db(lsapi.load_config(CFG))
+            lsapi.ensure_list_indexes(self.conn)
+        return self.conn
+
+    def list(self, cursor, status, owner):
+        if lsapi:
+            return lsapi.list_records(self.db(), PAGE, cursor, status, owner=owner)
+        args = [EXE, "list", "--config", CFG, "--json", "--limit", str(PAGE)]
+        for flag, v in (("--cursor", cursor), ("--status", status), ("--owner", owner)):
+            if v:
+                args += [flag, v]
+        return run_json(args)
+
+    def seek(self, guid, on=None, priority=None):
+        if lsapi:
+            return lsapi.set_seek(self.db(), guid, on=on, priority=priority)
+        args = [EXE, "seek", "--guid", guid, "--config", CFG, "--json"]
+        if on is not None:
+            args.append("--on" if on else "--off")
+        if priority is not None:
+            args += ["--priority", str(priority)]
+        return run_json(args)["record"]
+
+    def sync(self):
+        if os.path.exists(SYNC_BAT):
+            code, out, err = run_cmd([SYNC_BAT])
+        else:
+            code, out, err = run_cmd([EXE, "sync", "--auto", "--config", CFG])
+        if code != 0:
+            raise RuntimeError(err or out or "Unknown error")
+
+BACKEND = Backend()
+JOBS = queue.Queue()
+DONE = queue.Queue()
+
+def worker():
+    while True:
+        fn, args, on_ok, title = JOBS.get()
+        try:
+            DONE.put((on_ok, fn(*args), None, title))
+        except Exception as e:
+            DONE.put((on_ok, None, e, title))
+
+def submit(fn, *args, on_ok=None, title="Error"):
+    JOBS.put((fn, args, on_ok, title))
+
+def pump():
+    """Deliver finished jobs on the Tk thread."""
+    while True:
+        try:
+            on_ok, result, err, title = DONE.get_nowait()
+        except queue.Empty:
+            break
+        if err is not None:
+            set_busy(False)
+            messagebox.showerror(title, str(err))
+        elif on_ok:
+            on_ok(result)
+    root.after(30, pump)
+
+# ---------- list paging ----------
+
+state = {"cursor": None, "loading": False, "gen": 0}
+
+def row_values(r):
+    return (r["guid"], r["source_name"] or "", r["to_seek"], r["seek_priority"], r["seek_status"] or "", f"v{r['version']}")
+
+def set_busy(busy):
+    state["loading"] = busy
+    status_lbl.config(text="Loading..." if busy else f"{len(tree.get_children()):,} shown"
+                      + (" (scroll for more)" if state["cursor"] else ""))
+
+def filters():
+    st = status_var.get()
+    return (None if st == "All" else st), (owner_var.get().strip() or None)
+
+def refresh(*_):
+    state["gen"] += 1
+    state["cursor"] = None
+    tree.delete(*tree.get_children())
+    load_page(first=True)
+
+def load_page(first=False):
+    if state["loading"] or (not first and not state["cursor"]):
+        return
+    gen = state["gen"]
+    set_busy(True)
+    def on_ok(page):
+        if gen != state["gen"]:  # filters changed while this page was loading
+            set_busy(False)
+            return
+        for r in page["items"]:
+            if not tree.exists(r["guid"]):
+                tree.insert("", "end", iid=r["guid"], values=row_values(r))
+        state["cursor"] = page["next_cursor"]
+        set_busy(False)
+    submit(BACKEND.list, state["cursor"], *filters(), on_ok=on_ok, title="List error")
+
+def on_scroll(first, last):
+    vsb.set(first, last)
+    if float(last) > 0.9:
+        load_page()
+
+def update_row(rec):
+    if rec is None:
+        messagebox.showerror("Seek error", "Record not found.")
+    elif tree.exists(rec["guid"]):
+        tree.item(rec["guid"], values=row_values(rec))
+
+# ---------- actions ----------
 
 def get_selected():
     sel = tree.selection()
     if not sel:
         messagebox.showinfo("Select a record", "Please select a record first.")
         return None
-    return tree.item(sel[0], "values")[0]  # guid
+    return sel[0]  # iid is the guid
 
 def toggle_seek():
     guid = get_selected()
     if not guid: return
-    # read current from tree
-    vals = tree.item(tree.selection()[0], "values")
-    current = vals[2]
-    args = [EXE, "seek", "--guid", guid, "--config", CFG]
-    if current == "1":
-        args.append("--off")
-    else:
-        args.append("--on")
-    code, out, err = run_cmd(args)
-    if code != 0:
-        messagebox.showerror("Seek error", (err or out or "Unknown error"))
-        return
-    refresh()
+    current = str(tree.item(guid, "values")[2])
+    submit(BACKEND.seek, guid, current != "1", on_ok=update_row, title="Seek error")
 
 def set_priority():
     guid = get_selected()
@@ -85,27 +190,22 @@ def set_priority():
         if val is None: return
     except Exception:
         return
-    code, out, err = run_cmd([EXE, "seek", "--guid", guid, "--priority", str(val), "--config", CFG])
-    if code != 0:
-        messagebox.showerror("Priority error", (err or out or "Unknown error"))
-        return
-    refresh()
+    submit(BACKEND.seek, guid, None, val, on_ok=update_row, title="Priority error")
 
 def do_sync():
-    if os.path.exists(SYNC_BAT):
-        code, out, err = run_cmd([SYNC_BAT])
-    else:
-        code, out, err = run_cmd([EXE, "sync", "--auto", "--config", CFG])
-    if code != 0:
-        messagebox.showerror("Sync error", (err or out or "Unknown error"))
-        return
-    messagebox.showinfo("Sync", "Sync complete.")
-    refresh()
+    def on_ok(_):
+        messagebox.showinfo("Sync", "Sync complete.")
+        refresh()
+    status_lbl.config(text="Syncing...")
+    submit(BACKEND.sync, on_ok=on_ok, title="Sync error")
 
 # UI setup
 root = tk.Tk()
 root.title("Life-Support Mini")
 
+if not os.path.exists(CFG) or (lsapi is None and not os.path.exists(EXE)):
+    messagebox.showerror("Missing files", "life-support-api.exe or config.mini.json not found in this folder:\n" + APP_DIR)
+
 frm = ttk.Frame(root, padding=10); frm.pack(fill="both", expand=True)
 bar = ttk.Frame(frm); bar.pack(fill="x", pady=(0,8))
 ttk.Button(bar, text="Refresh", command=refresh).pack(side="left")
@@ -113,12 +213,31 @@ ttk.Button(bar, text="Toggle Seek", command=toggle_seek).pack(side="left", padx=
 ttk.Button(bar, text="Set Priority", command=set_priority).pack(side="left", padx=6)
 ttk.Button(bar, text="Sync", command=do_sync).pack(side="left", padx=6)
 
+status_var = tk.StringVar(value="All")
+owner_var = tk.StringVar()
+ttk.Label(bar, text="Status").pack(side="left", padx=(18,4))
+status_box = ttk.Combobox(bar, textvariable=status_var, values=STATUSES, state="readonly", width=11)
+status_box.pack(side="left")
+status_box.bind("<<ComboboxSelected>>", refresh)
+ttk.Label(bar, text="Owner").pack(side="left", padx=(12,4))
+owner_entry = ttk.Entry(bar, textvariable=owner_var, width=18)
+owner_entry.pack(side="left")
+owner_entry.bind("<Return>", refresh)
+status_lbl = ttk.Label(bar, text="")
+status_lbl.pack(side="right")
+
 cols = ("GUID","Source","Seek","Priority","Status","Version")
-tree = ttk.Treeview(frm, columns=cols, show="headings", height=14)
+body = ttk.Frame(frm); body.pack(fill="both", expand=True)
+tree = ttk.Treeview(body, columns=cols, show="headings", height=14)
+vsb = ttk.Scrollbar(body, orient="vertical", command=tree.yview)
+tree.configure(yscrollcommand=on_scroll)
 for c in cols:
     tree.heading(c, text=c)
     tree.column(c, width=120 if c!="GUID" else 320, anchor="w")
-tree.pack(fill="both", expand=True)
+tree.pack(side="left", fill="both", expand=True)
+vsb.pack(side="right", fill="y")
 
+threading.Thread(target=worker, daemon=True).start()
+root.after(30, pump)
 refresh()
 root.mainloop()